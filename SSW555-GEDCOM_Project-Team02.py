@@ -1,96 +1,356 @@
 """
 SSW555 GEDCOM Parsing Project - Team02
 This is the main file for the project
+
+Usage:
+    python SSW555-GEDCOM_Project-Team02.py                      (asks for a file name)
+    python SSW555-GEDCOM_Project-Team02.py family.ged
+    python SSW555-GEDCOM_Project-Team02.py "Test_Files/*.ged" other.ged --output-dir reports --jobs 4
 """
+import argparse
+import glob
 import json
 import logging
+import os
 import sys
+from contextlib import contextmanager
+from Queue import Queue
 
 from gedcom.parser import File
+from log_queue import QueueHandler, QueueListener
 import stories
 
 __author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
 __status__ = "Development"
 
+OUTPUT_DIR = "Test_Results"
+SUMMARY_HEADING = "{0:<60} {1:>8} {2:>8}"
 
-def run(gedcom_file, show_passed=False):
-    """ Check Gedcom File For Errors
 
-    :param gedcom_file: The GEDCOM File object to perform assignment on
-    :type gedcom_file: parser.File
+@contextmanager
+def story_logging(output_dir=OUTPUT_DIR, show_passed=False, console=True):
+    """ Log the stories of one run to the console, "output.md" and "output.debug.md"
+
+    The handlers are attached to stories.logger for the with block only, and their files are closed after it,
+    so every run gets its own handlers.
+
+    :param output_dir: Directory to write "output.md" and "output.debug.md" to
+    :type output_dir: str
+
+    :param console: Log to the console as well as the files
+    :type console: bool
 
     """
+    handlers = []
 
     # Log only failed cases to console if show_passed is False else show passed and failed cases
-    stream_handler = logging.StreamHandler()
-    stream_handler.setLevel(logging.DEBUG) if show_passed else stream_handler.setLevel(logging.INFO)
-    stories.logger.addHandler(stream_handler)
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setLevel(logging.DEBUG) if show_passed else stream_handler.setLevel(logging.INFO)
+        handlers.append(stream_handler)
 
     # Log only failed cases to file "output.md"
-    user_output = logging.FileHandler(filename='Test_Results/output.md', mode="w")
+    user_output = logging.FileHandler(filename=os.path.join(output_dir, 'output.md'), mode="w")
     user_output.setLevel(logging.INFO)
-    stories.logger.addHandler(user_output)
+    handlers.append(user_output)
 
     # Log only passed cases to file "output.debug.md"
-    debug_output = logging.FileHandler(filename='Test_Results/output.debug.md', mode="w")
+    debug_output = logging.FileHandler(filename=os.path.join(output_dir, 'output.debug.md'), mode="w")
     debug_output.setLevel(logging.DEBUG)
-    stories.logger.addHandler(debug_output)
-
-
-    log = {
-        "individuals": stories.individual_summary(gedcom_file),
-        "families": stories.family_summary(gedcom_file),
-        "stories": [
-            stories.dates_before_current_date(gedcom_file),
-            stories.birth_before_marriage(gedcom_file),
-            stories.birth_before_death(gedcom_file),
-            stories.marriage_before_divorce(gedcom_file),
-            stories.marriage_before_death(gedcom_file),
-            stories.divorce_before_death(gedcom_file),
-            stories.less_then_150_years_old(gedcom_file),
-            stories.birth_before_marriage_of_parents(gedcom_file),
-            stories.birth_before_death_of_parents(gedcom_file),
-            stories.marriage_after_14(gedcom_file),
-            stories.no_bigamy(gedcom_file),
-            stories.parents_not_too_old(gedcom_file),
-            stories.siblings_spacing(gedcom_file),
-            stories.less_than_5_multiple_births(gedcom_file),
-            stories.fewer_than_15_siblings(gedcom_file),
-            stories.male_last_names(gedcom_file),
-            stories.no_marriages_to_descendants(gedcom_file),
-            stories.siblings_should_not_marry(gedcom_file),
-            stories.first_cousins_should_not_marry(gedcom_file),
-            stories.aunts_and_uncles(gedcom_file),
-            stories.correct_gender_for_role(gedcom_file),
-            stories.unique_ids(gedcom_file),
-            stories.unique_name_and_birth_date(gedcom_file),
-            stories.unique_families_by_spouses(gedcom_file)
-        ]
-    }
+    handlers.append(debug_output)
+
+    # Stories put their records on a queue, written to the handlers above by a background thread
+    queue = Queue()
+    listener = QueueListener(queue, *handlers)
+    queue_handler = QueueHandler(queue, listener.level)
+    stories.logger.addHandler(queue_handler)
+    listener.start()
+    try:
+        yield
+    finally:
+        # Wait for the queued records to be written
+        stories.logger.removeHandler(queue_handler)
+        listener.stop()
+        for handler in handlers:
+            handler.close()
+
+
+def run(gedcom_file, show_passed=False, show_profile=False, output_dir=OUTPUT_DIR, console=True, summary_limit=None):
+    """ Check Gedcom File For Errors
+
+    :param gedcom_file: The GEDCOM File object to perform assignment on
+    :type gedcom_file: parser.File
+
+    :param show_profile: Print the time, memory and records of each step to the console
+    :type show_profile: bool
+
+    :param output_dir: Directory to save "output.md", "output.debug.md" and "log.json" to
+    :type output_dir: str
+
+    :param console: Log the stories to the console as well as the output files
+    :type console: bool
+
+    :param summary_limit: Most individuals and families to summarize, None for all of them, 0 to skip the summaries
+    when only the stories are wanted
+    :type summary_limit: int
+
+    :note: The profile section of the log holds every step measured since stories.profiler was last reset, so
+    parsing can be measured before calling run.
+
+    :returns: the log saved to "log.json"
+    :rtype: dict
+
+    """
+    with story_logging(output_dir, show_passed, console):
+        individuals, families = [], []
+        if summary_limit != 0:
+            with stories.profiler.measure("Summary", "individual_summary") as m:
+                individuals = stories.individual_summary(gedcom_file, summary_limit)
+            m["records"] = len(individuals)
+            with stories.profiler.measure("Summary", "family_summary") as m:
+                families = stories.family_summary(gedcom_file, summary_limit)
+            m["records"] = len(families)
+
+        log = {
+            "individuals": individuals,
+            "families": families,
+            "stories": [
+                stories.dates_before_current_date(gedcom_file),
+                stories.birth_before_marriage(gedcom_file),
+                stories.birth_before_death(gedcom_file),
+                stories.marriage_before_divorce(gedcom_file),
+                stories.marriage_before_death(gedcom_file),
+                stories.divorce_before_death(gedcom_file),
+                stories.less_then_150_years_old(gedcom_file),
+                stories.birth_before_marriage_of_parents(gedcom_file),
+                stories.birth_before_death_of_parents(gedcom_file),
+                stories.marriage_after_14(gedcom_file),
+                stories.no_bigamy(gedcom_file),
+                stories.parents_not_too_old(gedcom_file),
+                stories.siblings_spacing(gedcom_file),
+                stories.less_than_5_multiple_births(gedcom_file),
+                stories.fewer_than_15_siblings(gedcom_file),
+                stories.male_last_names(gedcom_file),
+                stories.no_marriages_to_descendants(gedcom_file),
+                stories.siblings_should_not_marry(gedcom_file),
+                stories.first_cousins_should_not_marry(gedcom_file),
+                stories.aunts_and_uncles(gedcom_file),
+                stories.correct_gender_for_role(gedcom_file),
+                stories.unique_ids(gedcom_file),
+                stories.unique_name_and_birth_date(gedcom_file),
+                stories.unique_families_by_spouses(gedcom_file),
+                stories.likely_duplicate_individuals(gedcom_file)
+            ],
+            "lists": [
+                stories.list_deceased(gedcom_file),
+                stories.list_living_married(gedcom_file),
+                stories.list_living_single(gedcom_file),
+                stories.list_orphans(gedcom_file),
+                stories.list_large_age_differences(gedcom_file),
+                stories.list_recent_births(gedcom_file),
+                stories.list_recent_deaths(gedcom_file),
+                stories.list_recent_survivors(gedcom_file),
+                stories.list_upcoming_birthdays(gedcom_file),
+                stories.list_upcoming_anniversaries(gedcom_file)
+            ],
+            "profile": list(stories.profiler.entries)
+        }
+
+    if show_profile:
+        print stories.profiler.table()
 
     # attempt to save log to json file
     try:
-        fname_out = 'Test_Results/log.json'
+        fname_out = os.path.join(output_dir, 'log.json')
         with open(fname_out, 'w') as outfile:
             json.dump(log, outfile, sort_keys=True, indent=4, separators=(',', ': '))
     except IOError as e:
         sys.exit("Error Saving Results - {0}: '{1}'".format(e.strerror, e.filename))
+    return log
 
 
-if __name__ == "__main__":
+def expand(patterns):
+    """ Expand file names and glob patterns, keeping names that match nothing so they are reported as missing
+
+    :param patterns: file names or glob patterns, e.g. "Test_Files/*.ged"
+    :type patterns: list
+
+    :returns: file names in the order given, without duplicates
+    :rtype: list
+
+    """
+    fnames = []
+    for pattern in patterns:
+        for fname in sorted(glob.glob(pattern)) or [pattern]:
+            if fname not in fnames:
+                fnames.append(fname)
+    return fnames
+
+
+def report_dirs(fnames, output_dir):
+    """ Find a report directory in output_dir for each file, named after the file
+
+    :returns: dictionary of file name to report directory
+    :rtype: dict
+
+    """
+    dirs, used = {}, set()
+    for fname in fnames:
+        name = os.path.splitext(os.path.basename(fname))[0] or "gedcom"
+        unique, i = name, 1
+        while unique in used:
+            i += 1
+            unique = "{0}-{1}".format(name, i)
+        used.add(unique)
+        dirs[fname] = os.path.join(output_dir, unique)
+    return dirs
+
+
+def check_file(job):
+    """ Parse and check one file of a batch, saving its reports to its own directory
+
+    :param job: file name, report directory, the directory for cProfile dumps or None, the summary limit, and
+    whether to read the file in low memory mode
+    :type job: tuple
+
+    :returns: failures found by each story, or the error that stopped the file being checked
+    :rtype: dict
+
+    """
+    fname, output_dir, profile_dir, summary_limit, low_memory = job
+    r = {"file": fname, "output_dir": output_dir, "failed": {}, "error": None}
+    stories.profiler.reset()
+    stories.profiler.dump_dir = profile_dir and os.path.join(profile_dir, os.path.basename(output_dir))
+    try:
+        g = File()
+        with stories.profiler.measure("Parse", "read_file") as m:
+            g.read_file(fname, low_memory)
+        m["records"] = len(g.lines)
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+        log = run(g, output_dir=output_dir, console=False, summary_limit=summary_limit)
+    except (IOError, OSError) as e:
+        r["error"] = "{0}: '{1}'".format(e.strerror, e.filename)
+    except Exception as e:
+        r["error"] = "{0}: {1}".format(type(e).__name__, e)
+    else:
+        for s in log["stories"]:
+            r["failed"]["{0}: {1}".format(s["id"], s["name"])] = len(s["output"]["failed"])
+    return r
+
+
+def run_batch(patterns, output_dir=OUTPUT_DIR, jobs=None, profile_dir=None, summary_limit=None, low_memory=False):
+    """ Check many files in a process pool, saving reports for each file and a summary of the batch
+
+    Each file's "output.md", "output.debug.md" and "log.json" are saved to a directory named after it in
+    output_dir, and "summary.json" in output_dir lists the failures of each file and the totals of each story.
+
+    :param patterns: file names or glob patterns
+    :type patterns: list
+
+    :param jobs: number of processes, defaults to the number of CPUs
+    :type jobs: int
+
+    :param summary_limit: Most individuals and families to summarize in each file, see run
+    :type summary_limit: int
+
+    :param low_memory: Read each file keeping where its lines are instead of their text, see File.read_source
+    :type low_memory: bool
+
+    :returns: the summary saved to "summary.json"
+    :rtype: dict
+
+    """
+    # Only batches need a process pool, so checking a single file does not pay for importing multiprocessing
+    import multiprocessing
+
+    fnames = expand(patterns)
+    dirs = report_dirs(fnames, output_dir)
+    work = [(fname, dirs[fname], profile_dir, summary_limit, low_memory) for fname in fnames]
+    jobs = min(jobs or multiprocessing.cpu_count(), len(work)) or 1
+    if jobs == 1:
+        files = map(check_file, work)
+    else:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            files = pool.map(check_file, work, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    totals = {}
+    for f in files:
+        for s, failed in f["failed"].iteritems():
+            total = totals.setdefault(s, {"failed": 0, "files": 0})
+            total["failed"] += failed
+            total["files"] += failed > 0
+    summary = {"files": files, "stories": totals, "errors": sum(f["error"] is not None for f in files)}
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    with open(os.path.join(output_dir, "summary.json"), "w") as outfile:
+        json.dump(summary, outfile, sort_keys=True, indent=4, separators=(',', ': '))
+    return summary
+
+
+def print_summary(summary):
+    """ Print the failures of each story across a batch, and the files that could not be checked """
+    print SUMMARY_HEADING.format("Story", "Failed", "Files")
+    for s in sorted(summary["stories"]):
+        print SUMMARY_HEADING.format(s[:60], summary["stories"][s]["failed"], summary["stories"][s]["files"])
+    for f in summary["files"]:
+        if f["error"]:
+            print "Error Checking File {0} - {1}".format(f["file"], f["error"])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Check GEDCOM files for errors")
+    arg_parser.add_argument("fnames", nargs="*", help="GEDCOM files or glob patterns to check, asked for if not given")
+    arg_parser.add_argument("--output-dir", default=OUTPUT_DIR,
+                            help="directory to save reports to, one directory per file when checking many")
+    arg_parser.add_argument("--jobs", type=int, help="processes checking files at once, defaults to the CPU count")
+    arg_parser.add_argument("--show-passed", action="store_true", help="log passed cases to the console too")
+    arg_parser.add_argument("--profile", action="store_true",
+                            help="print the time, memory and records of parsing, the summaries and each story")
+    arg_parser.add_argument("--profile-dir", help="save a cProfile dump of each step to this directory")
+    arg_parser.add_argument("--summary-limit", type=int, metavar="N",
+                            help="summarize at most N individuals and families, 0 to skip the summaries")
+    arg_parser.add_argument("--low-memory", action="store_true",
+                            help="keep where each line is in the file instead of its text, for very large files")
+    args = arg_parser.parse_args()
+
+    if len(args.fnames) > 1 or (args.fnames and expand(args.fnames) != args.fnames):
+        summary = run_batch(args.fnames, args.output_dir, args.jobs, args.profile_dir, args.summary_limit,
+                            args.low_memory)
+        print_summary(summary)
+        print "Successfully saved reports and summary to {0}".format(args.output_dir)
+        sys.exit(1 if summary["errors"] else 0)
+
     g = File()
     # Request file name from user
-    fname = raw_input('Enter the file name to open: ')
+    fname = args.fnames[0] if args.fnames else raw_input('Enter the file name to open: ')
     #fname = "Test_Files/My-Family-20-May-2016-697-Simplified-WithErrors-Sprint04.ged"
 
+    stories.profiler.reset()
+    stories.profiler.dump_dir = args.profile_dir
     try:
-        g.read_file(fname)
+        with stories.profiler.measure("Parse", "read_file") as m:
+            g.read_file(fname, args.low_memory)
+        m["records"] = len(g.lines)
     except IOError as e:
         sys.exit("Error Opening File - {0}: '{1}'".format(e.strerror, e.filename))
 
-    run(g, show_passed=False)
+    if not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+    run(g, show_passed=args.show_passed, show_profile=args.profile, output_dir=args.output_dir,
+        summary_limit=args.summary_limit)
+
+    print "Successfully saved output to {0}".format(os.path.join(args.output_dir, 'output.md'))
+    print "Successfully saved debug output to {0}".format(os.path.join(args.output_dir, 'output.debug.md'))
+    print "Successfully saved log to {0}".format(os.path.join(args.output_dir, 'log.json'))
+    if args.profile_dir:
+        print "Successfully saved profile dumps to {0}".format(args.profile_dir)
 
-    print "Successfully saved output to {0}".format('Test_Results/output.md')
-    print "Successfully saved debug output to {0}".format('Test_Results/output.debug.md')
-    print "Successfully saved log to {0}".format('Test_Results/log.json')
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Load Test for the Validation Server
+
+Posts GEDCOM files to the validation server from many threads and reports requests per second and latency
+percentiles. Without --url or --socket a server is started in this process on a free port, so the test runs offline.
+Each file is first posted as it is and encoded as UTF-16 with a byte order mark, and exits with status 1 if the
+server does not answer both with the same story results.
+
+Usage: python benchmarks/load_test.py [files ...] [--requests 500] [--concurrency 8] [--url 127.0.0.1:8555]
+"""
+import argparse
+import glob
+import httplib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+
+class UnixHTTPConnection(httplib.HTTPConnection):
+    """ HTTP connection over a Unix socket """
+
+    def __init__(self, path):
+        httplib.HTTPConnection.__init__(self, "localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def percentile(values, p):
+    """ The p-th percentile of sorted values, by nearest rank """
+    return values[min(len(values) - 1, max(0, int(round(p / 100.0 * len(values))) - 1))]
+
+
+def load_test(connect, bodies, requests=500, concurrency=8):
+    """ Post the bodies in turn from several threads, each thread keeping its connection open
+
+    :param connect: function returning a new HTTPConnection to the server
+    :param bodies: GEDCOM texts to post, repeated until the number of requests is reached
+    :type bodies: list
+
+    :returns: requests per second, latencies in seconds sorted, and the number of failed requests
+    :rtype: tuple
+
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    counter = iter(xrange(requests))
+
+    def worker():
+        conn = connect()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.time()
+            try:
+                conn.request("POST", "/validate", bodies[i % len(bodies)])
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (httplib.HTTPException, socket.error):
+                conn.close()
+                conn, ok = connect(), False
+            with lock:
+                latencies.append(time.time() - start)
+                errors[0] += not ok
+        conn.close()
+
+    start = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    return requests / elapsed, sorted(latencies), errors[0]
+
+
+def post(connect, body):
+    """ Post a body to /validate on a new connection
+
+    :returns: the status of the response and its body
+    :rtype: tuple
+
+    """
+    conn = connect()
+    try:
+        conn.request("POST", "/validate", body)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def check_utf16(connect, body):
+    """ Post a file as it is and encoded as UTF-16, and compare the story results of both
+
+    :returns: the description of the difference, None if both are answered with the same results
+    :rtype: str
+
+    """
+    answers = []
+    for data in (body, body.decode("utf-8").encode("utf-16")):
+        status, data = post(connect, data)
+        if status != 200:
+            return "status {0}: {1}".format(status, data)
+        answers.append(json.loads(data)["stories"])
+    return None if answers[0] == answers[1] else "different story results"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("fnames", nargs="*", default=["Test_Files/*.ged"], help="GEDCOM files or glob patterns")
+    arg_parser.add_argument("--requests", type=int, default=500)
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--url", help="host:port of a running server")
+    arg_parser.add_argument("--socket", help="Unix socket of a running server")
+    args = arg_parser.parse_args()
+
+    bodies = []
+    for fname in sorted(set(f for pattern in args.fnames for f in glob.glob(pattern))):
+        with open(fname) as f:
+            bodies.append(f.read())
+    if not bodies:
+        sys.exit("No GEDCOM files found")
+
+    httpd = None
+    if args.socket:
+        connect = lambda: UnixHTTPConnection(args.socket)
+    elif args.url:
+        connect = lambda: httplib.HTTPConnection(args.url)
+    else:
+        httpd = server.serve(port=0, quiet=True)
+        threading.Thread(target=httpd.serve_forever).start()
+        connect = lambda: httplib.HTTPConnection("127.0.0.1", httpd.server_address[1])
+
+    try:
+        wrong = [(i, check_utf16(connect, body)) for i, body in enumerate(bodies)]
+        wrong = [(i, difference) for i, difference in wrong if difference is not None]
+        rps, latencies, errors = load_test(connect, bodies, args.requests, args.concurrency)
+    finally:
+        if httpd is not None:
+            httpd.shutdown()
+            httpd.server_close()
+
+    print "{0} requests, {1} files, {2} threads, {3} failed".format(args.requests, len(bodies), args.concurrency,
+                                                                     errors)
+    print "requests per second: {0:.1f}".format(rps)
+    print "latency p50: {0:.2f}ms  p99: {1:.2f}ms  max: {2:.2f}ms".format(
+        percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000, latencies[-1] * 1000)
+    for i, difference in wrong:
+        print "UTF-16 upload of file {0}: {1}".format(i + 1, difference)
+    sys.exit(1 if wrong else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark of Reading Files in Low Memory Mode
+
+Generates synthetic GEDCOM files and reads each with File.read_file, keeping the text of every line, and with
+low_memory, keeping only where each line is in a memory map of the file, and compares the estimated bytes each Line
+takes and the time to read and to read back the text of every line.
+
+Usage: python benchmarks/low_memory.py [--sizes 1000,10000,50000] [--gzip]
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+from gedcom.parser import File
+from scaling import timed
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+
+def object_bytes(value):
+    """ Estimate the memory used by a value, 0 for None, booleans and the small integers Python shares """
+    if value is None or isinstance(value, bool) or (isinstance(value, int) and -5 <= value <= 256):
+        return 0
+    return sys.getsizeof(value)
+
+
+def line_bytes(line):
+    """ Estimate the memory used by a Line, its attributes, its keys and values and its lists of line numbers
+
+    The text a low memory Line reads from its file is not counted, see measure for the offsets kept instead.
+
+    """
+    attributes = vars(line)
+    size = sys.getsizeof(line) + sys.getsizeof(attributes)
+    size += sum(object_bytes(v) for k, v in attributes.iteritems() if k != "file")
+    for key, value in line.iteritems():
+        size += object_bytes(value)
+        if isinstance(value, list):
+            size += sum(object_bytes(v) for v in value)
+    return size + sum(object_bytes(t) for t in line.continuations)
+
+
+def measure(path, low_memory):
+    """ Read a file, returning its File, the estimated bytes of its Lines, offsets and source, and the read and text
+    times
+
+    A memory map of the file is not counted, as its pages are read from the file when needed and not kept in memory.
+
+    """
+    g = File()
+    read, _ = timed(g.read_file, path, low_memory)
+    text, _ = timed(lambda: sum(len(line.text) for line in g.lines))
+    source = len(g.source) if isinstance(g.source, str) else 0
+    offsets = sys.getsizeof(g.source_offsets) if g.source_offsets is not None else 0
+    return g, sum(line_bytes(line) for line in g.lines) + offsets + source, read, text
+
+
+def compare(individuals, compress=False, seed=0):
+    """ Read a synthetic file, keeping the text of each line and in low memory mode
+
+    :returns: lines read, the size of the file, then (estimated bytes, read time, text time) of both modes
+    :rtype: tuple
+
+    """
+    fd, path = tempfile.mkstemp(suffix=".ged")
+    os.close(fd)
+    try:
+        synthetic.write_gedcom(path, individuals=individuals, seed=seed)
+        size = os.path.getsize(path)
+        if compress:
+            with open(path, "rb") as f_in:
+                f_out = gzip.GzipFile(path + ".gz", "wb")
+                shutil.copyfileobj(f_in, f_out)
+                f_out.close()
+            os.remove(path)
+            path += ".gz"
+        g, text_bytes, text_read, text_text = measure(path, False)
+        lines = len(g.lines)
+        del g
+        g, offset_bytes, offset_read, offset_text = measure(path, True)
+        del g
+    finally:
+        os.remove(path)
+    return lines, size, (text_bytes, text_read, text_text), (offset_bytes, offset_read, offset_text)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--sizes", default="1000,10000,50000", help="comma separated numbers of individuals")
+    arg_parser.add_argument("--gzip", action="store_true",
+                            help="compress the files, so low memory mode keeps the decompressed text instead of a map")
+    args = arg_parser.parse_args()
+
+    failed = False
+    for individuals in (int(s) for s in args.sizes.split(",")):
+        lines, size, text, offset = compare(individuals, args.gzip)
+        print "{0} individuals ({1} lines, {2:.1f} MB)".format(individuals, lines, size / 1e6)
+        for name, (total, read, text_time) in (("text", text), ("low memory", offset)):
+            print "    {0:<10} {1:>6.1f} bytes/line {2:>8.1f} MB  read {3:.3f}s  text {4:.3f}s".format(
+                name, total / float(lines), total / 1e6, read, text_time)
+        if offset[0] >= text[0]:
+            print "    low memory mode does not use less memory"
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
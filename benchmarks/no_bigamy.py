@@ -0,0 +1,96 @@
+"""
+Benchmark for no_bigamy (US11) on synthetic data with heavy remarriage
+
+Compares checking every pair of marriages with the sort and sweep used by stories.no_bigamy.
+
+Usage: python benchmarks/no_bigamy.py [--people 10] [--marriages 40] [--repeat 3]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import timeit
+from itertools import combinations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stories
+from gedcom.parser import File
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+
+def synthetic_gedcom(people, marriages):
+    """ Build GEDCOM text where each person marries many times, a few marriages overlapping
+
+    :param people: number of people who remarry
+    :type people: int
+
+    :param marriages: number of marriages per person
+    :type marriages: int
+
+    :return: GEDCOM text
+    :rtype: str
+
+    """
+    lines = ["0 HEAD"]
+    fams = []
+    for p in range(people):
+        lines += ["0 @I{0}@ INDI".format(p), "1 NAME Person /P{0}/".format(p), "1 SEX M",
+                  "1 BIRT", "2 DATE 1 JAN 1900"]
+        for m in range(marriages):
+            fams.append((p, m))
+            lines.append("1 FAMS @F{0}_{1}@".format(p, m))
+    for p, m in fams:
+        year = 1920 + 2 * m
+        lines += ["0 @S{0}_{1}@ INDI".format(p, m), "1 NAME Spouse /S{0}/".format(m), "1 SEX F",
+                  "1 FAMS @F{0}_{1}@".format(p, m),
+                  "0 @F{0}_{1}@ FAM".format(p, m), "1 HUSB @I{0}@".format(p), "1 WIFE @S{0}_{1}@".format(p, m),
+                  "1 MARR", "2 DATE 1 {0} {1}".format(MONTHS[(p + m) % 12], year)]
+        # Marriages end in divorce a year later, except every tenth which overlaps the next two marriages
+        lines += ["1 DIV", "2 DATE 1 {0} {1}".format(MONTHS[(p + m) % 12], year + (5 if m % 10 == 9 else 1))]
+    lines.append("0 TRLR")
+    return "\n".join(lines)
+
+
+def pairwise_no_bigamy(gedcom_file):
+    """ Check every pair of marriages of each individual, as no_bigamy did before sorting and sweeping """
+    failed = 0
+    for indi in gedcom_file.individuals:
+        for fam_1, fam_2 in combinations(indi.families("FAMS"), 2):
+            if (not fam_1.has("marriage_date")) or (not fam_2.has("marriage_date")):
+                continue
+            s1, e1 = fam_1.marriage_date, fam_1.marriage_end
+            s2, e2 = fam_2.marriage_date, fam_2.marriage_end
+            failed += (s1.dt <= e2["dt"]) and (e1["dt"] >= s2.dt)
+    return failed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--people", type=int, default=10, help="number of people who remarry")
+    arg_parser.add_argument("--marriages", type=int, default=40, help="number of marriages per person")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="times to run each check, the best time is shown")
+    args = arg_parser.parse_args()
+    people, marriages, repeat = args.people, args.marriages, args.repeat
+
+    stories.logger.setLevel(logging.CRITICAL)
+    fd, path = tempfile.mkstemp(suffix=".ged")
+    with os.fdopen(fd, "w") as f:
+        f.write(synthetic_gedcom(people, marriages))
+    g = File()
+    g.read_file(path)
+    os.remove(path)
+
+    pairwise = min(timeit.repeat(lambda: pairwise_no_bigamy(g), number=1, repeat=repeat))
+    sweep = min(timeit.repeat(lambda: stories.no_bigamy(g), number=1, repeat=repeat))
+    print "{0} people x {1} marriages ({2} lines)".format(people, marriages, len(g.lines))
+    print "pairwise: {0:.3f}s ({1} overlapping pairs)".format(pairwise, pairwise_no_bigamy(g))
+    print "sweep:    {0:.3f}s ({1} overlapping pairs)".format(sweep, len(stories.no_bigamy(g)["output"]["failed"]))
+
+
+if __name__ == "__main__":
+    main()
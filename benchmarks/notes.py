@@ -0,0 +1,140 @@
+"""
+Benchmark of Reading Note Heavy Files
+
+Generates synthetic GEDCOM files where most individuals have long notes split over CONC and CONT lines, and compares
+the Line objects File.read_file keeps, with the continuations folded into their NOTE line, to one Line per line of
+the file, in number and in estimated memory. Also checks the stories report the line numbers of the file, counting
+the CONC and CONT lines, before and after editing it, and that a continued note written back after being edited
+reads back the same, and exits with status 1 if either check fails.
+
+Usage: python benchmarks/notes.py [--sizes 1000,10000] [--notes 0.8]
+"""
+import argparse
+from cStringIO import StringIO
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stories
+import synthetic
+from gedcom.parser import File, Line
+from scaling import timed
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+NOTE_FILE = ["0 HEAD", "0 @I1@ INDI", "1 NAME John /Doe/", "1 NOTE First part", "2 CONC of a note",
+             "2 CONT second line", "2 CONT third line", "1 SEX M", "1 BIRT", "2 DATE 1 JAN 2000", "1 DEAT",
+             "2 DATE 1 JAN 1990", "0 TRLR"]
+"""list: A file with a note continued over three lines, then a birth after the death on line 10."""
+
+
+def line_bytes(line):
+    """ Estimate the memory used by a Line, its keys and values and its lists of line numbers """
+    size = sys.getsizeof(line) + sys.getsizeof(line.text) + sys.getsizeof(line.continuations)
+    for key, value in line.iteritems():
+        size += sys.getsizeof(value)
+        if isinstance(value, list):
+            size += sum(sys.getsizeof(v) for v in value)
+    return size + sum(sys.getsizeof(t) for t in line.continuations)
+
+
+def compare(individuals, notes=0.8, seed=0):
+    """ Read a synthetic file with notes, folded and with a Line for every line
+
+    :returns: lines in the file, then (Line objects, estimated bytes) folded and unfolded, and the read time
+    :rtype: tuple
+
+    """
+    fd, path = tempfile.mkstemp(suffix=".ged")
+    os.close(fd)
+    try:
+        synthetic.write_gedcom(path, individuals=individuals, notes=notes, seed=seed)
+        g = File()
+        read, _ = timed(g.read_file, path)
+        with open(path) as f:
+            texts = [t.strip() for t in f if t.strip()]
+    finally:
+        os.remove(path)
+    unfolded = [Line(t, None, i) for i, t in enumerate(texts)]
+    return (len(texts), (len(g.lines), sum(line_bytes(line) for line in g.lines)),
+            (len(unfolded), sum(line_bytes(line) for line in unfolded)), read)
+
+
+def birth_line(g):
+    """ The line birth_before_death reports the birth date of the individual of NOTE_FILE on, None if it passes """
+    failed = stories.birth_before_death(g)["output"]["failed"]
+    return failed[0]["bullets"][0] if failed else None
+
+
+def check_line_numbers():
+    """ Check the line birth_before_death reports for NOTE_FILE as read, and after edits above the birth date
+
+    :returns: the descriptions of the checks that failed
+    :rtype: list
+
+    """
+    g = File()
+    g.read_lines(NOTE_FILE)
+    expected = [("as read", "Birth date is 1 JAN 2000 (line 10)")]
+    found = [birth_line(g)]
+    g.insert_lines(1, ["0 @N1@ NOTE", "1 CONT inserted"])
+    expected.append(("after inserting a note", "Birth date is 1 JAN 2000 (line 12)"))
+    found.append(birth_line(g))
+    g.update_line(g.query(tag="NOTE", level=1).first(), line_value="Shorter")
+    expected.append(("after replacing the continued note", "Birth date is 1 JAN 2000 (line 9)"))
+    found.append(birth_line(g))
+    return ["{0}: {1!r}, expected {2!r}".format(name, got, want)
+            for (name, want), got in zip(expected, found) if got != want]
+
+
+def check_round_trip():
+    """ Edit the fields of the continued note of NOTE_FILE, write the file and read it back
+
+    :returns: the descriptions of the checks that failed
+    :rtype: list
+
+    """
+    wrong = []
+    for fields in ({"level": 2}, {"tag": "NOTE", "line_value": "one\ntwo\n\nfour"}):
+        g = File()
+        g.read_lines(NOTE_FILE)
+        note = g.update_line(g.query(tag="NOTE").first(), **fields)
+        f = StringIO()
+        g.write_text(f)
+        read = File()
+        read.read_lines(f.getvalue().splitlines(True))
+        back = read.query(tag="NOTE").first()
+        if (back["level"], back.val, back.texts) != (note["level"], note.val, note.texts):
+            wrong.append("{0}: read back {1!r}, expected {2!r}".format(fields, back.texts, note.texts))
+        if birth_line(read) != birth_line(g):
+            wrong.append("{0}: read back {1!r}, expected {2!r}".format(fields, birth_line(read), birth_line(g)))
+    return wrong
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--sizes", default="1000,10000", help="comma separated numbers of individuals")
+    arg_parser.add_argument("--notes", type=float, default=0.8, help="chance each individual has a note")
+    args = arg_parser.parse_args()
+
+    # Only check the stories, not writing their output
+    stories.profiler.enabled = False
+    wrong = check_line_numbers()
+    for failure in wrong:
+        print "wrong line number {0}".format(failure)
+    not_read_back = check_round_trip()
+    for failure in not_read_back:
+        print "edited note not read back the same {0}".format(failure)
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        lines, folded, unfolded, read = compare(size, args.notes)
+        print "{0} individuals ({1} lines), read {2:.3f}s".format(size, lines, read)
+        print "    folded   {0:>9} Line objects {1:>8.1f} MB".format(folded[0], folded[1] / 1e6)
+        print "    unfolded {0:>9} Line objects {1:>8.1f} MB".format(unfolded[0], unfolded[1] / 1e6)
+    sys.exit(1 if wrong or not_read_back else 0)
+
+
+if __name__ == "__main__":
+    main()
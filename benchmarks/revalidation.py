@@ -0,0 +1,149 @@
+"""
+Incremental Validation Check
+
+Validates GEDCOM files with incremental.Validator, one record at a time, and with every story over the whole file,
+and checks both report the same results, message text and line numbers included, before and after each of a few
+edits: changing the name of an individual, inserting a record, inserting a note continued over two lines, and
+deleting the record again. Also times running every story over the whole file against revalidating after the first
+change. Exits with status 1 if any results differ,
+so it can run as a check in a job scheduler's pipeline.
+
+Usage: python benchmarks/revalidation.py [files ...] [--sizes 2000]
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import incremental
+import stories
+import synthetic
+from gedcom.parser import File
+from scaling import timed
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def outcomes(results):
+    """ The passed and failed entries of each story, sorted, as records may be checked in another order
+
+    :param results: list of story results dictionaries
+    :type results: list
+
+    :rtype: dict
+
+    """
+    def entries(output):
+        return sorted(json.dumps(entry, sort_keys=True, default=str) for entry in output)
+
+    return dict(((r["id"], r["name"]), (entries(r["output"]["passed"]), entries(r["output"]["failed"])))
+                for r in results)
+
+
+def differences(gedcom_file, validator):
+    """ The stories whose results differ between the validator and a run over the whole file
+
+    :returns: seconds to run every story over the whole file, and the names of the stories that differ
+    :rtype: tuple
+
+    """
+    seconds, full = timed(lambda: [story(gedcom_file) for story in validator.stories])
+    full, results = outcomes(full), outcomes(validator.results)
+    return seconds, sorted(name for (id_, name), outcome in full.iteritems() if results.get((id_, name)) != outcome)
+
+
+NEW_RECORD = ["0 @I_NEW@ INDI", "1 NAME New /Person/", "1 SEX F", "1 BIRT", "2 DATE 1 JAN 1950", "1 DEAT",
+              "2 DATE 1 JAN 1940"]
+"""list: The record inserted by check, an individual dying before their birth, so a story fails on it."""
+
+
+def edits(g):
+    """ The edits check makes after changing a name, each shifting the lines after it
+
+    :returns: list of functions making each edit
+    :rtype: list
+
+    """
+    def insert_record():
+        first = g.query(level=0).query(tag="INDI").first()
+        g.insert_record(NEW_RECORD, before=first)
+
+    def insert_note():
+        g.insert_lines(g.xrefs["@I_NEW@"]["line_number"] + 1, ["1 NOTE Inserted", "2 CONT over two lines"])
+
+    return [insert_record, insert_note, lambda: g.delete_record("@I_NEW@")]
+
+
+def check(path):
+    """ Validate a file incrementally and in full, then change the name of its first individual and do it again,
+    and again after each of the edits
+
+    :returns: lines, seconds of a full run, seconds to revalidate after the change, and the stories that differ
+    :rtype: tuple
+
+    """
+    g = File()
+    g.read_file(path)
+    validator = incremental.Validator(g)
+    validator.validate()
+    full, differ = differences(g, validator)
+
+    name = g.query(tag="NAME", parent_tag="INDI").first()
+    revalidate = 0
+    if name is not None:
+        g.update_line(name, line_value="{0} Changed /{1}/".format(*((name.val or "").replace("/", " ").split() +
+                                                                   ["Unknown", "Unknown"])[:2]))
+        revalidate, _ = timed(validator.revalidate)
+        _, changed = differences(g, validator)
+        differ = sorted(set(differ) | set(changed))
+        for edit in edits(g):
+            edit()
+            validator.revalidate()
+            _, changed = differences(g, validator)
+            differ = sorted(set(differ) | set(changed))
+    return len(g.lines), full, revalidate, differ
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("files", nargs="*", help="GEDCOM files, defaults to every file in Test_Files")
+    arg_parser.add_argument("--sizes", default="2000", help="comma separated numbers of individuals of synthetic "
+                                                             "files to check too, blank for none")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    # Only check the stories, not writing their output
+    stories.logger.setLevel(logging.CRITICAL)
+    stories.profiler.enabled = False
+
+    paths = [(p, p) for p in args.files or sorted(glob.glob(os.path.join(ROOT, "Test_Files", "*.ged")))]
+    temporary = []
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        fd, path = tempfile.mkstemp(suffix=".ged")
+        os.close(fd)
+        synthetic.write_gedcom(path, individuals=size, errors=0.01, seed=args.seed)
+        temporary.append(path)
+        paths.append(("synthetic {0} individuals".format(size), path))
+
+    failed = False
+    try:
+        for name, path in paths:
+            lines, full, revalidate, differ = check(path)
+            failed = failed or bool(differ)
+            print "{0}: {1} lines, full run {2:.3f}s, revalidate {3:.3f}s, {4}".format(
+                os.path.basename(name), lines, full, revalidate, "differ: " + ", ".join(differ) if differ else "same")
+    finally:
+        for path in temporary:
+            os.remove(path)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
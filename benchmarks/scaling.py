@@ -0,0 +1,104 @@
+"""
+Scaling Benchmark Suite
+
+Generates synthetic GEDCOM files of increasing size and times parsing, the summaries and each story on them,
+then writes a JSON report.
+
+Usage: python benchmarks/scaling.py [--sizes 1000,3000,10000] [--report Test_Results/benchmark.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stories
+import synthetic
+from gedcom.parser import File
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+
+def timed(func, *args, **kwargs):
+    """ Call a function and time it
+
+    :returns: the seconds taken and the value returned
+    :rtype: tuple
+
+    """
+    start = time.time()
+    value = func(*args, **kwargs)
+    return time.time() - start, value
+
+
+def benchmark(individuals, generations=6, remarriage=0.2, errors=0.01, seed=0):
+    """ Time parsing, summaries and every story on one synthetic file
+
+    :param individuals: size of the synthetic file
+    :type individuals: int
+
+    :returns: timings in seconds, and the failures found by each story
+    :rtype: dict
+
+    """
+    fd, path = tempfile.mkstemp(suffix=".ged")
+    os.close(fd)
+    try:
+        generate, generated = timed(synthetic.write_gedcom, path, individuals=individuals, generations=generations,
+                                    remarriage=remarriage, errors=errors, seed=seed)
+        g = File()
+        parse, _ = timed(g.read_file, path)
+    finally:
+        os.remove(path)
+
+    r = {"individuals": generated["individuals"], "families": generated["families"], "lines": len(g.lines),
+         "injected": generated["injected"], "generate": generate, "parse": parse,
+         "summaries": {}, "stories": {}, "failed": {}}
+    r["summaries"]["individuals"], _ = timed(stories.individual_summary, g)
+    r["summaries"]["families"], _ = timed(stories.family_summary, g)
+    for story in stories.STORIES:
+        seconds, result = timed(story, g)
+        r["stories"][story.__name__] = seconds
+        r["failed"][story.__name__] = len(result["output"]["failed"])
+    return r
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--sizes", default="1000,3000", help="comma separated numbers of individuals")
+    arg_parser.add_argument("--generations", type=int, default=6)
+    arg_parser.add_argument("--remarriage", type=float, default=0.2)
+    arg_parser.add_argument("--errors", type=float, default=0.01)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--max-seconds", type=float, default=600,
+                            help="stop before larger sizes once a size takes longer than this")
+    arg_parser.add_argument("--report", default="Test_Results/benchmark.json")
+    args = arg_parser.parse_args()
+
+    # Only time the stories, not writing their output
+    stories.logger.setLevel(logging.CRITICAL)
+
+    report = {"python": platform.python_version(), "platform": platform.platform(), "runs": []}
+    for size in (int(s) for s in args.sizes.split(",")):
+        total, run = timed(benchmark, size, args.generations, args.remarriage, args.errors, args.seed)
+        run["total"] = total
+        report["runs"].append(run)
+        print "{0:>9} individuals {1:>10} lines  parse {2:8.2f}s  summaries {3:8.2f}s  stories {4:8.2f}s".format(
+            run["individuals"], run["lines"], run["parse"], sum(run["summaries"].values()),
+            sum(run["stories"].values()))
+        if total > args.max_seconds:
+            print "Stopping, {0} individuals took longer than {1}s".format(size, args.max_seconds)
+            break
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, sort_keys=True, indent=4, separators=(',', ': '))
+    print "Successfully saved report to {0}".format(args.report)
+
+
+if __name__ == "__main__":
+    main()
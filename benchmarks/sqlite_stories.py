@@ -0,0 +1,71 @@
+"""
+Benchmark of the SQL stories against the object model stories
+
+Exports synthetic GEDCOM files into SQLite, then times each story in sql_stories.py and the object model story of
+the same name, checking both report the same results.
+
+Usage: python benchmarks/sqlite_stories.py [--sizes 300,1000] [--repeat 3]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sql_stories
+import stories
+import synthetic
+from gedcom.parser import File
+from scaling import timed
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+
+def compare(individuals, repeat=3, seed=0):
+    """ Time the SQL and object model stories on one synthetic file
+
+    :returns: the lines of the file, the export time, and (story, object model time, SQL time, same results)
+    for each SQL story
+    :rtype: tuple
+
+    """
+    fd, path = tempfile.mkstemp(suffix=".ged")
+    os.close(fd)
+    try:
+        synthetic.write_gedcom(path, individuals=individuals, errors=0.01, seed=seed)
+        g = File()
+        g.read_file(path)
+    finally:
+        os.remove(path)
+
+    export, connection = timed(g.to_sqlite)
+    r = []
+    for sql_story in sql_stories.SQL_STORIES:
+        object_story = getattr(stories, sql_story.__name__)
+        # The object model caches on its Individual and Family objects, which are rebuilt on every call
+        object_time, object_result = min(timed(object_story, g) for _ in range(repeat))
+        sql_time, sql_result = min(timed(sql_story, connection) for _ in range(repeat))
+        r.append((sql_story, object_time, sql_time, object_result == sql_result))
+    return len(g.lines), export, r
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--sizes", default="300,1000", help="comma separated numbers of individuals")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    stories.logger.setLevel(logging.CRITICAL)
+    stories.profiler.enabled = False
+    for size in (int(s) for s in args.sizes.split(",")):
+        lines, export, r = compare(size, args.repeat)
+        print "{0} individuals ({1} lines), export {2:.3f}s".format(size, lines, export)
+        for story, object_time, sql_time, same in r:
+            print "    {0:<46} object {1:8.3f}s  sql {2:8.3f}s  {3}".format(
+                "{0}: {1}".format(story.id, story.__name__), object_time, sql_time, "same" if same else "DIFFERENT")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Startup Benchmark
+
+Times importing the gedcom package, the parser and the stories, and starting the command line program, each in a
+new interpreter, and checks each against a budget. The time of starting an interpreter that imports nothing is
+subtracted, so the budgets only cover this project's own startup. Exits with status 1 if any budget is exceeded, so
+it can run as a check in a job scheduler's pipeline.
+
+Usage: python benchmarks/startup.py [--repeat 20] [--scale 1.0]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "SSW555-GEDCOM_Project-Team02.py")
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+TARGETS = [("import gedcom", ["-c", "import gedcom"], 5.0),
+           ("import gedcom.parser", ["-c", "import gedcom.parser"], 12.0),
+           ("import stories", ["-c", "import stories"], 16.0),
+           ("cli --help", [MAIN, "--help"], 50.0)]
+"""list: (name, interpreter arguments, budget in milliseconds) of each startup timed."""
+
+
+def startup(args, repeat=20):
+    """ Time starting a new interpreter with arguments, from this project's directory
+
+    :returns: median seconds
+    :rtype: float
+
+    """
+    times = []
+    with open(os.devnull, "w") as devnull:
+        for _ in range(repeat):
+            start = time.time()
+            subprocess.check_call([sys.executable] + args, cwd=ROOT, stdout=devnull)
+            times.append(time.time() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    arg_parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, for slower machines")
+    args = arg_parser.parse_args()
+
+    baseline = startup(["-c", "pass"], args.repeat)
+    print "interpreter {0:.1f}ms".format(baseline * 1000)
+    over = 0
+    for name, target, budget in TARGETS:
+        ms = max(0.0, startup(target, args.repeat) - baseline) * 1000
+        ok = ms <= budget * args.scale
+        over += not ok
+        print "    {0:<24} {1:6.1f}ms  budget {2:5.1f}ms  {3}".format(name, ms, budget * args.scale,
+                                                                    "ok" if ok else "OVER")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Synthetic GEDCOM Generator
+
+Writes realistic family trees of any size for benchmarking. The same arguments always write the same file.
+
+The tree is grown one generation at a time from founder couples: children are born to each family, marry people
+from outside the tree, and may remarry after a divorce or the death of a spouse. Only two generations are kept in
+memory, so very large trees can be written straight to disk. Errors matching the anomalies checked by US01 - US24
+can be injected at a given rate, and long notes split over CONC and CONT lines can be added to individuals.
+
+Usage: python benchmarks/synthetic.py output.ged [individuals] [generations] [remarriage] [errors] [seed] [notes]
+"""
+import json
+import random
+import sys
+from collections import Counter
+from datetime import date
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+TODAY = date(2020, 1, 1).toordinal()
+"""int: Date ordinal trees are grown up to by default. It is fixed rather than the current date, so the same
+arguments write the same file on any day."""
+
+YEAR = 365
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+SURNAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Miller", "Davis", "Wilson", "Anderson", "Taylor",
+            "Thomas", "Moore", "Martin", "Jackson", "Thompson", "White", "Harris", "Clark", "Lewis", "Robinson",
+            "Walker", "Young", "Allen", "King", "Wright", "Scott", "Green", "Baker", "Adams", "Nelson"]
+MALE_NAMES = ["James", "John", "Robert", "Michael", "William", "David", "Richard", "Joseph", "Thomas", "Charles",
+              "Daniel", "Matthew", "Anthony", "Mark", "Paul", "Steven", "Andrew", "Kenneth", "George", "Edward"]
+FEMALE_NAMES = ["Mary", "Patricia", "Jennifer", "Linda", "Elizabeth", "Barbara", "Susan", "Jessica", "Sarah", "Karen",
+                "Nancy", "Lisa", "Margaret", "Betty", "Sandra", "Ashley", "Dorothy", "Emily", "Donna", "Michelle"]
+
+ERRORS = ["US01", "US02", "US03", "US04", "US05", "US06", "US07", "US08", "US09", "US10", "US11", "US12",
+          "US13", "US14", "US15", "US16", "US17", "US18", "US19", "US20", "US21", "US22", "US23", "US24"]
+"""list: The stories errors can be injected for."""
+
+WORDS = ["born", "farm", "moved", "village", "church", "records", "census", "married", "worked", "mill", "letter",
+         "family", "emigrated", "returned", "years", "later", "house", "river", "school", "served", "army", "buried"]
+NOTE_LINE_LENGTH = 200
+"""int: Characters of a note value written on each line before it is continued with CONC."""
+
+
+def date_string(ordinal):
+    """ Format a date ordinal as a GEDCOM date, e.g. "1 JAN 1900" """
+    d = date.fromordinal(ordinal)
+    return "{0} {1} {2}".format(d.day, MONTHS[d.month - 1], d.year)
+
+
+class Person(object):
+    __slots__ = ("id", "sex", "given", "surname", "birth", "death", "famc", "fams", "parents")
+
+    def __init__(self, id_, sex, given, surname, birth, death, famc=None, parents=None):
+        self.id, self.sex, self.given, self.surname = id_, sex, given, surname
+        self.birth, self.death, self.famc, self.fams = birth, death, famc, []
+        self.parents = parents  # (father, mother) for people born in the tree
+
+
+class Family(object):
+    __slots__ = ("id", "husb", "wife", "marr", "div", "chil")
+
+    def __init__(self, id_, husb, wife, marr, div):
+        self.id, self.husb, self.wife, self.marr, self.div, self.chil = id_, husb, wife, marr, div, []
+
+    @property
+    def end(self):
+        """ Date the marriage ended (divorce or first death), None if it has not ended """
+        ends = [d for d in (self.div, self.husb.death, self.wife.death) if d is not None]
+        return min(ends) if ends else None
+
+
+class Tree(object):
+    """ Synthetic Family Tree Writer
+
+    :Example:
+        with open("big.ged", "w") as f:
+            print Tree(individuals=100000, errors=0.01).write(f)
+
+    """
+
+    def __init__(self, individuals=1000, generations=6, remarriage=0.2, errors=0.0, seed=0, start_year=1800,
+                 notes=0.0, today=TODAY):
+        """ Initiate Tree
+
+        :param individuals: number of individuals to write
+        :type individuals: int
+
+        :param generations: number of generations the individuals are spread over
+        :type generations: int
+
+        :param remarriage: chance someone remarries after a divorce or the death of their spouse
+        :type remarriage: float
+
+        :param errors: chance of injecting each applicable error at each individual, family or birth
+        :type errors: float
+
+        :param seed: random seed
+        :type seed: int
+
+        :param start_year: birth year of the founders
+        :type start_year: int
+
+        :param notes: chance each individual has a note of a few paragraphs, written over CONC and CONT lines
+        :type notes: float
+
+        :param today: date ordinal the tree is grown up to, no one is born, marries, divorces or dies after it
+        :type today: int
+
+        """
+        self.individuals, self.generations = individuals, generations
+        self.remarriage, self.errors, self.notes = remarriage, errors, notes
+        self.random = random.Random(seed)
+        self.start = date(start_year, 1, 1).toordinal()
+        self.today = today
+        self.people, self.families = 0, 0
+        self.injected = Counter()
+        self.out = None
+
+    def error(self, story_id):
+        """ Decide whether to inject an error for a story here """
+        if self.errors and self.random.random() < self.errors:
+            self.injected[story_id] += 1
+            return True
+        return False
+
+    def full(self):
+        return self.people >= self.individuals
+
+    def person(self, sex, birth, surname=None, famc=None, parents=None):
+        """ Create a person, deciding when they die """
+        self.people += 1
+        r = self.random
+        given = r.choice(MALE_NAMES if sex == "M" else FEMALE_NAMES)
+        lifespan = int(r.triangular(1, 100, 80) * YEAR)
+        death = birth + lifespan if birth + lifespan < self.today else None
+        return Person(self.people, sex, given, surname or r.choice(SURNAMES), birth, death, famc, parents)
+
+    def family(self, husb, wife, marr, div=None):
+        """ Create a family for a married couple """
+        self.families += 1
+        fam = Family(self.families, husb, wife, marr, div)
+        husb.fams.append(fam)
+        wife.fams.append(fam)
+        return fam
+
+    def marry(self, person, spouse=None, start=None):
+        """ Marry a person, and maybe remarry them after the marriage ends
+
+        :returns: list of the outside spouses created and the families
+        :rtype: tuple
+
+        """
+        r = self.random
+        spouses, families = [], []
+        start = start or person.birth + int(r.uniform(18, 35) * YEAR)
+        while not self.full() and start < self.today and (person.death is None or start < person.death):
+            if spouse is None:
+                other = "F" if person.sex == "M" else "M"
+                spouse = self.person(other, person.birth + int(r.uniform(-5, 5) * YEAR))
+                spouses.append(spouse)
+            husb, wife = (person, spouse) if person.sex == "M" else (spouse, person)
+            div = start + int(r.uniform(1, 20) * YEAR) if r.random() < 0.15 else None
+            fam = self.family(husb, wife, start, div if div is not None and div < self.today else None)
+            families.append(fam)
+            if self.error("US11"):
+                # Marry someone else before this marriage ends
+                start = start + int(r.uniform(0.1, 1) * YEAR)
+            elif fam.end is not None and r.random() < self.remarriage:
+                start = fam.end + int(r.uniform(1, 5) * YEAR)
+            else:
+                break
+            spouse = None
+        return spouses, families
+
+    def children(self, fam):
+        """ Create the children of a family """
+        r = self.random
+        count = r.choice([0, 1, 2, 2, 2, 3, 3, 4, 5])
+        if self.error("US15"):
+            count = 15
+        born = []
+        birth = fam.marr + int(r.uniform(0.8, 3) * YEAR)
+        multiple = 6 if self.error("US14") else 1
+        # Children are born before the mother dies or turns 45
+        last_birth = min(fam.wife.birth + 45 * YEAR, fam.wife.death or self.today, self.today)
+        while len(born) < count and birth < last_birth and not self.full():
+            actual = birth
+            if self.error("US08"):
+                actual = fam.marr - int(r.uniform(0.1, 2) * YEAR)
+            elif fam.wife.death is not None and self.error("US09"):
+                actual = fam.wife.death + int(r.uniform(0.1, 0.5) * YEAR)
+            elif self.error("US12"):
+                actual = fam.wife.birth + int(r.uniform(61, 70) * YEAR)
+            for _ in range(multiple):
+                sex = r.choice("MF")
+                child = self.person(sex, actual, fam.husb.surname, fam, (fam.husb, fam.wife))
+                fam.chil.append(child)
+                born.append(child)
+            multiple = 1
+            birth = actual + int((r.uniform(0.3, 0.6) if self.error("US13") else r.uniform(1, 4)) * YEAR)
+        return born
+
+    def note(self):
+        """ Write a note of a few paragraphs as a NOTE line and its CONT and CONC lines """
+        r = self.random
+        lines = []
+        for paragraph in range(r.randint(1, 4)):
+            text = " ".join(r.choice(WORDS) for _ in range(r.randint(20, 120)))
+            # Split mid word, as exporters do, so joining needs no separator
+            chunks = [text[i:i + NOTE_LINE_LENGTH] for i in range(0, len(text), NOTE_LINE_LENGTH)]
+            lines.append("{0} {1}".format("1 NOTE" if paragraph == 0 else "2 CONT", chunks[0]))
+            lines += ["2 CONC {0}".format(c) for c in chunks[1:]]
+        return lines
+
+    def write_person(self, p):
+        """ Write an INDI record, injecting person errors """
+        r = self.random
+        birth, death, surname, sex = p.birth, p.death, p.surname, p.sex
+        if self.error("US01"):
+            # Far enough ahead to still be after the current date whenever the file is checked
+            birth = self.today + int(r.uniform(100, 110) * YEAR)
+        elif death is not None and self.error("US03"):
+            death = birth - int(r.uniform(1, 10) * YEAR)
+        elif self.error("US07"):
+            birth = (death or self.today) - int(r.uniform(151, 170) * YEAR)
+        if sex == "M" and p.famc is not None and self.error("US16"):
+            surname = r.choice([s for s in SURNAMES if s != surname])
+        lines = ["0 @I{0}@ INDI".format(p.id), "1 NAME {0} /{1}/".format(p.given, surname), "1 SEX {0}".format(sex),
+                 "1 BIRT", "2 DATE {0}".format(date_string(birth))]
+        if death is not None:
+            lines += ["1 DEAT Y", "2 DATE {0}".format(date_string(death))]
+        lines += ["1 FAMS @F{0}@".format(f.id) for f in p.fams]
+        if p.famc is not None:
+            lines.append("1 FAMC @F{0}@".format(p.famc.id))
+        if self.notes and r.random() < self.notes:
+            lines += self.note()
+        if self.error("US22"):
+            # Another individual with the same xref
+            lines += ["0 @I{0}@ INDI".format(p.id), "1 NAME {0} /{1}/".format(r.choice(MALE_NAMES), surname)]
+        if self.error("US23"):
+            # Another individual with the same name and birth date
+            self.people += 1
+            lines += ["0 @I{0}@ INDI".format(self.people), "1 NAME {0} /{1}/".format(p.given, surname),
+                      "1 SEX {0}".format(sex), "1 BIRT", "2 DATE {0}".format(date_string(birth))]
+        self.out.write("\n".join(lines) + "\n")
+
+    def write_family(self, f):
+        """ Write a FAM record, injecting family errors """
+        r = self.random
+        husb, wife, marr, div = f.husb, f.wife, f.marr, f.div
+        if self.error("US02"):
+            marr = husb.birth - int(r.uniform(1, 5) * YEAR)
+        elif self.error("US10"):
+            marr = wife.birth + int(r.uniform(8, 13) * YEAR)
+        elif div is not None and self.error("US04"):
+            div = marr - int(r.uniform(1, 5) * YEAR)
+        elif husb.death is not None and self.error("US05"):
+            marr = husb.death + int(r.uniform(1, 5) * YEAR)
+        elif wife.death is not None and self.error("US06"):
+            div = wife.death + int(r.uniform(1, 5) * YEAR)
+        if self.error("US21"):
+            husb, wife = wife, husb
+        lines = ["0 @F{0}@ FAM".format(f.id), "1 HUSB @I{0}@".format(husb.id), "1 WIFE @I{0}@".format(wife.id),
+                 "1 MARR", "2 DATE {0}".format(date_string(marr))]
+        if div is not None:
+            lines += ["1 DIV", "2 DATE {0}".format(date_string(div))]
+        lines += ["1 CHIL @I{0}@".format(c.id) for c in f.chil]
+        if self.error("US24"):
+            # Another family with the same spouses and marriage date
+            self.families += 1
+            lines += ["0 @F{0}@ FAM".format(self.families), "1 HUSB @I{0}@".format(husb.id),
+                      "1 WIFE @I{0}@".format(wife.id), "1 MARR", "2 DATE {0}".format(date_string(marr))]
+        self.out.write("\n".join(lines) + "\n")
+
+    def relative(self, person, story_id):
+        """ Find a relative of a person to marry for the kinship errors, None if there is none """
+        r = self.random
+        if person.parents is None:
+            return None
+        father, mother = person.parents
+        if story_id == "US17":
+            candidates = [father if person.sex == "F" else mother]
+        elif story_id == "US18":
+            candidates = [c for c in person.famc.chil if c is not person and c.fams == []]
+        elif story_id == "US19":
+            aunts_and_uncles = [c for p in (father, mother) if p.famc is not None for c in p.famc.chil if c is not p]
+            candidates = [c for a in aunts_and_uncles for f in a.fams for c in f.chil if not c.fams]
+        else:
+            candidates = [c for p in (father, mother) if p.famc is not None for c in p.famc.chil if c is not p]
+        candidates = [c for c in candidates if c.sex != person.sex]
+        return r.choice(candidates) if candidates else None
+
+    def write(self, out):
+        """ Write the tree as a GEDCOM file
+
+        :param out: file object to write to
+        :type out: file
+
+        :returns: numbers of individuals, families and injected errors by story
+        :rtype: dict
+
+        """
+        r = self.random
+        self.out = out
+        out.write("0 HEAD\n1 SOUR synthetic\n1 GEDC\n2 VERS 5.5.1\n2 FORM LINEAGE-LINKED\n1 CHAR UTF-8\n")
+        # Each founder couple grows to roughly 3.5 individuals per generation
+        founders = max(1, self.individuals // (self.generations * 7 // 2 or 1))
+        people, families = [], []
+        for _ in range(founders):
+            if self.full():
+                break
+            husb = self.person("M", self.start + r.randint(0, 10 * YEAR))
+            spouses, fams = self.marry(husb)
+            people += [husb] + spouses
+            families += fams
+        for p in people:
+            self.write_person(p)
+
+        while families:
+            born = [c for fam in families for c in self.children(fam)]
+            for fam in families:
+                self.write_family(fam)
+            people, families = [], []
+            for child in born:
+                spouse = None
+                for story_id in ("US17", "US18", "US19", "US20"):
+                    if spouse is None and self.errors and r.random() < self.errors:
+                        spouse = self.relative(child, story_id)
+                        if spouse is not None:
+                            self.injected[story_id] += 1
+                spouses, fams = self.marry(child, spouse)
+                people += [child] + spouses
+                families += fams
+            for p in people:
+                self.write_person(p)
+
+        out.write("0 TRLR\n")
+        return {"individuals": self.people, "families": self.families, "injected": dict(self.injected)}
+
+
+def write_gedcom(filename, **kwargs):
+    """ Write a synthetic GEDCOM file
+
+    :param filename: file to write
+    :type filename: str
+
+    :param kwargs: arguments for Tree
+
+    :returns: numbers of individuals, families and injected errors by story
+    :rtype: dict
+
+    """
+    with open(filename, "w") as f:
+        return Tree(**kwargs).write(f)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__.strip().splitlines()[-1])
+    args = dict(zip(["individuals", "generations", "remarriage", "errors", "seed", "notes"], sys.argv[2:]))
+    types = {"individuals": int, "generations": int, "remarriage": float, "errors": float, "seed": int,
+             "notes": float}
+    print json.dumps(write_gedcom(sys.argv[1], **dict((k, types[k](v)) for k, v in args.items())), sort_keys=True)
@@ -0,0 +1,68 @@
+"""
+Benchmark of Upcoming Birthday Queries
+
+Indexes random birth dates by the day of the year with gedcom.dayindex.DayIndex, and times building the index and
+querying the birthdays of the next days from every day of a year, including the queries wrapping past the end of
+the year, against checking every date for each query.
+
+Usage: python benchmarks/upcoming.py [--sizes 10000,1000000] [--days 30]
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gedcom.dayindex import DayIndex, day_of_year
+from scaling import timed
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+FIRST = date(1900, 1, 1).toordinal()
+LAST = date(2020, 12, 31).toordinal()
+
+
+def scan(dates, today, days):
+    """ The ids with a birthday in the next days, checking every date """
+    first, last = day_of_year(today), day_of_year(today + days - 1)
+    if first <= last:
+        return [i for day, i in dates if first <= day <= last]
+    return [i for day, i in dates if day >= first or day <= last]
+
+
+def benchmark(size, days=30, seed=0):
+    """ Build an index of random birth dates and query it from every day of a year
+
+    :returns: seconds to build, mean seconds per query, mean ids per query, and seconds of one scan
+    :rtype: tuple
+
+    """
+    rng = random.Random(seed)
+    dates = [(rng.randint(FIRST, LAST), i) for i in xrange(size)]
+    build, index = timed(DayIndex, dates)
+    start = date(2023, 1, 1).toordinal()
+    found = 0
+    query, _ = timed(lambda: [index.upcoming(today, days) for today in xrange(start, start + 365)])
+    for today in (start, start + 350):
+        found += len(index.upcoming(today, days))
+    by_day = [(day_of_year(o), i) for o, i in dates]
+    one_scan, _ = timed(scan, by_day, start + 350, days)
+    return build, query / 365, found / 2, one_scan
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--sizes", default="10000,1000000", help="comma separated numbers of birth dates")
+    arg_parser.add_argument("--days", type=int, default=30, help="days ahead each query looks")
+    args = arg_parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        build, query, found, one_scan = benchmark(size, args.days)
+        print "{0} dates: build {1:.2f}s, query {2:.3f}ms ({3} birthdays), scan {4:.1f}ms".format(
+            size, build, query * 1000, found, one_scan * 1000)
+
+
+if __name__ == "__main__":
+    main()
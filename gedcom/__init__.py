@@ -1,4 +1,42 @@
-from parser import File
-import parser
-import tag
-import tools
+""" GEDCOM Package
+
+The submodules, and File and aload, are imported the first time they are used (e.g. gedcom.File or gedcom.tag), so
+importing the package is cheap for a program that starts often or only needs part of it.
+
+"""
+import importlib
+import sys
+import types
+
+SUBMODULES = ("ages", "background", "database", "dayindex", "kinship", "parser", "status", "tag", "timeline",
+              "tools")
+"""tuple: Submodules imported when first used as attributes of the package."""
+
+ATTRIBUTES = {"File": "parser", "aload": "background"}
+"""dict: Names the package provides from its submodules, and the submodule each is imported from."""
+
+
+class LazyPackage(types.ModuleType):
+    """ Package module importing its submodules when one of them, or a name from one of them, is first used """
+
+    def __init__(self, module):
+        types.ModuleType.__init__(self, module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+        # Keep the module this replaces, Python 2 clears the globals of a module once nothing refers to it
+        self.__module = module
+
+    def __getattr__(self, name):
+        if name in ATTRIBUTES:
+            value = getattr(importlib.import_module("." + ATTRIBUTES[name], self.__name__), name)
+        elif name in SUBMODULES:
+            value = importlib.import_module("." + name, self.__name__)
+        else:
+            raise AttributeError("module {0!r} has no attribute {1!r}".format(self.__name__, name))
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(SUBMODULES) | set(ATTRIBUTES))
+
+
+sys.modules[__name__] = LazyPackage(sys.modules[__name__])
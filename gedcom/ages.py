@@ -0,0 +1,248 @@
+""" Ages of Individuals and Spouses
+
+This module computes the ages the stories check for every individual and family at once: the age at death, the
+current age, and the age of each spouse at marriage. The birth, death and marriage dates are read once into columns
+of date ordinals, and the ages are computed from the columns in one pass, instead of by a tag.Individual or
+tag.Family per individual and family.
+
+Individuals and families are given integer ids, their position in the file, and every column is indexed by id:
+
+    ages = gedcom_file.ages
+    i = ages.individual_ids[line_number]
+    print ages.birth[i], ages.age[i]
+
+:note: NumPy is not a dependency of this project, so the columns are arrays of the array module and the pass is a
+Python loop over them. A missing date is MISSING, and an age that can not be computed is NaN (see known).
+
+"""
+from array import array
+from datetime import time
+
+# tools imports parser, which imports tag, so importing tools first lets this module be imported before the others
+import tools
+import tag
+
+__author__ = "Constantine Davantzis"
+
+MISSING = 0
+"""int: The ordinal of a missing date, date ordinals start at 1."""
+
+NONE = -1
+"""int: The id of a missing individual, e.g. of a family without a husband."""
+
+NAN = float("nan")
+
+
+def known(value):
+    """ Whether an age was computed, False for NaN
+
+    :rtype: bool
+
+    """
+    return value == value
+
+
+def first_child(lines, line, tag_name):
+    """ The first child of a line with a tag, the same line line.children.find_one would return, None if none """
+    for n in line["children_line_numbers"]:
+        if lines[n]["tag"] == tag_name:
+            return lines[n]
+    return None
+
+
+def event_ordinal(lines, line, event):
+    """ The date ordinal of the first DATE of the first event of a line with a tag, MISSING if there is none
+
+    :raises ValueError: if the date is not in a supported format, as tag.Date.dt does
+
+    """
+    event_line = first_child(lines, line, event)
+    date = first_child(lines, event_line, "DATE") if event_line is not None else None
+    return tools.date_ordinal(date.get("line_value")) if date is not None else MISSING
+
+
+class Ages(object):
+    """ Date columns and ages of every individual and family of a GEDCOM file
+
+    :ivar individuals: The INDI lines, the id of an individual is its position in this list. For a SubFile, the
+    individuals its families link to follow its own, as they are usually in other records of the File.
+    :ivar families: The FAM lines, the id of a family is its position in this list
+    :ivar individual_ids: Dictionary of INDI line number to id
+    :ivar family_ids: Dictionary of FAM line number to id
+
+    :ivar birth: Birth date ordinal of each individual
+    :ivar death: Death date ordinal of each individual
+    :ivar deceased: 1 for each individual with a DEAT record, dated or not, else 0
+    :ivar marriage: Marriage date ordinal of each family
+    :ivar divorce: Divorce date ordinal of each family
+    :ivar divorced: 1 for each family with a DIV record, dated or not, else 0
+    :ivar husband: Individual id of the husband of each family
+    :ivar wife: Individual id of the wife of each family
+    :ivar children: Individual ids of the children of every family, the children of family f are
+    children[children_start[f]:children_start[f + 1]]
+    :ivar children_start: Where the children of each family start in children
+
+    :ivar age_at_death: Years from birth to death of each individual
+    :ivar current_age: Years from birth to now of each individual
+    :ivar age: Age at death, or current age if not dead, of each individual, as tag.Individual.age
+    :ivar husband_marriage_age: Years from the husband's birth to the marriage of each family
+    :ivar wife_marriage_age: Years from the wife's birth to the marriage of each family
+
+    """
+
+    def __init__(self, gedcom_file):
+        """ Read the date columns of a GEDCOM file and compute every age
+
+        :param gedcom_file: The GEDCOM File to compute the ages of
+        :type gedcom_file: parser.File
+
+        """
+        self.individuals = list(gedcom_file.find("tag", "INDI"))
+        self.families = list(gedcom_file.find("tag", "FAM"))
+        if gedcom_file.root is not gedcom_file:
+            known_lines = set(line["line_number"] for line in self.individuals)
+            for line in gedcom_file.find("tag", "FAM"):
+                for link in line.children:
+                    target = link.follow_xref() if link.tag in ("HUSB", "WIFE", "CHIL") else None
+                    if target is not None and target["tag"] == "INDI" and target["line_number"] not in known_lines:
+                        known_lines.add(target["line_number"])
+                        self.individuals.append(target)
+        self.individual_ids = dict((line["line_number"], i) for i, line in enumerate(self.individuals))
+        self.family_ids = dict((line["line_number"], f) for f, line in enumerate(self.families))
+        self.now = gedcom_file.now
+
+        self.birth, self.death, self.deceased = array("l"), array("l"), array("b")
+        for line in self.individuals:
+            lines = line.file.lines
+            self.birth.append(event_ordinal(lines, line, "BIRT"))
+            self.death.append(event_ordinal(lines, line, "DEAT"))
+            self.deceased.append(first_child(lines, line, "DEAT") is not None)
+
+        self.marriage, self.divorce, self.husband, self.wife = array("l"), array("l"), array("l"), array("l")
+        self.children, self.children_start, self.divorced = array("l"), array("l", [0]), array("b")
+        for line in self.families:
+            lines = line.file.lines
+            self.marriage.append(event_ordinal(lines, line, "MARR"))
+            self.divorce.append(event_ordinal(lines, line, "DIV"))
+            self.divorced.append(first_child(lines, line, "DIV") is not None)
+            self.husband.append(self.linked(first_child(lines, line, "HUSB")))
+            self.wife.append(self.linked(first_child(lines, line, "WIFE")))
+            self.children.extend(self.linked(lines[n]) for n in line["children_line_numbers"]
+                                 if lines[n]["tag"] == "CHIL")
+            self.children_start.append(len(self.children))
+
+        self.compute()
+
+    def linked(self, line):
+        """ The id of the individual a line links to, NONE if it is None or links to no individual """
+        if line is None:
+            return NONE
+        target = line.follow_xref()
+        return self.individual_ids.get(target["line_number"], NONE) if target is not None else NONE
+
+    def compute(self):
+        """ Compute every age from the date columns, in one pass over individuals and one over families
+
+        :note: The date the file is checked against (File.now) has a time of day, and dates are at midnight, so as
+        with tools.years_between the days from a date to now round the part of today that has passed down to a whole
+        day before the date.
+
+        """
+        today = self.now.toordinal() + (1 if self.now.time() != time(0) else 0)
+        years = tools.years_in_days
+        n = len(self.individuals)
+        self.age_at_death, self.current_age, self.age = array("d", [NAN]) * n, array("d", [NAN]) * n, array("d")
+        for i, (birth, death) in enumerate(zip(self.birth, self.death)):
+            if birth != MISSING:
+                self.current_age[i] = years(birth - today)
+                if death != MISSING:
+                    self.age_at_death[i] = years(birth - death)
+            self.age.append(self.age_at_death[i] if death != MISSING else self.current_age[i])
+
+        birth = self.birth
+        self.husband_marriage_age, self.wife_marriage_age = array("d"), array("d")
+        for marriage, husband, wife in zip(self.marriage, self.husband, self.wife):
+            for spouse, ages in ((husband, self.husband_marriage_age), (wife, self.wife_marriage_age)):
+                dated = marriage != MISSING and spouse != NONE and birth[spouse] != MISSING
+                ages.append(years(marriage - birth[spouse]) if dated else NAN)
+
+    def living(self):
+        """ The ids of the individuals who have not died, without a DEAT record
+
+        :rtype: set
+
+        """
+        return set(i for i, deceased in enumerate(self.deceased) if not deceased)
+
+    def children_of(self, f):
+        """ The individual ids of the children of a family, in the order of its CHIL lines
+
+        :param f: The family id
+        :type f: int
+
+        :rtype: array.array
+
+        """
+        return self.children[self.children_start[f]:self.children_start[f + 1]]
+
+    def orphans(self, years=18):
+        """ The living children under an age whose husband and wife parents have both died, in one pass over families
+
+        :param years: The age children must be under
+        :type years: float
+
+        :returns: list of (individual id, family id), each child once, with the first such family it is a child of
+        :rtype: list
+
+        """
+        deceased, current_age, children, start = self.deceased, self.current_age, self.children, self.children_start
+        found, seen = [], set()
+        for f, (husband, wife) in enumerate(zip(self.husband, self.wife)):
+            if husband == NONE or wife == NONE or not deceased[husband] or not deceased[wife]:
+                continue
+            for i in children[start[f]:start[f + 1]]:
+                # An unknown age is NaN, which is not under any age
+                if not deceased[i] and current_age[i] < years and i not in seen:
+                    seen.add(i)
+                    found.append((i, f))
+        return found
+
+    def large_age_differences(self, ratio=2):
+        """ The families whose older spouse was more than ratio times as old as the younger spouse when they married
+
+        :note: Only families with a marriage age of both spouses are checked, and a spouse born on or after the
+        marriage is left to the check of birth before marriage (US02), as the marriage ages are years between dates in
+        either order (see tools.years_in_days).
+
+        :param ratio: How many times as old the older spouse must be
+        :type ratio: float
+
+        :returns: family ids
+        :rtype: list
+
+        """
+        birth, found = self.birth, []
+        ages = zip(self.marriage, self.husband, self.wife, self.husband_marriage_age, self.wife_marriage_age)
+        for f, (marriage, husband, wife, husband_age, wife_age) in enumerate(ages):
+            if not known(husband_age) or not known(wife_age) or max(birth[husband], birth[wife]) >= marriage:
+                continue
+            younger, older = min(husband_age, wife_age), max(husband_age, wife_age)
+            if older > ratio * younger:
+                found.append(f)
+        return found
+
+    def years_apart(self, i, j):
+        """ Years between the births of two individuals, as tools.years_between, NaN if either has no birth date
+
+        :param i: An individual id
+        :type i: int
+
+        :param j: An individual id
+        :type j: int
+
+        :rtype: float
+
+        """
+        if self.birth[i] == MISSING or self.birth[j] == MISSING:
+            return NAN
+        return tools.years_in_days(self.birth[i] - self.birth[j])
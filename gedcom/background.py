@@ -0,0 +1,284 @@
+""" Background Loading
+
+Python 2 has no asyncio or concurrent.futures, so this module provides the same idea for loading GEDCOM files without
+blocking the caller: work is handed to a pool of worker threads, and the caller gets a Future to wait on or to be
+called back from when the work is done.
+
+The pool runs a limited number of calls at once, and only queues a limited number more, so a caller submitting
+faster than the workers finish is made to wait (backpressure) instead of queueing every upload in memory.
+
+:Example:
+    future = gedcom.aload("family.ged")
+    future.add_done_callback(lambda f: handle(f.result()))
+
+"""
+import atexit
+import sys
+import threading
+from Queue import Queue
+
+from parser import File, open_file
+
+__author__ = "Constantine Davantzis"
+
+READ_CHUNK_BYTES = 64 * 1024
+"""int: Bytes read from a file at a time by iter_lines."""
+
+DEFAULT_WORKERS = 4
+"""int: Calls the default executor runs at once."""
+
+DEFAULT_MAX_PENDING = 16
+"""int: Calls the default executor queues before submit waits."""
+
+_STOP = None
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+class Future(object):
+    """ The result of a call running in the background
+
+    :Example:
+        future = executor.submit(func, arg)
+        print future.result(timeout=10)
+
+    """
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__done = False
+        self.__result = None
+        self.__exc_info = None
+        self.__callbacks = []
+
+    def done(self):
+        """ Whether the call has finished, returning or raising
+
+        :rtype: bool
+
+        """
+        with self.__condition:
+            return self.__done
+
+    def result(self, timeout=None):
+        """ Wait for the call to finish and return its value, raising its exception if it raised one
+
+        :param timeout: Most seconds to wait, None to wait until the call finishes
+        :type timeout: float
+
+        :raises RuntimeError: if the call did not finish within the timeout
+
+        """
+        self.__wait(timeout)
+        if self.__exc_info is not None:
+            raise self.__exc_info[0], self.__exc_info[1], self.__exc_info[2]
+        return self.__result
+
+    def exception(self, timeout=None):
+        """ Wait for the call to finish and return the exception it raised, None if it returned
+
+        :param timeout: Most seconds to wait, None to wait until the call finishes
+        :type timeout: float
+
+        """
+        self.__wait(timeout)
+        return self.__exc_info[1] if self.__exc_info is not None else None
+
+    def add_done_callback(self, func):
+        """ Call a function with this Future once the call finishes, straight away if it already has
+
+        :note: The function is called in the worker thread that finished the call.
+
+        """
+        with self.__condition:
+            if not self.__done:
+                self.__callbacks.append(func)
+                return
+        func(self)
+
+    def set_result(self, result):
+        """ Finish with a value, called by the executor """
+        self.__finish(result, None)
+
+    def set_exc_info(self, exc_info):
+        """ Finish with the exception of sys.exc_info(), called by the executor """
+        self.__finish(None, exc_info)
+
+    def __wait(self, timeout):
+        with self.__condition:
+            if not self.__done:
+                self.__condition.wait(timeout)
+            if not self.__done:
+                raise RuntimeError("The call did not finish within {0} seconds".format(timeout))
+
+    def __finish(self, result, exc_info):
+        with self.__condition:
+            self.__result, self.__exc_info, self.__done = result, exc_info, True
+            self.__condition.notify_all()
+            callbacks, self.__callbacks = self.__callbacks, []
+        for func in callbacks:
+            func(self)
+
+
+class Executor(object):
+    """ Pool of worker threads running calls in the background
+
+    At most workers calls run at once, and at most max_pending more wait in the queue, submit blocks until there is
+    room for another.
+
+    :note: The story functions are pure Python, so threads let loading and validating overlap with the caller and
+    with reading other files, but do not run them on several cores at once. Use processes (see run_batch in the main
+    script) to use every core.
+
+    :Example:
+        with Executor(workers=2) as executor:
+            futures = [aload(path, executor) for path in paths]
+            files = [f.result() for f in futures]
+
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        """ Initiate Executor
+
+        :param workers: Calls run at once
+        :type workers: int
+
+        :param max_pending: Calls queued before submit waits, 0 for no limit
+        :type max_pending: int
+
+        """
+        self.queue = Queue(max_pending)
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self.__run, name="Executor-{0}".format(i))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, func, *args, **kwargs):
+        """ Run a function in a worker thread, waiting while the queue is full
+
+        :returns: the Future of the call
+        :rtype: Future
+
+        """
+        if not self.threads:
+            raise RuntimeError("The executor has been shut down")
+        future = Future()
+        self.queue.put((future, func, args, kwargs))
+        return future
+
+    def shutdown(self, wait=True):
+        """ Stop the worker threads once the calls already submitted have run
+
+        :param wait: Wait for the worker threads to stop
+        :type wait: bool
+
+        """
+        threads, self.threads = self.threads, []
+        for _ in threads:
+            self.queue.put(_STOP)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def __run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            future, func, args, kwargs = item
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                future.set_exc_info(sys.exc_info())
+            else:
+                future.set_result(result)
+
+
+def default_executor():
+    """ The executor used when none is given, created on first use
+
+    :rtype: Executor
+
+    """
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = Executor()
+            # Stop the worker threads before the interpreter is torn down under them
+            atexit.register(_default_executor.shutdown)
+        return _default_executor
+
+
+def iter_lines(f, chunk_bytes=READ_CHUNK_BYTES):
+    """ Iterate over the lines of a file object, reading it a chunk at a time
+
+    The lines are split on newline bytes and keep them, as when iterating over the file object itself, so they can be
+    passed to parser.decode_lines undecoded. A UTF-16 file's newlines are two bytes, so its lines are not split
+    correctly, but they are joined back together whole and decoded there.
+
+    :param f: The file object to read, e.g. from open_file
+    :type f: file
+
+    :param chunk_bytes: Bytes to read at a time
+    :type chunk_bytes: int
+
+    :returns: generator of lines, with their line terminators
+    :rtype: generator
+
+    """
+    rest = ""
+    while True:
+        chunk = f.read(chunk_bytes)
+        if not chunk:
+            break
+        lines = (rest + chunk).split("\n")
+        # The last line may continue in the next chunk
+        rest = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if rest:
+        yield rest
+
+
+def load(filename, chunk_bytes=READ_CHUNK_BYTES):
+    """ Read and parse a GEDCOM file, a chunk at a time
+
+    The lines are decoded as by File.read_file, so every character set it reads is read here as well.
+
+    :param filename: A GEDCOM filename or file path, which may be compressed, see parser.open_file
+    :type filename: str
+
+    :rtype: File
+
+    """
+    f = open_file(filename)
+    try:
+        gedcom_file = File()
+        gedcom_file.read_lines(iter_lines(f, chunk_bytes))
+    finally:
+        f.close()
+    return gedcom_file
+
+
+def aload(filename, executor=None):
+    """ Read and parse a GEDCOM file in a worker thread
+
+    :param filename: A GEDCOM filename or file path, which may be compressed, see parser.open_file
+    :type filename: str
+
+    :param executor: The executor to load with, defaults to default_executor()
+    :type executor: Executor
+
+    :returns: Future of the File
+    :rtype: Future
+
+    """
+    return (executor or default_executor()).submit(load, filename)
@@ -0,0 +1,125 @@
+""" SQLite Export
+
+This module exports a GEDCOM File into an SQLite database, so checks over trees too big for the object model can be
+written as SQL joins.
+
+Records are identified by the line number of their level 0 line (starting at 0), and every row keeps the line number
+(starting at 1) it came from, so results can point back to the file like the object model does.
+
+    * individuals: id, xref, line, name and sex of each INDI record
+    * families: id, xref and line of each FAM record
+    * memberships: individual_id, family_id, tag (FAMS or FAMC from the individual, HUSB, WIFE or CHIL from the
+      family), rank and line of each link between an individual and a family
+    * events: record_id, type (birth, death, marriage or divorce), rank, date (YYYY-MM-DD, NULL if missing or
+      unsupported), value and line of the DATE of each event
+
+rank orders the rows of the same tag or type in a record, the object model uses the first (rank 0) of each.
+
+"""
+import sqlite3
+
+import tools
+
+__author__ = "Constantine Davantzis"
+
+SCHEMA = """
+DROP TABLE IF EXISTS individuals;
+DROP TABLE IF EXISTS families;
+DROP TABLE IF EXISTS memberships;
+DROP TABLE IF EXISTS events;
+CREATE TABLE individuals (id INTEGER PRIMARY KEY, xref TEXT, line INTEGER, name TEXT, sex TEXT);
+CREATE TABLE families (id INTEGER PRIMARY KEY, xref TEXT, line INTEGER);
+CREATE TABLE memberships (individual_id INTEGER, family_id INTEGER, tag TEXT, rank INTEGER, line INTEGER);
+CREATE TABLE events (record_id INTEGER, type TEXT, rank INTEGER, date TEXT, value TEXT, line INTEGER);
+"""
+"""str: Tables of the database, dropped first so a database can be exported into again."""
+
+INDEXES = """
+CREATE INDEX individuals_xref ON individuals (xref);
+CREATE INDEX families_xref ON families (xref);
+CREATE INDEX memberships_individual ON memberships (individual_id, tag, rank);
+CREATE INDEX memberships_family ON memberships (family_id, tag, rank);
+CREATE INDEX events_record ON events (record_id, type, rank);
+CREATE INDEX events_date ON events (type, date);
+"""
+"""str: Indexes created after the rows are inserted."""
+
+EVENT_TYPES = {"INDI": {"BIRT": "birth", "DEAT": "death"}, "FAM": {"MARR": "marriage", "DIV": "divorce"}}
+"""dict: Event tags exported for each record tag, and their event type."""
+
+MEMBERSHIP_TAGS = {"INDI": ("FAMS", "FAMC"), "FAM": ("HUSB", "WIFE", "CHIL")}
+"""dict: Link tags exported as memberships for each record tag."""
+
+
+def iso_date(value):
+    """ Convert a GEDCOM date value to YYYY-MM-DD, None if it is missing or unsupported """
+    try:
+        dt = tools.parse_date(value) if value else None
+    except ValueError:
+        return None
+    # strftime does not support years before 1900 on Python 2
+    return "{0:04d}-{1:02d}-{2:02d}".format(dt.year, dt.month, dt.day) if dt else None
+
+
+def rows(gedcom_file):
+    """ Find the rows of each table in one pass over the records of a file
+
+    :param gedcom_file: The GEDCOM File to export
+    :type gedcom_file: parser.File
+
+    :returns: dictionary of table name to list of rows
+    :rtype: dict
+
+    """
+    r = {"individuals": [], "families": [], "memberships": [], "events": []}
+    for record in gedcom_file.lines:
+        if record["level"] != 0 or record.tag not in EVENT_TYPES:
+            continue
+        first = {}
+        ranks = {}
+        for child in record.children:
+            rank = ranks[child.tag] = ranks.get(child.tag, -1) + 1
+            first.setdefault(child.tag, child)
+            if child.tag in MEMBERSHIP_TAGS[record.tag]:
+                target = child.follow_xref()
+                if target is None:
+                    continue
+                indi, fam = (record, target) if record.tag == "INDI" else (target, record)
+                r["memberships"].append((indi["line_number"], fam["line_number"], child.tag, rank, child.ln))
+            elif child.tag in EVENT_TYPES[record.tag]:
+                date = child.children.find_one("tag", "DATE")
+                r["events"].append((record["line_number"], EVENT_TYPES[record.tag][child.tag], rank,
+                                    iso_date(date.val) if date else None, date.val if date else None,
+                                    date.ln if date else None))
+        if record.tag == "INDI":
+            name, sex = first.get("NAME"), first.get("SEX")
+            r["individuals"].append((record["line_number"], record.get("xref_ID"), record.ln,
+                                     name.val if name else None, sex.val if sex else None))
+        else:
+            r["families"].append((record["line_number"], record.get("xref_ID"), record.ln))
+    return r
+
+
+def export(gedcom_file, path=":memory:"):
+    """ Export a GEDCOM File into an SQLite database
+
+    :param gedcom_file: The GEDCOM File to export
+    :type gedcom_file: parser.File
+
+    :param path: Database file to export to, replacing the tables of a previous export, or ":memory:"
+    :type path: str
+
+    :returns: connection to the database
+    :rtype: sqlite3.Connection
+
+    """
+    connection = sqlite3.connect(path)
+    connection.text_factory = str
+    connection.executescript(SCHEMA)
+    for table, table_rows in rows(gedcom_file).iteritems():
+        if table_rows:
+            marks = ", ".join("?" * len(table_rows[0]))
+            connection.executemany("INSERT INTO {0} VALUES ({1})".format(table, marks), table_rows)
+    connection.executescript(INDEXES)
+    connection.commit()
+    return connection
@@ -0,0 +1,160 @@
+""" Day of Year Index
+
+This module finds the birthdays and anniversaries that fall in the next days, for the listings of upcoming birthdays
+and anniversaries (US38 and US39) and for jobs notifying people of them every day.
+
+Each date is kept by its day of the year in a leap year, 1 to 366, so February 29 has a day of its own. The days are
+sorted once, and a query for the next days is a range of them found by bisection, or two ranges when the days wrap
+past the end of the year, so it takes the same time however many dates are indexed apart from the dates it returns.
+
+:note: In a year without a February 29, anniversaries of February 29 fall on March 1.
+
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from ages import MISSING
+
+__author__ = "Constantine Davantzis"
+
+FIRST_DAY = [1, 32, 61, 92, 122, 153, 183, 214, 245, 275, 306, 336]
+"""list: Day of a leap year each month starts on, January first."""
+
+LEAP_DAY = FIRST_DAY[1] + 28
+"""int: Day of the year of February 29."""
+
+DAYS = 366
+"""int: Days of a leap year, the last day of the year."""
+
+
+def is_leap(year):
+    """ Whether a year has a February 29 """
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def day_of_year(ordinal):
+    """ The day of a leap year a date falls on, the same day for the date in every year
+
+    :param ordinal: A date ordinal
+    :type ordinal: int
+
+    :returns: day of the year, 1 to 366
+    :rtype: int
+
+    """
+    d = date.fromordinal(ordinal)
+    return FIRST_DAY[d.month - 1] + d.day - 1
+
+
+def next_anniversary(ordinal, today):
+    """ The first anniversary of a date on or after today, e.g. the next birthday of a birth date
+
+    :param ordinal: The date ordinal, e.g. of a birth
+    :type ordinal: int
+
+    :param today: The date ordinal to count from
+    :type today: int
+
+    :returns: date ordinal of the anniversary
+    :rtype: int
+
+    """
+    d, year = date.fromordinal(ordinal), date.fromordinal(today).year
+    while True:
+        if d.month == 2 and d.day == 29 and not is_leap(year):
+            anniversary = date(year, 3, 1).toordinal()
+        else:
+            anniversary = date(year, d.month, d.day).toordinal()
+        if anniversary >= today:
+            return anniversary
+        year += 1
+
+
+class DayIndex(object):
+    """ Ids sorted by the day of the year of a date, e.g. individual ids by the day of their birth
+
+    :Example:
+        index = DayIndex([(birth_ordinal, individual_id), ...])
+        print index.upcoming(today, 30)
+
+    """
+
+    def __init__(self, dates):
+        """ Index ids by the day of the year of their date
+
+        :param dates: (date ordinal, id) of each date to index
+        :type dates: iterable
+
+        """
+        days = sorted((day_of_year(ordinal), i) for ordinal, i in dates)
+        self.days = array("H", (day for day, _ in days))
+        self.ids = array("l", (i for _, i in days))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def between(self, first, last):
+        """ The ids with a day of the year from first to last, inclusive, sorted by day
+
+        :rtype: array.array
+
+        """
+        return self.ids[bisect_left(self.days, first):bisect_right(self.days, last)]
+
+    def upcoming(self, today, days):
+        """ The ids whose date has an anniversary in the days starting today, sorted by how soon it is
+
+        :param today: The date ordinal of the first day
+        :type today: int
+
+        :param days: The number of days, e.g. 30 for the next 30 days including today
+        :type days: int
+
+        :returns: the ids, each once
+        :rtype: array.array
+
+        """
+        if days <= 0:
+            return array("l")
+        first = day_of_year(today)
+        if days >= DAYS:
+            return self.between(first, DAYS) + self.between(1, first - 1)
+        last = day_of_year(today + days - 1)
+        # Anniversaries of February 29 fall on March 1 in other years, so a range starting on March 1 includes them
+        start = date.fromordinal(today)
+        if start.month == 3 and start.day == 1 and not is_leap(start.year):
+            first = LEAP_DAY
+        if first <= last:
+            return self.between(first, last)
+        return self.between(first, DAYS) + self.between(1, last)
+
+
+def birthdays(ages):
+    """ Index living individuals by the day of their birth
+
+    :param ages: The ages of a GEDCOM file
+    :type ages: ages.Ages
+
+    :returns: index of individual ids
+    :rtype: DayIndex
+
+    """
+    alive = ages.living()
+    return DayIndex((ages.birth[i], i) for i in alive if ages.birth[i] != MISSING)
+
+
+def anniversaries(ages):
+    """ Index current marriages, of living spouses who have not divorced, by the day of their marriage
+
+    :param ages: The ages of a GEDCOM file
+    :type ages: ages.Ages
+
+    :returns: index of family ids
+    :rtype: DayIndex
+
+    """
+    alive = ages.living()
+    return DayIndex((ages.marriage[f], f) for f in xrange(len(ages.families))
+                    if ages.marriage[f] != MISSING and not ages.divorced[f]
+                    and ages.husband[f] in alive and ages.wife[f] in alive)
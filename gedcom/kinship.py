@@ -0,0 +1,278 @@
+""" Kinship Between Spouses
+
+This module finds how spouses are related to one another, so the stories looking for marriages between relatives
+(descendants, siblings, first cousins, aunts and uncles) only need to look at spouse pairs.
+
+Each spouse's ancestry is found once, and the families both spouses descend from give their relationship:
+
+    * siblings are both children in a family
+    * first cousins have different parents who are both children in a family
+    * an aunt or uncle is a child in a family one of the other spouse's parents is a child in, but is not that parent
+    * a descendant has the other spouse as a parent in one of their ancestor families, the fewest generations up that
+      family is gives how far down they are
+
+:note: The relationships are not found with a lowest common ancestor query. Each individual has two parents, so a
+family tree is not a tree but a directed acyclic graph, where two spouses can have several lowest common ancestors
+(e.g. both parents of siblings, or two couples for double first cousins), and LCA indexes such as an Euler tour with
+range minimum queries or binary lifting need a single parent for each node. The families both spouses descend from
+are those lowest common ancestors and the families above them, and finding them costs a walk up each spouse's
+ancestry, found once per individual and shared by every spouse pair they are in.
+
+"""
+from collections import namedtuple
+
+__author__ = "Constantine Davantzis"
+
+LINK_TAGS = ("FAMS", "FAMC", "HUSB", "WIFE", "CHIL")
+"""tuple: Tags whose values link an INDI record to a FAM record or a FAM record to an INDI record."""
+
+Ancestry = namedtuple("Ancestry", ["child_of", "parent_child_of", "generations"])
+"""namedtuple: The families an individual descends from, by family line number.
+
+child_of lists the families the individual is a child in, parent_child_of maps each family a parent is a child in to
+the line numbers of the parents it was reached through, and generations maps every ancestor family to the fewest
+generations up it is (1 for the families the individual is a child in).
+"""
+
+Kin = namedtuple("Kin", ["relation", "spouse", "family", "detail"])
+"""namedtuple: A relative an individual is married to.
+
+relation is one of "descendant", "sibling", "first cousin" or "aunt/uncle", spouse and family are the Line objects of
+the spouse and the family they are married in, and detail is the number of generations for a descendant, or the Line
+of the family both are children in for a sibling.
+"""
+
+
+def linked(line, *tags):
+    """ Follow the xrefs of the children of a line with the given tags
+
+    :param line: A GEDCOM line
+    :type line: parser.Line
+
+    :returns: list of lines linked to
+    :rtype: list
+
+    """
+    found = []
+    for child in line.children:
+        if child.tag in tags:
+            target = child.follow_xref()
+            if target is not None:
+                found.append(target)
+    return found
+
+
+def linked_from(gedcom_file):
+    """ Find the records linking to each record
+
+    :param gedcom_file: The GEDCOM File the records are in
+    :type gedcom_file: parser.File
+
+    :returns: dictionary of (record line number, tag) to the list of level 0 lines linking to that record with
+    that tag, e.g. (individual, "CHIL") to the families listing that individual as a child
+    :rtype: dict
+
+    """
+    found = {}
+    for line in gedcom_file.lines:
+        if line.tag in LINK_TAGS and line.get("level") == 1:
+            target = line.follow_xref()
+            if target is not None:
+                found.setdefault((target["line_number"], line.tag), []).append(line.parent)
+    return found
+
+
+class Adjacency(object):
+    """ The families each individual is a child and a spouse in, and the parents and children of each family
+
+    A link counts if either side of it is in the file, e.g. an individual is a child in a family if they have a FAMC
+    line for it or the family has a CHIL line for them. The records linking to each record are found in one pass over
+    the file, and the links of each record are found the first time they are asked for and kept.
+
+    :Example:
+        adjacency = Adjacency(gedcom_file)
+        for fam in adjacency.spouse_in(indi):
+            print adjacency.children_of(fam)
+
+    """
+
+    def __init__(self, gedcom_file):
+        """ Find the records linking to each record of a GEDCOM file
+
+        :param gedcom_file: The GEDCOM File to find the links of
+        :type gedcom_file: parser.File
+
+        """
+        self.reverse = linked_from(gedcom_file)
+        self.cache = {}
+
+    def both_ways(self, line, tags, reverse_tags):
+        """ The records a line links to with tags, and the records linking to it with reverse_tags, in file order
+
+        :rtype: list
+
+        """
+        key = (line["line_number"], tags)
+        if key not in self.cache:
+            found = dict((l["line_number"], l) for l in linked(line, *tags))
+            for reverse_tag in reverse_tags:
+                found.update((l["line_number"], l) for l in self.reverse.get((line["line_number"], reverse_tag), []))
+            self.cache[key] = [found[ln] for ln in sorted(found)]
+        return self.cache[key]
+
+    def child_in(self, indi):
+        """ The FAM lines an INDI line is a child in """
+        return self.both_ways(indi, ("FAMC",), ("CHIL",))
+
+    def spouse_in(self, indi):
+        """ The FAM lines an INDI line is a spouse in """
+        return self.both_ways(indi, ("FAMS",), ("HUSB", "WIFE"))
+
+    def parents_of(self, fam):
+        """ The INDI lines of the spouses of a FAM line """
+        return self.both_ways(fam, ("HUSB", "WIFE"), ("FAMS",))
+
+    def children_of(self, fam):
+        """ The INDI lines of the children of a FAM line """
+        return self.both_ways(fam, ("CHIL",), ("FAMC",))
+
+    def listed_as_child_in(self, indi):
+        """ The records with a CHIL line for an INDI line, in file order, unlike child_in leaving out FAMC lines """
+        return self.reverse.get((indi["line_number"], "CHIL"), [])
+
+
+def ancestry(indi, child_in, parents_of):
+    """ Find the families an individual descends from
+
+    :param indi: INDI line
+    :type indi: parser.Line
+
+    :param child_in: function returning the FAM lines an INDI line is a child in
+    :param parents_of: function returning the INDI lines of the parents in a FAM line
+
+    :returns: Ancestry of the individual
+    :rtype: Ancestry
+
+    """
+    child_of = [fam["line_number"] for fam in child_in(indi)]
+    # Families the parents are children in, and which parents they were reached through
+    parent_child_of = {}
+    for fam in child_in(indi):
+        for parent in parents_of(fam):
+            for grand_fam in child_in(parent):
+                parent_child_of.setdefault(grand_fam["line_number"], set()).add(parent["line_number"])
+    # Fewest generations up to every ancestor family, found breadth first
+    generations = {}
+    frontier, generation = [indi], 1
+    while frontier:
+        parents = []
+        for person in frontier:
+            for fam in child_in(person):
+                if fam["line_number"] not in generations:
+                    generations[fam["line_number"]] = generation
+                    parents.extend(parents_of(fam))
+        frontier, generation = parents, generation + 1
+    return Ancestry(child_of, parent_child_of, generations)
+
+
+def descendants(indi, adjacency):
+    """ Find the descendants of an individual, breadth first
+
+    :param indi: INDI line
+    :type indi: parser.Line
+
+    :param adjacency: The links of the file the individual is in
+    :type adjacency: Adjacency
+
+    :returns: list of (INDI line, generations down) for each descendant, once, at the fewest generations down
+    :rtype: list
+
+    """
+    found, seen = [], {indi["line_number"]}
+    frontier, generation = [indi], 1
+    while frontier:
+        children = []
+        for person in frontier:
+            for fam in adjacency.spouse_in(person):
+                for child in adjacency.children_of(fam):
+                    if child["line_number"] not in seen:
+                        seen.add(child["line_number"])
+                        found.append((child, generation))
+                        children.append(child)
+        frontier, generation = children, generation + 1
+    return found
+
+
+def relations(a, b, ancestors, spouse_in):
+    """ Find how b is related to a
+
+    :param a: INDI line of the first spouse
+    :param b: INDI line of the second spouse
+
+    :param ancestors: function returning the Ancestry of an INDI line
+    :param spouse_in: function returning the line numbers of the families an INDI line is a spouse in
+
+    :returns: list of (relation, detail) tuples
+    :rtype: list
+
+    """
+    found = []
+    anc_a, anc_b = ancestors(a), ancestors(b)
+    siblings_in = [f for f in anc_a.child_of if f in anc_b.child_of]
+    if siblings_in:
+        found.append(("sibling", a.file[min(siblings_in)]))
+    # First cousins have different parents who are siblings
+    if any(len(via | anc_b.parent_child_of[f]) > 1 for f, via in anc_a.parent_child_of.iteritems()
+           if f in anc_b.parent_child_of):
+        found.append(("first cousin", None))
+    # Aunts and uncles are siblings of a parent, but not the parent
+    if any(via - {b["line_number"]} for f, via in anc_a.parent_child_of.iteritems() if f in anc_b.child_of):
+        found.append(("aunt/uncle", None))
+    descended = [anc_b.generations[f] for f in spouse_in(a) if f in anc_b.generations]
+    if descended:
+        found.append(("descendant", min(descended)))
+    return found
+
+
+def spouse_kinship(individuals, gedcom_file, adjacency=None):
+    """ Find the relatives each individual is married to
+
+    :note: A link counts if either side of it is in the file, see Adjacency.
+
+    :param individuals: INDI lines to check
+    :type individuals: iterable
+
+    :param gedcom_file: The GEDCOM File the individuals are in
+    :type gedcom_file: parser.File
+
+    :param adjacency: The links of the file, by default the cached links of the File the individuals were read into
+    (see parser.File.kinship_adjacency), so checking a SubFile does not find the links of the whole file again
+    :type adjacency: Adjacency
+
+    :returns: dictionary of INDI line number to a list of Kin, for every individual given
+    :rtype: dict
+
+    """
+    adjacency = adjacency if adjacency is not None else gedcom_file.root.kinship_adjacency
+    ancestors_cache, spouse_in_cache = {}, {}
+
+    def ancestors(indi):
+        if indi["line_number"] not in ancestors_cache:
+            ancestors_cache[indi["line_number"]] = ancestry(indi, adjacency.child_in, adjacency.parents_of)
+        return ancestors_cache[indi["line_number"]]
+
+    def spouse_in(indi):
+        if indi["line_number"] not in spouse_in_cache:
+            spouse_in_cache[indi["line_number"]] = [f["line_number"] for f in adjacency.spouse_in(indi)]
+        return spouse_in_cache[indi["line_number"]]
+
+    r = {}
+    for indi in individuals:
+        kin = r.setdefault(indi["line_number"], [])
+        for fam in linked(indi, "FAMS"):
+            for spouse in linked(fam, "HUSB", "WIFE"):
+                if spouse.get("xref_ID") == indi.get("xref_ID"):
+                    continue
+                for relation, detail in relations(indi, spouse, ancestors, spouse_in):
+                    kin.append(Kin(relation, spouse, fam, detail))
+    return r
@@ -4,12 +4,17 @@ This module provides a way of parsing and traversing through a GEDCOM file.
 
 """
 # Standard Library Imports
-import json
+from array import array
+import codecs
+from bisect import bisect_left, insort
+from cStringIO import StringIO
 import re
-from itertools import ifilter, imap
+from itertools import chain, ifilter, imap, izip, repeat, tee
 import sys
 
 # Project Imports
+# json, the decompression modules, ages, dayindex, status, kinship, timeline and database (and sqlite3) are imported
+# when first needed, so programs only reading and checking plain files start faster.
 import tag
 import tools
 
@@ -19,10 +24,35 @@ __author__ = "Constantine Davantzis"
 regex_line = re.compile(r"(?P<level>[0-9]|[1-9][0-9])\s(?P<xref_ID>@\S+@)?\s?(?P<tag>\S+)\s*(?P<line_value>(.+))?")
 """Regular Expression Object: Compiled regular expression object used for matching GEDCOM lines."""
 
+regex_continuation = re.compile(r"(?P<level>[0-9]{1,2})\s(?P<tag>CONC|CONT)(\s(?P<line_value>.*))?$")
+"""Regular Expression Object: Matches a CONC or CONT line continuing the value of the line before it."""
+
+regex_char = re.compile(r"\s*1\s+CHAR\s+(?P<char>\S+)")
+"""Regular Expression Object: Matches the CHAR line of a GEDCOM header, declaring the character set of the file."""
+
+regex_non_ascii = re.compile(r"[\x80-\xff]")
+"""Regular Expression Object: Finds a byte that is not ASCII, lines without one are the same in every character set."""
+
 SUPPORTED_TAGS = ["INDI", "NAME", "SEX", "BIRT", "DEAT", "FAMC", "FAMS", "FAM",
                   "MARR", "HUSB", "WIFE", "CHIL", "DIV", "DATE", "HEAD", "TRLR", "NOTE"]
 """A list of tags supported by the project."""
 
+INDEXED_KEYS = ("tag", "level", "xref_ID")
+"""A tuple of the line keys File keeps an index of, used by query to avoid checking every line."""
+
+WRITE_CHUNK_LINES = 1000
+"""int: Number of lines File.write_text and File.write_json format before each write."""
+
+COMPRESSION_MAGIC = [("gzip", "\x1f\x8b"), ("bz2", "BZh"), ("xz", "\xfd7zXZ\x00")]
+"""A list of (compression, magic bytes) of the compressed formats read_file detects."""
+
+CHAR_CODECS = {"UTF-8": None, "UTF8": None, "ASCII": None, "ANSI": "cp1252", "IBMPC": "cp437",
+               "MACINTOSH": "mac_roman", "ANSEL": "latin-1"}
+"""dict: Python codec of each CHAR value of a GEDCOM header, None for text that is already UTF-8.
+
+ANSEL has no Python codec, its bytes are read as Latin-1 which keeps every letter without diacritics.
+"""
+
 
 def parse_line(s):
     """ Parse GEDCOM line into dictionary
@@ -44,6 +74,147 @@ def parse_line(s):
     return d
 
 
+def open_file(filename):
+    """ Open a GEDCOM file for reading, decompressing it on the fly if it is gzip, bzip2 or xz compressed
+
+    The compression is detected by the magic bytes at the start of the file, not by the file extension.
+    Compressed files are read through their decompressing file objects a block at a time, without temporary files.
+
+    :note: xz needs the lzma module, from the backports.lzma package on Python 2.
+
+    :param filename: A GEDCOM filename or file path.
+    :type filename: str
+
+    :returns: file object iterating over the lines of the file
+    :rtype: file
+
+    """
+    f = open(filename, "rb")
+    start = f.read(max(len(magic) for _, magic in COMPRESSION_MAGIC))
+    f.seek(0)
+    compression = next((c for c, magic in COMPRESSION_MAGIC if start.startswith(magic)), None)
+    if compression is None:
+        return f
+    f.close()
+    if compression == "gzip":
+        import gzip
+        return gzip.GzipFile(filename, "rb")
+    if compression == "bz2":
+        import bz2
+        return bz2.BZ2File(filename, "rb")
+    try:
+        import lzma
+    except ImportError:
+        try:
+            from backports import lzma
+        except ImportError:  # xz support is optional on Python 2
+            raise IOError(0, "Reading xz compressed files needs the backports.lzma package", filename)
+    return lzma.LZMAFile(filename, "rb")
+
+
+def map_file(f):
+    """ The whole contents of a file object opened by open_file, for File.read_source
+
+    A plain file is memory mapped read only, so its contents are paged in from disk by the operating system when
+    they are read instead of being copied into memory. A compressed file can not be mapped, it is decompressed
+    into a string.
+
+    :param f: The file object to read, e.g. from open_file
+    :type f: file
+
+    :returns: the contents of the file
+    :rtype: mmap.mmap or str
+
+    """
+    if isinstance(f, file):
+        import mmap
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # An empty file can not be mapped
+            return ""
+    return f.read()
+
+
+def iter_source(source):
+    """ Iterate over the lines of the contents of a file, with the offset each line starts at
+
+    :param source: The contents of a file
+    :type source: str or mmap.mmap
+
+    :returns: generator of (offset, line), each line with its line terminator
+    :rtype: generator
+
+    """
+    # readline splits the lines in C, a memory map is read from the start by its own readline
+    f = source if hasattr(source, "readline") else StringIO(source)
+    f.seek(0)
+    offset = 0
+    for line in iter(f.readline, ""):
+        yield offset, line
+        offset += len(line)
+
+
+def decode_lines(lines):
+    """ Convert the lines of a GEDCOM file to UTF-8, the character set every Line is kept in
+
+    The character set is found from a byte order mark at the start of the file, or else from the CHAR line of the
+    header, which is read ahead up to the first record. UTF-8 and ASCII files, and every line of other files that
+    is pure ASCII, are passed on without being decoded.
+
+    :note: UTF-16 ("UNICODE") files can only be read with a byte order mark, and are decoded whole, as their lines
+    can not be split before decoding.
+
+    :param lines: The lines of a GEDCOM file, as byte strings with their line terminators
+    :type lines: iterable
+
+    :returns: generator of the lines as UTF-8 byte strings
+    :rtype: generator
+
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    if first.startswith(codecs.BOM_UTF8):
+        yield first[len(codecs.BOM_UTF8):]
+        for line in lines:
+            yield line
+        return
+    if first.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        for line in "".join(chain([first], lines)).decode("utf-16").splitlines():
+            yield line.encode("utf-8")
+        return
+
+    head, codec = [first], None
+    for line in lines:
+        head.append(line)
+        m = regex_char.match(line)
+        if m:
+            codec = CHAR_CODECS.get(m.group("char").upper())
+            break
+        if line.lstrip().startswith("0"):
+            break
+    for line in chain(head, lines):
+        if codec is None or not regex_non_ascii.search(line):
+            yield line
+        else:
+            yield line.decode(codec, "replace").encode("utf-8")
+
+
+def format_line(d):
+    """ Format a dictionary of a GEDCOM line as text, the reverse of parse_line
+
+    :param d: Dictionary with the level, tag, and optionally xref_ID and line_value of a GEDCOM line
+    :type d: dict
+
+    :returns: GEDCOM line
+    :rtype: str
+
+    """
+    parts = [str(d["level"]), d.get("xref_ID"), d["tag"], d.get("line_value")]
+    return " ".join(p for p in parts if p)
+
+
 class File(object):
 
     """GEDCOM File Class
@@ -55,11 +226,22 @@ class File(object):
 
     """
 
-    def __init__(self):
+    def __init__(self, now=None):
         """Initiate GEDCOM File Class
 
+        :param now: The date and time the stories and ages check this file against, defaults to when the program
+        started (tag.NOW). A program running past midnight, e.g. server.py, gives each file the current date instead.
+        :type now: datetime
+
         """
+        self.now = tag.NOW if now is None else now
         self.lines = []
+        self.xrefs = {}
+        self.indexes = dict((key, {}) for key in INDEXED_KEYS)
+        self.cache = {}
+        self.listeners = []
+        self.source = None
+        self.source_offsets = None
 
     def __iter__(self):
         """ Return iterator for GEDCOM File Lines.
@@ -111,33 +293,524 @@ class File(object):
         """
         return str(self.lines)
 
-    def read_file(self, filename):
+    def read_file(self, filename, low_memory=False):
         """Method to read to read in file from filename or file path
 
+            The file may be gzip, bzip2 or xz compressed, see open_file.
+
             :param filename: A GEDCOM filename or file path.
             :type filename: str
 
+            :param low_memory: Keep where each line is in the file instead of its text, see read_source
+            :type low_memory: bool
+
+        """
+        f = open_file(filename)
+        if low_memory:
+            self.read_source(map_file(f))
+        else:
+            self.read_lines(f)
+        # Close the file here because we no longer need to read from the file, a memory map stays open without it.
+        f.close()
+
+    def read_lines(self, lines):
+        """Method to read in GEDCOM lines from any iterable of strings, e.g. an open file or text.splitlines(True)
+
+            :note: The lines must keep their line terminators, as the lines of a UTF-16 file are joined back
+            together to be decoded, see decode_lines.
+
+            :param lines: The lines of a GEDCOM file
+            :type lines: iterable
+
         """
-        f = open(filename)
         # Create a list of "Line" objects.
         # The text of the line, the instance of this class, and the line number are passed into each "Line" Object.
         # The instance of this class is passed in so that the line class can make calls to this class.
-        self.lines = [Line(line.strip(), self, i) for i, line in enumerate(filter(str.strip, f))]
+        # The lines are decoded to UTF-8, and CONC and CONT lines are folded into the line they continue.
+        self.source = self.source_offsets = None
+        self.lines = self.__make_lines(decode_lines(lines), 0, 0)
         # Refresh the file. Currently this determines which lines are parents and children of one another.
         self.__refresh()
-        # Close the file here because we no longer need to read from the file.
-        f.close()
-    
+
+    def read_source(self, source):
+        """ Read in a GEDCOM file from its whole contents, keeping where each line is instead of its text
+
+        The contents are kept as self.source, and the offset each line starts at as self.source_offsets, an array
+        indexed by source line number (see Line.source_line), so a Line keeps no text of its own and reads it back
+        from the source when asked. With the memory map of map_file the text of the file is not held in memory.
+        Lines decoded from another character set keep their text as when read with read_lines.
+
+        :note: The file must not change while the memory map of it is in use.
+
+        :note: UTF-16 files are converted to UTF-8 first, and the converted contents are kept instead.
+
+        :note: The first edit of the file gives every line its text and drops the source, see keep_texts.
+
+        :param source: The contents of a GEDCOM file, e.g. from map_file
+        :type source: str or mmap.mmap
+
+        :Example:
+            with open("family.ged", "rb") as f:
+                gedcom_file.read_source(map_file(f))
+
+        """
+        if source[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+            source = "\n".join(decode_lines([source[:]]))
+        self.source, self.source_offsets = source, array("L")
+        raw, found = tee(iter_source(source))
+        # decode_lines passes on the lines it does not decode unchanged, these are the lines found in the source
+        pairs = ((text, offset if text is line else None)
+                 for (offset, line), text in izip(found, decode_lines(line for _, line in raw)))
+        texts, offsets = tee(pairs)
+        self.lines = self.__make_lines((text for text, _ in texts), 0, 0, (offset for _, offset in offsets))
+        self.__refresh()
+
+    def source_text(self, source_line):
+        """ The text of a line of a file read with read_source, read from its source
+
+        :param source_line: The source line number of the line, see Line.source_line
+        :type source_line: int
+
+        :rtype: str
+
+        """
+        start = self.source_offsets[source_line]
+        end = self.source.find("\n", start)
+        return self.source[start:end if end >= 0 else len(self.source)].strip()
+
+    def keep_texts(self):
+        """ Give every line read with read_source its own text, and drop the source
+
+        The editing methods call this before changing the file, as the source line numbers of the lines after an
+        edit no longer match the source.
+
+        """
+        if self.source is None:
+            return
+        for line in self.lines:
+            line.keep_text()
+        self.source = self.source_offsets = None
+
+    def __make_lines(self, texts, start, source_start, offsets=None):
+        """ Create the Line objects of GEDCOM lines, in one pass
+
+        Blank lines are skipped. CONC and CONT lines do not become Lines of their own, their values are joined to
+        the line_value of the line they continue, a CONT value after a new line, and their text is kept in the
+        continuations of that Line so the file can be written back. Lines are stripped, except that a value split
+        at a space by CONC keeps the space, which is moved to the start of the CONC value in the text kept.
+
+        :param texts: GEDCOM lines
+        :type texts: iterable of str
+
+        :param start: The line number of the first line
+        :type start: int
+
+        :param source_start: The source line number of the first line, see Line.source_line
+        :type source_start: int
+
+        :param offsets: The offset of each of the texts in self.source, or None for a text to keep in its Line, see
+        read_source. The offset each line starts at is added to self.source_offsets.
+        :type offsets: iterable of int
+
+        :rtype: list of Line
+
+        """
+        lines = []
+        line = parts = None
+        last_space = ""  # white space at the end of the last line read
+        source = source_start - 1
+        for text, offset in izip(texts, repeat(None) if offsets is None else offsets):
+            text = text.rstrip("\r\n")
+            space, text = text[len(text.rstrip()):], text.strip()
+            if not text:
+                continue
+            source += 1
+            if offsets is not None:
+                # A line whose text is kept is never read from the source, so any offset will do
+                self.source_offsets.append(offset or 0)
+            m = regex_continuation.match(text) if line is not None and "CON" in text[:7] else None
+            if m is not None:
+                if parts is None:
+                    # The parts are joined once the last continuation is read, not concatenated one at a time
+                    parts, line.continuations = [line.get("line_value") or ""], []
+                value = m.group("line_value") or ""
+                if m.group("tag") == "CONT":
+                    parts.append("\n")
+                elif last_space:
+                    value = last_space + value
+                    text = "{0} CONC {1}".format(m.group("level"), value)
+                parts.append(value)
+                line.continuations.append(text)
+                last_space = space
+                continue
+            if parts is not None:
+                line["line_value"], parts = "".join(parts), None
+            line = Line(text, self, start + len(lines), offsets is None or offset is None)
+            line.source_line = source
+            lines.append(line)
+            last_space = space
+        if parts is not None:
+            line["line_value"] = "".join(parts)
+        return lines
+
     def __refresh(self):
         """ Refresh Each Line
 
-        Currently this determines which lines are parents and children of one another.
+        Currently this determines which lines are parents and children of one another,
+        and rebuilds the xref index and the indexes used by query.
+
+        :note: This only needs to be called when the file is read, the editing methods (see splice) keep the
+        parents, children and indexes up to date themselves.
+
+        """
+        self.refresh_hierarchy()
+        self.refresh_xrefs()
+        self.refresh_indexes()
+        self.cache = {}
+
+    def refresh_hierarchy(self, start=0, stop=None):
+        """ Determine which lines are parents and children of one another, in one pass
+
+        The children of a line are the lines after it at the level of the line right after it, up to the first line
+        at a lower level than them. A level 0 line has no parent, so records do not affect one another, and only the
+        records from the one containing line start to the one containing line stop - 1 are refreshed.
+
+        :param start: The first line number to refresh
+        :type start: int
+
+        :param stop: The line number after the last line to refresh, defaults to the end of the file
+        :type stop: int
+
+        :returns: the first line number refreshed, and the line number after the last
+        :rtype: tuple
+
+        """
+        lines = self.lines
+        stop = len(lines) if stop is None else min(stop, len(lines))
+        start = min(start, stop)
+        while start > 0 and (start == len(lines) or lines[start]["level"] != 0):
+            start -= 1
+        while stop < len(lines) and lines[stop]["level"] != 0:
+            stop += 1
+        stack = []  # (line, level of its children) of the lines whose children may still follow
+        for i in xrange(start, stop):
+            line = lines[i]
+            level = line["level"]
+            while stack and stack[-1][1] > level:
+                stack.pop()
+            parent = stack[-1][0] if stack and stack[-1][1] == level else None
+            line.update({"children_line_numbers": [], "parent_line_numbers": [parent["line_number"]] if parent else []})
+            if parent is not None:
+                parent["children_line_numbers"].append(i)
+            if i + 1 < len(lines) and lines[i + 1]["level"] > level:
+                stack.append((line, lines[i + 1]["level"]))
+        return start, stop
+
+    def refresh_xrefs(self):
+        """ Rebuild the xref index
+
+        The xref index maps each xref_ID to its line, so xrefs can be followed without scanning every line.
+
+        :note: This needs to be called again if the xref_ID of a line is changed.
+
+        """
+        self.xrefs = {}
+        for line in self.lines:
+            # Keep the first line with a given xref, the same line find_one would return.
+            if line.get("xref_ID") is not None:
+                self.xrefs.setdefault(line["xref_ID"], line)
+
+    def refresh_indexes(self):
+        """ Rebuild the indexes used by query
+
+        Each index maps a value of one of INDEXED_KEYS to the line numbers with that value, in file order.
+
+        :note: This needs to be called again if the tag, level or xref_ID of a line is changed.
+
+        """
+        self.indexes = dict((key, {}) for key in INDEXED_KEYS)
+        for line in self.lines:
+            for key in INDEXED_KEYS:
+                self.indexes[key].setdefault(line.get(key), []).append(line["line_number"])
+
+    def line_of(self, item):
+        """ Find a line of the file from its xref_ID, line number, or the Line itself
+
+        :param item: xref (e.g. "@I1@"), line number or Line
+        :type item: str, int or Line
+
+        :rtype: Line
+
+        """
+        if isinstance(item, Line):
+            return item
+        if isinstance(item, basestring):
+            if item not in self.xrefs:
+                raise KeyError("xref {0} is not in the file".format(item))
+            return self.xrefs[item]
+        return self.lines[item]
+
+    def record_span(self, item):
+        """ Find the line numbers of a line and the lines below it, e.g. a whole record for a level 0 line
+
+        :param item: xref, line number or Line of the first line
+        :type item: str, int or Line
+
+        :returns: the line number of the line, and the line number after the last line below it
+        :rtype: tuple
+
+        """
+        line = self.line_of(item)
+        start = stop = line["line_number"]
+        stop += 1
+        while stop < len(self.lines) and self.lines[stop]["level"] > line["level"]:
+            stop += 1
+        return start, stop
+
+    def splice(self, start, stop, texts):
+        """ Replace the lines from start to stop - 1 with new lines, keeping the file up to date
+
+        Every edit of the file is made through this method. The lines after the edit are renumbered, the parents
+        and children of the records around the edit are determined again, and the xref and query indexes are
+        updated for the lines removed, added and renumbered, so nothing is rebuilt for the whole file.
+
+        :param start: The line number of the first line to replace
+        :type start: int
+
+        :param stop: The line number after the last line to replace, start to insert without replacing
+        :type stop: int
+
+        :param texts: GEDCOM lines to insert, blank strings are skipped and CONC and CONT lines are folded into the
+        line before them, as when the file is read
+        :type texts: list of str
+
+        :returns: the new lines
+        :rtype: list of Line
+
+        :raises SyntaxError: if a text is not a GEDCOM line, in which case the file is not changed
+
+        :note: Functions in listeners are called with start, stop and the number of new lines after every edit.
+
+        """
+        if isinstance(self, SubFile):
+            raise TypeError("A SubFile can not be edited, edit the File it is part of")
+        if not 0 <= start <= stop <= len(self.lines):
+            raise IndexError("lines {0} to {1} are not in the file".format(start, stop))
+        texts = [t.strip() for t in texts if t.strip()]
+        for t in texts:
+            parse_line(t)
+        self.keep_texts()
+        removed = self.lines[start:stop]
+        for line in removed:
+            for key in INDEXED_KEYS:
+                self.__unindex(key, line.get(key), line["line_number"])
+
+        before = self.lines[start - 1] if start else None
+        new = self.__make_lines(texts, start, before.source_line + len(before.texts) if before else 0)
+        delta = len(new) - len(removed)
+        source_delta = sum(len(line.texts) for line in new) - sum(len(line.texts) for line in removed)
+        self.lines[start:stop] = new
+        if delta or source_delta:
+            for line in self.lines[start + len(new):]:
+                line["line_number"] += delta
+                line.source_line += source_delta
+        if delta:
+            for values in self.indexes.itervalues():
+                for line_numbers in values.itervalues():
+                    for i in xrange(bisect_left(line_numbers, stop), len(line_numbers)):
+                        line_numbers[i] += delta
+        for line in new:
+            for key in INDEXED_KEYS:
+                insort(self.indexes[key].setdefault(line.get(key), []), line["line_number"])
+
+        first, last = self.refresh_hierarchy(max(start - 1, 0), start + len(new))
+        if delta:
+            for line in self.lines[last:]:
+                line["children_line_numbers"] = [n + delta for n in line["children_line_numbers"]]
+                line["parent_line_numbers"] = [n + delta for n in line["parent_line_numbers"]]
+
+        self.__refresh_xrefs(line.get("xref_ID") for line in removed + new)
+        self.cache = {}
+        for listener in self.listeners:
+            listener(start, stop, len(new))
+        return new
+
+    def __unindex(self, key, value, line_number):
+        """ Remove a line number from the query index of a key """
+        line_numbers = self.indexes[key].get(value, [])
+        i = bisect_left(line_numbers, line_number)
+        if i < len(line_numbers) and line_numbers[i] == line_number:
+            del line_numbers[i]
+        if not line_numbers:
+            self.indexes[key].pop(value, None)
+
+    def __refresh_xrefs(self, xrefs):
+        """ Point the xref index at the first line with each of the xrefs again """
+        for xref in set(xrefs) - {None}:
+            line_numbers = self.indexes["xref_ID"].get(xref)
+            if line_numbers:
+                self.xrefs[xref] = self.lines[line_numbers[0]]
+            else:
+                self.xrefs.pop(xref, None)
+
+    def insert_lines(self, line_number, texts):
+        """ Insert GEDCOM lines before a line, or at the end of the file for the number of lines in the file
+
+        :returns: the new lines
+        :rtype: list of Line
+
+        :Example:
+            birth = gedcom_file.xrefs["@I1@"].children.find_one("tag", "BIRT")
+            gedcom_file.insert_lines(birth["line_number"] + 1, ["2 DATE 1 JAN 1900"])
+
+        """
+        return self.splice(line_number, line_number, texts)
+
+    def delete_lines(self, line_number, count=1):
+        """ Delete count lines starting at a line number
+
+        :note: Lines below the deleted lines are not deleted, use delete_record to delete a line and the lines below it.
+
+        """
+        self.splice(line_number, line_number + count, [])
+
+    def update_line(self, item, text=None, **fields):
+        """ Change a line in place, to new text or to new values of its level, xref_ID, tag or line_value
+
+        The CONC and CONT lines of the line are kept when its line_value is not changed, at the level below it. A new
+        line_value with new lines is written with a CONT line for each new line.
+
+        :param item: xref, line number or Line to change
+        :type item: str, int or Line
+
+        :param text: The new GEDCOM line, optionally followed by its CONC and CONT lines, or None to change the fields
+        given
+        :type text: str
+
+        :returns: the changed line, the same Line object
+        :rtype: Line
+
+        :raises SyntaxError: if the new text is not a GEDCOM line followed by CONC and CONT lines, in which case the
+        line is not changed
+
+        :Example:
+            sex = gedcom_file.xrefs["@I1@"].children.find_one("tag", "SEX")
+            gedcom_file.update_line(sex, line_value="F")
+
+        """
+        if isinstance(self, SubFile):
+            raise TypeError("A SubFile can not be edited, edit the File it is part of")
+        line = self.line_of(item)
+        self.keep_texts()
+        if text is None:
+            # The line_value of the line itself, without the values of its CONC and CONT lines
+            values = dict(parse_line(line.text), **fields)
+            level = int(values["level"])
+            if "line_value" in fields:
+                parts = (values["line_value"] or "").split("\n")
+                values["line_value"] = parts[0]
+                continuations = ["{0} CONT {1}".format(level + 1, part).rstrip() for part in parts[1:]]
+            else:
+                continuations = ["{0} {1}".format(level + 1, c.split(" ", 1)[1]) for c in line.continuations]
+            text = format_line(values)
+        else:
+            texts = [t.strip() for t in text.splitlines() if t.strip()]
+            text, continuations = (texts or [""])[0], texts[1:]
+        line_number = line["line_number"]
+        old = dict((key, line.get(key)) for key in INDEXED_KEYS)
+        shift = len(continuations) - len(line.continuations)
+        line.set_text(text, continuations)
+        if shift:
+            for after in self.lines[line_number + 1:]:
+                after.source_line += shift
+        for key in INDEXED_KEYS:
+            if line.get(key) != old[key]:
+                self.__unindex(key, old[key], line_number)
+                insort(self.indexes[key].setdefault(line.get(key), []), line_number)
+        if line["level"] != old["level"]:
+            self.refresh_hierarchy(max(line_number - 1, 0), line_number + 1)
+        self.__refresh_xrefs([old["xref_ID"], line.get("xref_ID")])
+        self.cache = {}
+        for listener in self.listeners:
+            listener(line_number, line_number + 1, 1)
+        return line
+
+    def insert_record(self, texts, before=None):
+        """ Insert the lines of a record before a level 0 line, by default before the trailer
+
+        :param texts: GEDCOM lines of the record, starting with its level 0 line
+        :type texts: list of str
+
+        :param before: xref, line number or Line of the level 0 line to insert before
+        :type before: str, int or Line
+
+        :returns: the new level 0 line
+        :rtype: Line
+
+        :Example:
+            gedcom_file.insert_record(["0 @I99@ INDI", "1 NAME Jane /Doe/", "1 SEX F"])
+
+        """
+        if before is None:
+            line_number = len(self.lines)
+            if self.lines and self.lines[-1].tag == "TRLR":
+                line_number -= 1
+        else:
+            line_number = self.line_of(before)["line_number"]
+        new = self.splice(line_number, line_number, texts)
+        return new[0] if new else None
+
+    def delete_record(self, item):
+        """ Delete a record, or any line, and the lines below it
+
+        :param item: xref, line number or Line of the first line
+        :type item: str, int or Line
+
+        """
+        start, stop = self.record_span(item)
+        self.splice(start, stop, [])
+
+    def update_record(self, item, texts):
+        """ Replace a record, or any line and the lines below it, with new lines
 
-        :note: Currently this only needs to be called when the class is initiated, however
-        if we want to support adding and removing line, this class will need to be called again.
+        :returns: the new lines
+        :rtype: list of Line
 
         """
-        [d.refresh() for d in self.lines]
+        start, stop = self.record_span(item)
+        return self.splice(start, stop, texts)
+
+    def write_file(self, filename, newline="\n"):
+        """ Write the GEDCOM file, including any edits, to a file name or path
+
+        :param filename: The file name or path to write to
+        :type filename: str
+
+        """
+        with open(filename, "wb") as f:
+            self.write_text(f, newline)
+
+    def query(self, tag=None, level=None, xref=None, value_prefix=None, parent_tag=None, **equals):
+        """ Finds the lines in file matching every condition given
+
+        :param tag: The tag to match, e.g. "INDI"
+        :param level: The level to match
+        :param xref: The xref_ID to match, e.g. "@I1@"
+        :param value_prefix: The start of the line_value to match, e.g. "@F" or "1 JAN"
+        :param parent_tag: The tag of the parent line to match, e.g. "BIRT" for the DATE of a birth
+        :param equals: Any other line keys and the values to match, e.g. line_value="M"
+
+        :return: A lazy view of the matching lines, searched when it is iterated
+        :rtype: Query
+
+        :note: The search starts from the smallest index lookup among the conditions, see Query.
+
+        :Examples:
+            print g.query(tag="DATE", parent_tag="BIRT").lines
+            print g.query(level=1, value_prefix="@F").query(tag="FAMS").first()
+
+        """
+        return Query(self).query(tag, level, xref, value_prefix, parent_tag, **equals)
 
     def find(self, key, value):
         """ Finds ALL lines in file that have a matching key and value
@@ -160,7 +833,7 @@ class File(object):
             print g.find('tag', 'a_value_that_will_never_be_found')
 
         """
-        list_of_matching_lines = filter(lambda d: d.get(key) == value, self.lines)
+        list_of_matching_lines = Query(self, [(key, value)]).lines
         # Return a SubFile object so that the returned object can continue to use methods defined in the File class
         return SubFile(list_of_matching_lines)
 
@@ -183,7 +856,7 @@ class File(object):
             print g.find_one('tag', 'a_value_that_will_never_be_found')
 
         """
-        return next(ifilter(lambda d: d.get(key) == value, self.lines), None)
+        return Query(self, [(key, value)]).first()
 
     @property
     def text(self):
@@ -196,7 +869,7 @@ class File(object):
             print gedcom_file.text
 
         """
-        return "\n".join(line.text for line in self.lines)
+        return "\n".join(text for line in self.lines for text in line.texts)
 
     @property
     def json(self):
@@ -209,8 +882,93 @@ class File(object):
             print gedcom_file.json
 
         """
+        import json
         return json.dumps(self.lines, sort_keys=True, indent=4, separators=(',', ': '))
 
+    def write_text(self, fp, newline="\n"):
+        """ Write the contents of the GEDCOM file as plain text to a file object, a chunk of lines at a time
+
+        Unlike the text property, the whole text is never held in memory.
+
+        :param fp: The file object to write to
+        :type fp: file
+
+        :param newline: The line terminator, written after every line including the last
+        :type newline: str
+
+        :Example:
+            with open("family.ged", "w") as f:
+                gedcom_file.write_text(f)
+
+        """
+        for i in xrange(0, len(self.lines), WRITE_CHUNK_LINES):
+            fp.write("".join(text + newline for line in self.lines[i:i + WRITE_CHUNK_LINES] for text in line.texts))
+
+    def write_json(self, fp, compact=False):
+        """ Write the contents of the GEDCOM file as JSON to a file object, a chunk of lines at a time
+
+        Unlike the json property, the whole JSON string is never held in memory.
+
+        :param fp: The file object to write to
+        :type fp: file
+
+        :param compact: Write without indentation, spaces or sorted keys, which is smaller and faster to write.
+        Otherwise the same pretty printed JSON as the json property is written.
+        :type compact: bool
+
+        """
+        import json
+        if compact:
+            fp.write("[")
+            for i in xrange(0, len(self.lines), WRITE_CHUNK_LINES):
+                chunk = self.lines[i:i + WRITE_CHUNK_LINES]
+                fp.write(("," if i else "") + ",".join(json.dumps(line, separators=(',', ':')) for line in chunk))
+            fp.write("]")
+            return
+        chunks = json.JSONEncoder(sort_keys=True, indent=4, separators=(',', ': ')).iterencode(self.lines)
+        # The encoder yields many small strings, so join them into larger writes
+        buffered = []
+        for chunk in chunks:
+            buffered.append(chunk)
+            if len(buffered) >= WRITE_CHUNK_LINES * 10:
+                fp.write("".join(buffered))
+                buffered = []
+        fp.write("".join(buffered))
+
+    def to_sqlite(self, path=":memory:"):
+        """ Export the individuals, families, memberships and events of the file into an SQLite database
+
+        :param path: Database file to export to, or ":memory:"
+        :type path: str
+
+        :return: connection to the database, see the database module for its tables
+        :rtype: sqlite3.Connection
+
+        :Example:
+            connection = gedcom_file.to_sqlite("family.db")
+
+        """
+        import database
+        return database.export(self, path)
+
+    @property
+    def root(self):
+        """ The File the lines were read into, this file itself unless it is a SubFile
+
+        :rtype: File
+
+        """
+        return self
+
+    @property
+    def now_string(self):
+        """ The date this file is checked against, written as in a GEDCOM DATE line, e.g. "18 OCT 2026"
+
+        :rtype: str
+
+        """
+        return self.now.strftime("%d %b %Y").upper()
+
     @property
     def individuals(self):
         return [tag.Individual(line) for line in self.find("tag", "INDI")]
@@ -223,8 +981,99 @@ class File(object):
     def dates(self):
         return [tag.Date(line) for line in self.find("tag", "DATE")]
 
+    @property
+    @tag.cachemethod
+    def births_by_family(self):
+        """ Children of each family, sorted by birth date, leaving out children without a birth date
+
+        :return: dictionary of family line number to list of (birth date ordinal, Individual)
+        :rtype: dict
+
+        """
+        births = {}
+        for fam in self.families:
+            dated = [(c.birth_date.dt.toordinal(), c) for c in fam.children
+                     if c.has("birth_date") and c.birth_date.dt is not None]
+            births[fam.ln] = sorted(dated, key=lambda x: x[0])
+        return births
+
+    @property
+    @tag.cachemethod
+    def ages(self):
+        """ Date columns and ages of every individual and family, see ages.Ages
+
+        :rtype: ages.Ages
+
+        """
+        import ages
+        return ages.Ages(self)
+
+    @property
+    @tag.cachemethod
+    def status(self):
+        """ Bitmaps of the status of every individual, see status.Status
+
+        :rtype: status.Status
+
+        """
+        import status
+        return status.Status(self.ages)
+
+    @property
+    @tag.cachemethod
+    def birthday_index(self):
+        """ Living individuals by the day of the year of their birth, see dayindex.birthdays
+
+        :rtype: dayindex.DayIndex
+
+        """
+        import dayindex
+        return dayindex.birthdays(self.ages)
 
+    @property
+    @tag.cachemethod
+    def anniversary_index(self):
+        """ Current marriages by the day of the year of the marriage, see dayindex.anniversaries
 
+        :rtype: dayindex.DayIndex
+
+        """
+        import dayindex
+        return dayindex.anniversaries(self.ages)
+
+    @property
+    @tag.cachemethod
+    def spouse_kinship(self):
+        """ Relatives each individual is married to, see kinship.spouse_kinship
+
+        :return: dictionary of INDI line number to list of kinship.Kin
+        :rtype: dict
+
+        """
+        import kinship
+        return kinship.spouse_kinship(self.find("tag", "INDI"), self.root)
+
+    @property
+    @tag.cachemethod
+    def kinship_adjacency(self):
+        """ The families each individual is a child and a spouse in, and the parents and children of each family
+
+        :rtype: kinship.Adjacency
+
+        """
+        import kinship
+        return kinship.Adjacency(self)
+
+    @property
+    @tag.cachemethod
+    def timeline(self):
+        """ Every dated birth, death, marriage and divorce, sorted by date, see timeline.Timeline
+
+        :rtype: timeline.Timeline
+
+        """
+        import timeline
+        return timeline.Timeline(self.ages)
 
 
 class SubFile(File):
@@ -263,6 +1112,135 @@ class SubFile(File):
 
         """
         self.lines = lines
+        self.now = self.root.now if lines else tag.NOW
+        self.indexes = {}
+        self.cache = {}
+        self.listeners = []
+
+    @property
+    def root(self):
+        """ The File the lines of this SubFile were read into, the SubFile itself if it has no lines
+
+        :rtype: File
+
+        """
+        return self.lines[0].file if self.lines else self
+
+
+class Query(object):
+    """GEDCOM Query Class
+
+    A lazy view of the lines of a File matching conditions. Nothing is searched until the view is iterated, and it is
+    searched again each time, so it reflects changes to the file.
+
+    The search starts from the smallest index lookup among the conditions: the lines with a tag, level or xref_ID, or
+    the children of the lines with the parent tag. The other conditions are only checked on those lines. Without an
+    indexed condition, or on a SubFile which has no indexes, every line is checked.
+
+    :Example:
+        dates = g.query(tag="DATE")
+        for line in dates.query(parent_tag="DEAT"):
+            print line.text
+
+    """
+
+    def __init__(self, gedcom_file, equals=(), value_prefixes=(), parent_tags=()):
+        """Initiate GEDCOM Query Class
+
+        :param gedcom_file: The File or SubFile to search
+        :type gedcom_file: File
+
+        :param equals: (key, value) pairs the lines must have
+        :param value_prefixes: strings the line_value must start with
+        :param parent_tags: tags the parent line must have
+
+        """
+        self.file = gedcom_file
+        self.equals = list(equals)
+        self.value_prefixes = list(value_prefixes)
+        self.parent_tags = list(parent_tags)
+
+    def query(self, tag=None, level=None, xref=None, value_prefix=None, parent_tag=None, **equals):
+        """ Narrow this view with more conditions, see File.query
+
+        :rtype: Query
+
+        """
+        named = [(k, v) for k, v in (("tag", tag), ("level", level), ("xref_ID", xref)) if v is not None]
+        return Query(self.file, self.equals + named + equals.items(),
+                     self.value_prefixes + ([value_prefix] if value_prefix is not None else []),
+                     self.parent_tags + ([parent_tag] if parent_tag is not None else []))
+
+    def plan(self):
+        """ Choose the line numbers to check
+
+        :returns: line numbers in file order, None to check every line
+        :rtype: list
+
+        """
+        indexes = self.file.indexes
+        best = None
+        for key, value in self.equals:
+            if key in indexes:
+                found = indexes[key].get(value, [])
+                if best is None or len(found) < len(best):
+                    best = found
+        if "tag" in indexes:
+            for parent_tag in self.parent_tags:
+                parents = indexes["tag"].get(parent_tag, [])
+                # Each parent has at least one child when it is worth starting from
+                if best is None or len(parents) < len(best):
+                    lines = self.file.lines
+                    best = sorted(n for p in parents for n in lines[p].get("children_line_numbers", []))
+        return best
+
+    def matches(self, line):
+        """ Check a line matches every condition
+
+        :rtype: bool
+
+        """
+        for key, value in self.equals:
+            if line.get(key) != value:
+                return False
+        for prefix in self.value_prefixes:
+            if not (line.get("line_value") or "").startswith(prefix):
+                return False
+        if self.parent_tags:
+            parent = line.parent
+            if parent is None or any(parent.tag != t for t in self.parent_tags):
+                return False
+        return True
+
+    def __iter__(self):
+        """ Iterate over the matching lines, in file order """
+        line_numbers = self.plan()
+        lines = self.file.lines if line_numbers is None else imap(self.file.lines.__getitem__, line_numbers)
+        if len(self.equals) == 1 and not (self.value_prefixes or self.parent_tags):
+            # A single key and value, as from find and find_one, is checked without the general matches
+            key, value = self.equals[0]
+            return ifilter(lambda d: d.get(key) == value, lines)
+        return ifilter(self.matches, lines)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def first(self):
+        """ The first matching line, None if no line matches
+
+        :rtype: Line
+
+        """
+        return next(iter(self), None)
+
+    @property
+    def lines(self):
+        """ The matching lines, as a list
+
+        :rtype: list
+
+        """
+        return list(self)
 
 
 class Line(dict):
@@ -273,8 +1251,15 @@ class Line(dict):
     GEDCOM Lines.
 
     """
+    continuations = ()
+    """list: The text of the CONC and CONT lines folded into this line's line_value, see File.read_lines."""
+
+    source_line = 0
+    """int: The line number of this line in the file as read or written, counting the CONC and CONT lines before it."""
 
-    def __init__(self, line_string, file_class, line_number):
+    __text = None
+
+    def __init__(self, line_string, file_class, line_number, keep_text=True):
         """Initiate GEDCOM Line Class
 
         :param line_string: The string of the gedcom line
@@ -290,21 +1275,29 @@ class Line(dict):
         :note file_class: Specifying line number on initiation is more useful than having to continually check where
         a line is located in a list.
 
+        :param keep_text: False to read the text back from the source of the File instead of keeping it, see
+        File.read_source
+        :type keep_text: bool
+
         """
         self.file = file_class
-        # Set the private variable __text to the string provided, stripped of white space.
-        self.__text = line_string.strip()
+        # Set the private variable __text to the string provided, stripped of white space, unless it is read from the source.
+        line_string = line_string.strip()
+        if keep_text:
+            self.__text = line_string
         # Set the update the dictionary object key values based on the string provided
         # This is a benefit of using a subclass because the user doesn't have to pass in
         # a dictionary
         try:
-            self.update(**parse_line(self.__text))
+            self.update(**parse_line(line_string))
         except SyntaxError as e:
             sys.exit("line number {0}: {1}".format(line_number, e.msg))
 
         # Add line number to the dictionary. This is more useful on continuously checking
         # where this object is in a list of Line objects
         self.update({"line_number": line_number})
+        # The File sets the source line number when CONC or CONT lines were folded into the lines before this one
+        self.source_line = line_number
         # Add empty children_line_numbers and parent_line_number keys to this dictionary.
         # This will be updated if this object was generated by the File class
         self.update({"children_line_numbers": [], "parent_line_numbers": []})
@@ -313,19 +1306,30 @@ class Line(dict):
     def text(self):
         """Print GEDCOM Line as Text
 
-        :note: this method currently returns the text string that was initially
-        passed to create this object. This function may need to be updated to
-        represent the string based on the dictionary if we want to support alteration
-        to the GEDCOM file.
+        :note: this method returns the text string that was passed to create this object,
+        or the text it was changed to with set_text.
 
         :note: this function also provides a way of preventing the user from changing self.text
 
+        :note: a line of a file read with File.read_source reads its text from the source of the file.
+
         :returns: GEDCOM line as text
         :rtype: string
 
         """
+        if self.__text is None:
+            return self.file.source_text(self.source_line)
         return self.__text
 
+    @property
+    def texts(self):
+        """ The GEDCOM lines this line was read from, its own text followed by its CONC and CONT lines
+
+        :rtype: list of str
+
+        """
+        return [self.text] + list(self.continuations)
+
     @property
     def children(self):
         """ Returns a list of GEDCOM lines objects that are children of this line.
@@ -361,87 +1365,68 @@ class Line(dict):
         """
         return next(imap(self.file.lines.__getitem__, self.get('parent_line_numbers', [])), None)
 
+    def set_text(self, text, continuations=()):
+        """ Change the text of this line, and the level, xref_ID, tag and line_value parsed from it
+
+        :note: Use File.update_line to change a line, which also keeps the indexes of the file up to date.
+
+        :note: The CONC and CONT lines of this line are replaced with the continuations given, and their values are
+        joined to the value of the new text, as when the file is read.
+
+        :param text: The new GEDCOM line
+        :type text: str
+
+        :param continuations: The new CONC and CONT lines of this line
+        :type continuations: list of str
+
+        :raises SyntaxError: if the text is not a GEDCOM line, or a continuation is not a CONC or CONT line, in which
+        case the line is not changed
+
+        """
+        d = parse_line(text.strip())
+        parts = [d.get("line_value") or ""]
+        for continuation in continuations:
+            m = regex_continuation.match(continuation)
+            if m is None:
+                raise SyntaxError('"{0}" is not a CONC or CONT line'.format(continuation))
+            parts.extend(["\n" if m.group("tag") == "CONT" else "", m.group("line_value") or ""])
+        if continuations:
+            d["line_value"] = "".join(parts)
+        self.__text = text.strip()
+        self.continuations = list(continuations)
+        self.update(d)
+
+    def keep_text(self):
+        """ Keep the text of this line, read from the source of its File if it was not kept, see File.keep_texts """
+        self.__text = self.text
+
     def refresh(self):
         """ Refresh this line
 
-        Currently this determines which lines are parents and children of one another.
-
-        :note: Currently this only needs to be called when the class is initiated, however
-        if we want to support adding and removing line, this class will need to be called again.
-        The calling of this method is handled by the File class once all Line ojects are created.
-
-        """
-        # Refresh Children Line Numbers.
-        self.update({"children_line_numbers": self.__find_children_line_numbers()})
-        # Refresh Parent Line Numbers.
-        self.update({"parent_line_numbers": self.__find_parent_line_numbers()})
-
-    def __find_children_line_numbers(self):
-        """ Determine the line numbers of the children of this line.
-
-        :returns: list of children line numbers
-        :rtype: list of integers
-
-        """
-        child_line_numbers = []
-        lines = self.file.lines
-        line_number = self.get("line_number")
-        #  if the line of this object isn't the last line in the file.
-        if line_number < len(lines) - 1:
-            #  if the line right after the line of this object has a greater level.
-            if lines[line_number + 1].get("level") > lines[line_number]["level"]:
-                # for the lines after the line of this object.
-                for next_line in lines[line_number + 1:]:
-                    # If the next_line we are on is on the same level
-                    # as the first line after the line of this object.
-                    if next_line["level"] == lines[line_number + 1]["level"]:
-                        # Add this line number to the list of child line numbers
-                        child_line_numbers.append(next_line.get('line_number'))
-                    # Else if the next_line we are on has a greater level
-                    # as the first line after the line of this object.
-                    elif next_line["level"] > lines[line_number + 1]["level"]:
-                        # We will ignore it because it is further down the tree.
-                        # We will continue searching through lines though because
-                        # there is still a possibility of finding more children of
-                        # this object.
-                        pass
-                    # Else if the next_line we are on has a lower level
-                    # as the first line after the line of this object.
-                    elif next_line["level"] < lines[line_number + 1]["level"]:
-                        # We will stop looking for children because we are done
-                        # searching through this branch. All additional children
-                        # will not be a child of this object.
-                        break
-        return child_line_numbers
-
-    def __find_parent_line_numbers(self):
-        """Determine the line numbers of the children of this line.
-
-        :note: children_line_numbers must be accurate for this method to work properly.
-        This is handled by updating the children_line_numbers before the parent_line_numbers in this.refresh
-
-        :returns: list of parent line numbers
-        :rtype: list of integers
-
-        """
-        lines = filter(lambda line: self["line_number"] in line.get("children_line_numbers", []), self.file.lines)
-        line_numbers = map(lambda line: line.get("line_number"), lines)
-        return line_numbers
+        Currently this determines which lines are parents and children of one another,
+        for the record this line is in.
+
+        :note: The File class refreshes every line when it is read, and the lines around an edit when it is edited.
+
+        """
+        self.file.refresh_hierarchy(self["line_number"], self["line_number"] + 1)
 
     def follow_xref(self):
         """ Search file lines with an xref_id equal to this lines line_value
 
+        :note: This uses the xref index of the File that created this line.
+
         :returns: matching line
         :rtype: GEDCOM Line
         """
-        return self.file.find_one('xref_ID', self.get("line_value"))
+        return self.file.xrefs.get(self.get("line_value"))
 
     @property
     def ln(self):
-        """ Line Number Property
+        """ Line Number Property, as in the file, so it counts the CONC and CONT lines before this line
         :return: line number
         """
-        return self.get("line_number")+1
+        return self.source_line + 1
 
     @property
     def tag(self):
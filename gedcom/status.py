@@ -0,0 +1,133 @@
+""" Status Bitmaps
+
+This module keeps the status of every individual of a GEDCOM file as bitmaps, so the listings of the deceased, the
+living married and the living single (US29 to US31), and any other question about the whole population, are bitwise
+combinations of a few integers instead of checks of every individual.
+
+A bitmap is a Python integer with bit i set for the individual with id i (see ages.Ages), so &, | and ^ combine
+bitmaps a machine word at a time, and the bits of everyone not in a bitmap are Status.everyone & ~bitmap.
+
+:Example:
+    status = gedcom_file.status
+    living_widowed = status.everyone & ~status.is_deceased & status.ever_married & ~status.is_currently_married
+    print status.count(living_widowed)
+    for i in members(living_widowed):
+        print gedcom_file.ages.individuals[i]
+
+"""
+import binascii
+
+from ages import NONE
+
+__author__ = "Constantine Davantzis"
+
+
+def from_flags(flags):
+    """ The bitmap of a sequence of flags, with bit i set if flag i is true
+
+    :param flags: A flag for each id, in order
+    :type flags: iterable
+
+    :rtype: int
+
+    """
+    data = bytearray()
+    byte = bit = 0
+    for flag in flags:
+        if flag:
+            byte |= 1 << bit
+        bit += 1
+        if bit == 8:
+            data.append(byte)
+            byte = bit = 0
+    if bit:
+        data.append(byte)
+    data.reverse()
+    # Convert all bytes at once, setting the bits of an integer one at a time copies it for every bit
+    return int(binascii.hexlify(data) or "0", 16)
+
+
+def members(bitmap):
+    """ The ids of the bits set in a bitmap, in order
+
+    :param bitmap: A bitmap, not negative
+    :type bitmap: int
+
+    :returns: generator of ids
+    :rtype: generator
+
+    """
+    digits = "{0:x}".format(bitmap)
+    data = bytearray(binascii.unhexlify("0" * (len(digits) % 2) + digits))
+    data.reverse()
+    for n, byte in enumerate(data):
+        if byte:
+            for bit in xrange(8):
+                if byte >> bit & 1:
+                    yield n * 8 + bit
+
+
+class Status(object):
+    """ Bitmaps of the status of every individual of a GEDCOM file
+
+    A marriage is a family with both a husband and a wife. It is current if the family has no DIV record and neither
+    spouse has a DEAT record.
+
+    :ivar everyone: Every individual
+    :ivar is_deceased: Individuals with a DEAT record, dated or not
+    :ivar ever_married: Individuals who are or were a spouse in a marriage
+    :ivar is_currently_married: Individuals who are a spouse in a current marriage
+    :ivar age_over_30: Individuals over 30 years old, or who were when they died (see ages.Ages.age)
+
+    """
+
+    def __init__(self, ages):
+        """ Build the bitmaps from the columns of a GEDCOM file
+
+        :param ages: The ages of a GEDCOM file
+        :type ages: ages.Ages
+
+        """
+        self.ages = ages
+        n = len(ages.individuals)
+        self.everyone = (1 << n) - 1
+        self.is_deceased = from_flags(ages.deceased)
+        ever, current = bytearray(n), bytearray(n)
+        for husband, wife, divorced in zip(ages.husband, ages.wife, ages.divorced):
+            if husband == NONE or wife == NONE:
+                continue
+            ever[husband] = ever[wife] = 1
+            if not divorced and not ages.deceased[husband] and not ages.deceased[wife]:
+                current[husband] = current[wife] = 1
+        self.ever_married = from_flags(ever)
+        self.is_currently_married = from_flags(current)
+        self.age_over_30 = self.age_over(30)
+
+    def age_over(self, years):
+        """ The bitmap of the individuals over an age, or who were when they died
+
+        :param years: The age
+        :type years: float
+
+        :rtype: int
+
+        """
+        # An unknown age is NaN, which is not over any age
+        return from_flags(age > years for age in self.ages.age)
+
+    def living(self):
+        """ The bitmap of the individuals without a DEAT record
+
+        :rtype: int
+
+        """
+        return self.everyone & ~self.is_deceased
+
+    @staticmethod
+    def count(bitmap):
+        """ The number of individuals in a bitmap
+
+        :rtype: int
+
+        """
+        return bin(bitmap).count("1")
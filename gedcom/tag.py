@@ -7,6 +7,11 @@ NOW = datetime.now()
 NOW_STRING = NOW.strftime("%d %b %Y").upper()
 
 
+def descendant_title(i):
+    """ Title of a descendant i generations down, e.g. child, grandchild, great-grandchild """
+    return "child" if i == 1 else "grandchild" if i == 2 else (i-2)*"great-"+"grandchild"
+
+
 def cachemethod(func):
     def wrapper(self, *args):
         if func.__name__ in self.cache:
@@ -169,7 +174,7 @@ class Individual(Base):
         if self.birth_date:
             if self.death_date:
                 return tools.years_between(self.birth_date.dt, self.death_date.dt)
-            return tools.years_between(self.birth_date.dt, NOW)
+            return tools.years_between(self.birth_date.dt, self.line.file.now)
         return None
 
     @property
@@ -327,7 +332,7 @@ class Individual(Base):
     @cachemethod
     def descendants(self):
 
-        title = lambda i: "child" if i == 1 else "grandchild" if i == 2 else (i-2)*"great-"+"grandchild"
+        title = descendant_title
 
         def get_d(individuals=[], checked=[], i=1):
             new = []
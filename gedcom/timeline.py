@@ -0,0 +1,73 @@
+""" Event Timeline
+
+This module keeps every dated event of a GEDCOM file, births and deaths of individuals and marriages and divorces of
+families, in one list sorted by date, so the events between two dates are found by bisection instead of by checking
+every record, e.g. for the listings of recent births, deaths and survivors (US35 to US37).
+
+Each event is a (type, date ordinal, id) tuple, where the id is the individual id of a birth or death and the family
+id of a marriage or divorce (see ages.Ages).
+
+:Example:
+    for event, ordinal, i in gedcom_file.timeline.events_between(start, end, ["DEAT"]):
+        print gedcom_file.ages.individuals[i]
+
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+from ages import MISSING
+
+__author__ = "Constantine Davantzis"
+
+EVENT_TYPES = ("BIRT", "DEAT", "MARR", "DIV")
+"""tuple: The types of events kept, the position of a type is the code it is kept as."""
+
+
+class Timeline(object):
+    """ Every dated event of a GEDCOM file, sorted by date
+
+    :ivar ordinals: The date ordinal of each event, sorted
+    :ivar types: The position in EVENT_TYPES of the type of each event
+    :ivar ids: The individual or family id of each event
+
+    """
+
+    def __init__(self, ages):
+        """ Sort the dated events of the date columns of a GEDCOM file
+
+        :param ages: The ages of a GEDCOM file
+        :type ages: ages.Ages
+
+        """
+        columns = (ages.birth, ages.death, ages.marriage, ages.divorce)
+        events = sorted((ordinal, code, i) for code, column in enumerate(columns)
+                        for i, ordinal in enumerate(column) if ordinal != MISSING)
+        self.ordinals = array("l", (ordinal for ordinal, _, _ in events))
+        self.types = array("b", (code for _, code, _ in events))
+        self.ids = array("l", (i for _, _, i in events))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def events_between(self, start, end, types=None):
+        """ The events from the start date to the end date, inclusive, sorted by date
+
+        :param start: The date ordinal of the first day
+        :type start: int
+
+        :param end: The date ordinal of the last day
+        :type end: int
+
+        :param types: The event types to return, e.g. ["BIRT"], defaults to every type
+        :type types: iterable
+
+        :returns: list of (type, date ordinal, id) tuples
+        :rtype: list
+
+        :raises ValueError: if a type is not in EVENT_TYPES
+
+        """
+        codes = set(EVENT_TYPES.index(t) for t in (EVENT_TYPES if types is None else types))
+        first, last = bisect_left(self.ordinals, start), bisect_right(self.ordinals, end)
+        return [(EVENT_TYPES[self.types[n]], self.ordinals[n], self.ids[n]) for n in xrange(first, last)
+                if self.types[n] in codes]
@@ -1,14 +1,19 @@
 """
 Tools for gedcom project
 """
+import heapq
 import re
-from datetime import datetime
+from datetime import date, datetime
 
 import parser
 
 NOW = datetime.now()
 NOW_STRING = NOW.strftime("%d %b %Y").upper()
 
+MONTHS = dict((m, i + 1) for i, m in enumerate(["JAN", "FEB", "MAR", "APR", "MAY", "JUN",
+                                                "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]))
+"""dict: Month number of each GEDCOM month abbreviation."""
+
 # TODO: Better Comments
 
 
@@ -24,6 +29,23 @@ def parse_date(s):
     raise ValueError("Unsupported Date Format")
 
 
+def date_ordinal(s):
+    """ parse linedate string into a date ordinal, the ordinal of parse_date(s)
+
+    Full dates, e.g. "1 JAN 1900", are converted without strptime, which is slow when reading every date of a file.
+
+    :raises ValueError: if the date is not in a format parse_date supports
+    """
+    parts = s.split()
+    if (len(parts) == 3 and s == s.strip() and parts[0].isdigit() and len(parts[0]) <= 2 and
+            parts[1].upper() in MONTHS and parts[2].isdigit() and len(parts[2]) == 4):
+        try:
+            return date(int(parts[2]), MONTHS[parts[1].upper()], int(parts[0])).toordinal()
+        except ValueError:
+            pass
+    return parse_date(s).toordinal()
+
+
 def days_between(a, b):
     """ Calculate the days between two dates
 
@@ -47,7 +69,93 @@ def years_between(a, b):
     :rtype: float
 
     """
-    return abs(round(float((a - b).days) / 365, 2))
+    return years_in_days((a - b).days)
+
+
+def years_in_days(days):
+    """ Calculate the years in a number of days, the way years_between does
+
+    :param days: days between two dates, in either order
+    :type days: int
+
+    :return: years in the days
+    :rtype: float
+
+    """
+    return abs(round(float(days) / 365, 2))
+
+
+def sweep_overlaps(intervals):
+    """ Find overlapping intervals by sorting and sweeping
+
+    Intervals are closed, so two intervals overlap when each one starts on or before the other ends.
+    Intervals that end before they start never overlap an interval starting after their end.
+
+    :param intervals: (start, end, item) tuples
+    :type intervals: iterable
+
+    :return: iterator of (item_a, item_b, overlapping) tuples, with item_a starting before item_b. Every pair of
+    intervals is returned, and only the intervals still active in the sweep are compared to find the overlapping pairs.
+    :rtype: iterator
+
+    """
+    active = []  # heap of (end, position, start, item) for intervals that may still overlap the next one
+    earlier = []  # items of the intervals swept so far, by position
+    for position, (start, end, item) in enumerate(sorted(intervals, key=lambda x: x[0])):
+        while active and active[0][0] < start:
+            heapq.heappop(active)
+        overlapping = set(other_position for _, other_position, other_start, _ in active if other_start <= end)
+        for other_position, other in enumerate(earlier):
+            yield other, item, other_position in overlapping
+        heapq.heappush(active, (end, position, start, item))
+        earlier.append(item)
+
+
+def soundex(s):
+    """ American Soundex code of a name, used to group names that sound alike
+
+    :param s: name
+    :type s: str
+
+    :return: letter followed by three digits, e.g. "R163" for both "Robert" and "Rupert", "" if s has no letters
+    :rtype: str
+
+    """
+    letters = [c for c in s.upper() if c.isalpha()]
+    if not letters:
+        return ""
+    codes = {}
+    for digit, group in enumerate(["BFPV", "CGJKQSXZ", "DT", "L", "MN", "R"], 1):
+        codes.update((c, str(digit)) for c in group)
+    code, last = letters[0], codes.get(letters[0])
+    for c in letters[1:]:
+        digit = codes.get(c)
+        if digit and digit != last:
+            code += digit
+        if c not in "HW":  # H and W do not separate letters with the same code
+            last = digit
+    return (code + "000")[:4]
+
+
+def edit_distance(a, b):
+    """ Levenshtein distance between two strings
+
+    :param a: string 1
+    :param b: string 2
+
+    :return: fewest single character insertions, deletions or substitutions turning a into b
+    :rtype: int
+
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = range(len(b) + 1)
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
 
 
 def human_sort(s, _re=re.compile('([0-9]+)')):
@@ -0,0 +1,374 @@
+"""
+Incremental Validation
+
+Runs the story functions one record at a time, remembering which records each result depended on,
+so that after an edit only the results that depended on the edited records are re-evaluated.
+"""
+from bisect import bisect_left, bisect_right
+import re
+
+import gedcom
+import stories
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+LINK_TAGS = ("FAMS", "FAMC", "HUSB", "WIFE", "CHIL")
+"""tuple: Tags whose values link an INDI record to a FAM record or a FAM record to an INDI record."""
+
+regex_line_number = re.compile(r"\bline (\d+)")
+"""Regular Expression Object: Finds the line numbers in the text of story results, e.g. "1 JAN 1900 (line 12)"."""
+
+
+def renumber(output, first, shift):
+    """ Shift the line numbers in story results from a line number on, e.g. after lines were inserted above them
+
+    :param output: Story results, or any list, tuple or dictionary of them, strings and numbers
+    :param first: The first line number (as reported, see parser.Line.ln) to shift
+    :type first: int
+    :param shift: The number of lines to shift them by
+    :type shift: int
+
+    :returns: the results with the line numbers shifted
+    """
+    if isinstance(output, basestring):
+        return regex_line_number.sub(lambda m: "line {0}".format(int(m.group(1)) + shift)
+                                     if int(m.group(1)) >= first else m.group(0), output)
+    if isinstance(output, (list, tuple)):
+        return type(output)(renumber(x, first, shift) for x in output)
+    if isinstance(output, dict):
+        return dict((k, v + shift if k == "line_number" and isinstance(v, int) and v >= first
+                     else renumber(v, first, shift)) for k, v in output.iteritems())
+    return output
+
+
+class Validator(object):
+    """ Incremental Story Validator
+
+    Each story marked with scope "record" is checked on every level 0 record of the file on its own.
+    The result for a record depends on the records within the story's reach, i.e. the individual, their
+    families, and their parents, spouses, siblings and children for a reach of 2. Stories marked with scope
+    "key" compare the records with the same key, e.g. the same name and birth date, so each record's key is kept
+    and only the records with the keys a record had before and after an edit are checked again. Stories marked with
+    scope "file" compare records across the whole file, so they are re-evaluated after any edit.
+
+    :note: Records are identified by the line number of their level 0 line. Edits made through the File's
+    editing methods (e.g. insert_record or update_line) are followed as they happen, renumbering the records after
+    them, and the records they touched are re-evaluated on the next call to revalidate. The line numbers in the
+    results of the records after an edit are shifted by the lines it inserted or deleted.
+
+    :Example:
+        v = Validator(gedcom_file)
+        v.validate()
+        gedcom_file.xrefs['@I1@'].children.find_one('tag', 'SEX')['line_value'] = 'F'
+        v.revalidate('@I1@')
+        print v.results
+
+    """
+
+    def __init__(self, gedcom_file, story_functions=None):
+        """ Initiate Validator
+
+        :param gedcom_file: The GEDCOM File to validate
+        :type gedcom_file: parser.File
+
+        :param story_functions: The story functions to run, defaults to every story in stories.py
+        :type story_functions: list
+
+        """
+        self.file = gedcom_file
+        self.stories = list(stories.STORIES if story_functions is None else story_functions)
+        self.starts = []  # line number of each level 0 line
+        self.start_lns = []  # line number reported for each level 0 line, see parser.Line.ln
+        self.links = {}  # record -> set of records it links to
+        self.linked_from = {}  # record -> set of records linking to it
+        self.output = [{} for _ in self.stories]  # story index -> {record or key: output}, or output for "file"
+        self.keys = [{} for _ in self.stories]  # story index -> {record: key} for "key" stories
+        self.groups = [{} for _ in self.stories]  # story index -> {key: set of records} for "key" stories
+        self.depends_on = {}  # (story index, record) -> set of records
+        self.dependents = {}  # record -> set of (story index, record)
+        self.pending = set()  # records edited through the file since the last revalidate
+        self.pending_checks = set()  # (story index, record) that depended on records since deleted
+        self.pending_groups = set()  # (story index, key) whose records changed since they were checked
+        self.__index()
+        gedcom_file.listeners.append(self.spliced)
+
+    def __index(self):
+        """ Find the level 0 lines of the file and the links between them """
+        self.starts = [line["line_number"] for line in self.file.lines if line["level"] == 0]
+        self.start_lns = [self.file[record].ln for record in self.starts]
+        self.links, self.linked_from = {}, {}
+        for record in self.starts:
+            self.__relink(record)
+
+    def __relink(self, record):
+        """ Find the links of a record again, e.g. after it was edited """
+        for target in self.links.get(record, ()):
+            self.linked_from.get(target, set()).discard(record)
+        self.links[record] = self.__find_links(record)
+        for target in self.links[record]:
+            self.linked_from.setdefault(target, set()).add(record)
+
+    def __find_links(self, record):
+        """ Find the records directly linked to a record through FAMS, FAMC, HUSB, WIFE and CHIL lines
+
+        :param record: line number of the level 0 line
+        :type record: int
+
+        :returns: set of linked records
+        :rtype: set
+
+        """
+        linked = set()
+        for line in self.file[record].children:
+            if line.tag in LINK_TAGS:
+                target = line.follow_xref()
+                if target is not None:
+                    linked.add(target["line_number"])
+        return linked
+
+    def spliced(self, start, stop, count):
+        """ Follow an edit of the file, see parser.File.splice
+
+        The records after the edit are renumbered, and so are the line numbers in their results, the records
+        starting in the replaced lines are forgotten, and the records around the edit, and the results that depended
+        on forgotten records, are left for revalidate.
+
+        :param start: The line number of the first line replaced
+        :param stop: The line number after the last line replaced
+        :param count: The number of new lines
+
+        """
+        delta = count - (stop - start)
+
+        def move(record):
+            return record if record < start else record + delta if record >= stop else None
+
+        def move_all(records):
+            return set(m for m in map(move, records) if m is not None)
+
+        def move_checks(checks):
+            return set((s, move(r)) for s, r in checks if move(r) is not None)
+
+        removed = [r for r in self.starts if start <= r < stop]
+        for record in removed:
+            self.pending_checks.update(self.dependents.get(record, ()))
+            self.pending.update(self.linked_from.get(record, ()))
+            for s, story in enumerate(self.stories):
+                if story.scope == "key":
+                    self.__regroup(s, record, None)
+        self.pending, self.pending_checks = move_all(self.pending), move_checks(self.pending_checks)
+
+        for s, story in enumerate(self.stories):
+            if story.scope == "record":
+                self.output[s] = dict((move(r), out) for r, out in self.output[s].iteritems() if move(r) is not None)
+            elif story.scope == "key":
+                self.keys[s] = dict((move(r), key) for r, key in self.keys[s].iteritems() if move(r) is not None)
+                self.groups[s] = dict((key, move_all(records)) for key, records in self.groups[s].iteritems())
+        self.depends_on = dict(((s, move(r)), move_all(deps)) for (s, r), deps in self.depends_on.iteritems()
+                               if move(r) is not None)
+        self.dependents = dict((move(r), move_checks(checks)) for r, checks in self.dependents.iteritems()
+                               if move(r) is not None)
+        self.links = dict((move(r), move_all(t)) for r, t in self.links.iteritems() if move(r) is not None)
+        self.linked_from = dict((move(r), move_all(t)) for r, t in self.linked_from.iteritems() if move(r) is not None)
+
+        # The lines reported after the edit all move by the same number of lines, found from the first record after it.
+        # Any results mentioning the lines between the edit and that record depend on the edited record, and are
+        # re-evaluated.
+        after = bisect_left(self.starts, stop)
+        if after < len(self.starts):
+            first = self.start_lns[after]
+            shift = self.file[self.starts[after] + delta].ln - first
+            if shift:
+                self.output = [renumber(output, first, shift) for output in self.output]
+
+        self.starts = list(self.file.indexes["level"].get(0, []))
+        self.start_lns = [self.file[record].ln for record in self.starts]
+        edited = [self.record_of(n) for n in (start - 1, start) if 0 <= n < len(self.file.lines)]
+        edited += self.starts[bisect_left(self.starts, start):bisect_left(self.starts, start + count)]
+        self.pending.update(r for r in edited if r is not None)
+
+    def record_of(self, item):
+        """ Find the record an xref or a line belongs to
+
+        :param item: xref (e.g. "@I1@"), Line, or line number
+        :type item: str, parser.Line or int
+
+        :returns: line number of the level 0 line, None if not found
+        :rtype: int
+
+        """
+        if isinstance(item, basestring):
+            line = self.file.xrefs.get(item)
+            return line["line_number"] if line is not None else None
+        line_number = item["line_number"] if isinstance(item, gedcom.parser.Line) else item
+        i = bisect_right(self.starts, line_number)
+        return self.starts[i - 1] if i else None
+
+    def lines_of(self, record):
+        """ Return the lines of a record as a SubFile
+
+        :param record: line number of the level 0 line
+        :type record: int
+
+        :rtype: SubFile
+
+        """
+        i = bisect_right(self.starts, record)
+        end = self.starts[i] if i < len(self.starts) else len(self.file.lines)
+        return gedcom.parser.SubFile(self.file.lines[record:end])
+
+    def reachable(self, record, reach):
+        """ Find the records within reach links of a record, including the record itself
+
+        Links are followed both ways, as stories may find a child through the family's CHIL line or the
+        individual's FAMC line.
+
+        :param record: line number of the level 0 line
+        :type record: int
+
+        :param reach: number of links to follow, None to follow links without limit
+        :type reach: int or None
+
+        :rtype: set
+
+        """
+        found, frontier, i = {record}, [record], 0
+        while frontier and (reach is None or i < reach):
+            frontier = [r for f in frontier for r in self.links.get(f, set()) | self.linked_from.get(f, set())
+                        if r not in found]
+            found.update(frontier)
+            i += 1
+        return found
+
+    def __check(self, s, record):
+        """ Run story s on a single record, or find its key for a "key" story, and record what it depended on """
+        self.__forget(s, record)
+        story = self.stories[s]
+        if story.scope == "key":
+            self.__regroup(s, record, story.key(self.file[record]))
+        else:
+            self.output[s][record] = story.func(self.lines_of(record))
+        deps = self.reachable(record, story.reach)
+        self.depends_on[(s, record)] = deps
+        for dep in deps:
+            self.dependents.setdefault(dep, set()).add((s, record))
+
+    def __forget(self, s, record):
+        """ Remove the recorded dependencies of story s on a record """
+        for dep in self.depends_on.pop((s, record), ()):
+            self.dependents.get(dep, set()).discard((s, record))
+
+    def __regroup(self, s, record, key):
+        """ Move a record to the group of another key of story s, or out of every group for None
+
+        The groups the record leaves and joins are left to be checked again, even for the same key, as the record
+        itself may have changed.
+
+        """
+        old = self.keys[s].pop(record, None)
+        if old is not None:
+            self.groups[s][old].discard(record)
+            self.pending_groups.add((s, old))
+        if key is not None:
+            self.keys[s][record] = key
+            self.groups[s].setdefault(key, set()).add(record)
+            self.pending_groups.add((s, key))
+
+    def __check_groups(self):
+        """ Run each "key" story on the records of each of its groups left to be checked, together """
+        for s, key in self.pending_groups:
+            records = self.groups[s].get(key)
+            if records:
+                lines = [line for record in sorted(records) for line in self.lines_of(record).lines]
+                self.output[s][key] = self.stories[s].func(gedcom.parser.SubFile(lines))
+            else:
+                self.groups[s].pop(key, None)
+                self.output[s].pop(key, None)
+        self.pending_groups = set()
+
+    def validate(self):
+        """ Run every story over the whole file
+
+        :returns: list of story results dictionaries
+        :rtype: list
+
+        """
+        self.output = [{} for _ in self.stories]
+        self.keys, self.groups = [{} for _ in self.stories], [{} for _ in self.stories]
+        self.depends_on, self.dependents, self.pending_groups = {}, {}, set()
+        for s, story in enumerate(self.stories):
+            if story.scope == "file":
+                self.output[s] = story.func(self.file)
+            else:
+                for record in self.starts:
+                    self.__check(s, record)
+        self.__check_groups()
+        return self.results
+
+    def revalidate(self, *changed):
+        """ Re-evaluate the results that depended on changed records
+
+        :param changed: the xrefs, lines or line numbers that were edited, besides those edited through the
+        File's editing methods which are re-evaluated without being given
+        :type changed: str, parser.Line or int
+
+        :returns: list of (story id, record line number) re-evaluated, record line number is None for stories
+        that compare records across the whole file
+        :rtype: list
+
+        """
+        records = set(r for r in map(self.record_of, changed) if r is not None) | self.pending
+        pending_checks = self.pending_checks
+        self.pending, self.pending_checks = set(), set()
+        if not (records or pending_checks or self.pending_groups):
+            return []
+        if changed:
+            # Lines changed without the File's editing methods may have left its indexes behind, e.g. a changed xref
+            self.file.refresh_xrefs()
+            self.file.refresh_indexes()
+            self.file.cache = {}
+        # Results reaching a record linked to or from a changed record may now reach the changed record too
+        targets = set()
+        for record in records:
+            targets.update(self.links.get(record, ()))
+            self.__relink(record)
+            targets.update(self.links[record])
+
+        affected = set((s, record) for s, story in enumerate(self.stories) if story.scope != "file"
+                       for record in records)
+        affected.update(pending_checks)
+        for record in records | targets:
+            affected.update(self.dependents.get(record, ()))
+
+        for s, record in sorted(affected):
+            self.__check(s, record)
+        self.__check_groups()
+
+        rerun = [(story.id, record) for s, record in sorted(affected) for story in [self.stories[s]]]
+        for s, story in enumerate(self.stories):
+            if story.scope == "file":
+                self.output[s] = story.func(self.file)
+                rerun.append((story.id, None))
+        return rerun
+
+    @property
+    def results(self):
+        """ The results of every story, in the same format the story functions return
+
+        :rtype: list
+
+        """
+        r = []
+        for s, story in enumerate(self.stories):
+            if story.scope == "file":
+                output = self.output[s]
+            else:
+                # Records in file order, and groups in the order of their keys
+                order = self.starts if story.scope == "record" else sorted(self.output[s])
+                output = {"passed": [], "failed": []}
+                for record in order:
+                    out = self.output[s].get(record, {})
+                    output["passed"].extend(out.get("passed", []))
+                    output["failed"].extend(out.get("failed", []))
+            r.append({"id": story.id, "name": story.__name__, "output": output})
+        return r
@@ -0,0 +1,106 @@
+"""
+Concurrent Ingestion
+
+Loads and validates GEDCOM files in worker threads, so a service handling many uploads is not blocked while each is
+parsed and checked. Every function returns a gedcom.background.Future, or iterates over results as they finish, and
+the executor's limits on running and queued calls hold back callers submitting faster than files are checked.
+
+:note: The stories log their results as they run, set stories.logger to WARNING to only receive them as results.
+
+:Example:
+    future = ingest.validate_file("upload.ged")
+    future.add_done_callback(lambda f: store(f.result()))
+
+    for path, results in ingest.ingest(paths, workers=4):
+        print path, sum(len(r["output"]["failed"]) for r in results)
+"""
+from collections import deque
+
+from gedcom import background
+import stories
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+
+def check(gedcom_file, story_functions=None):
+    """ Run the story functions on a GEDCOM File
+
+    :param story_functions: The story functions to run, defaults to every story in stories.py
+    :type story_functions: list
+
+    :returns: list of story results dictionaries
+    :rtype: list
+
+    """
+    return [s(gedcom_file) for s in (stories.STORIES if story_functions is None else story_functions)]
+
+
+def load_and_check(filename, story_functions=None):
+    """ Read, parse and check a GEDCOM file
+
+    :returns: list of story results dictionaries
+    :rtype: list
+
+    """
+    return check(background.load(filename), story_functions)
+
+
+def validate(gedcom_file, executor=None, story_functions=None):
+    """ Run the story functions on a GEDCOM File in a worker thread
+
+    :param gedcom_file: The GEDCOM File to check, e.g. the result of gedcom.aload
+    :type gedcom_file: parser.File
+
+    :param executor: The executor to check with, defaults to gedcom.background.default_executor()
+    :type executor: gedcom.background.Executor
+
+    :returns: Future of the list of story results dictionaries
+    :rtype: gedcom.background.Future
+
+    """
+    return (executor or background.default_executor()).submit(check, gedcom_file, story_functions)
+
+
+def validate_file(filename, executor=None, story_functions=None):
+    """ Read, parse and check a GEDCOM file in a worker thread
+
+    :note: Loading and checking run as one call, so a worker never waits on another to finish.
+
+    :returns: Future of the list of story results dictionaries
+    :rtype: gedcom.background.Future
+
+    """
+    return (executor or background.default_executor()).submit(load_and_check, filename, story_functions)
+
+
+def finished(filename, future):
+    """ Wait for the future of a file, returning the exception if it raised one """
+    e = future.exception()
+    return filename, e if e is not None else future.result()
+
+
+def ingest(filenames, workers=background.DEFAULT_WORKERS, max_pending=background.DEFAULT_MAX_PENDING,
+           story_functions=None):
+    """ Load and check many GEDCOM files concurrently, yielding their results in the order given
+
+    At most workers files are checked at once and max_pending more are queued, and results are yielded while later
+    files are still being submitted, so no more than workers + max_pending results are held at once.
+
+    :param filenames: GEDCOM filenames or file paths
+    :type filenames: iterable
+
+    :returns: generator of (filename, list of story results), or (filename, exception) for a file that failed
+    :rtype: generator
+
+    """
+    executor = background.Executor(workers, max_pending)
+    futures = deque()
+    try:
+        for filename in filenames:
+            futures.append((filename, executor.submit(load_and_check, filename, story_functions)))
+            while futures and (futures[0][1].done() or len(futures) >= workers + max_pending):
+                yield finished(*futures.popleft())
+        while futures:
+            yield finished(*futures.popleft())
+    finally:
+        executor.shutdown(wait=False)
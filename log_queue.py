@@ -0,0 +1,100 @@
+"""
+Queued Logging
+
+Python 2 has no logging.handlers.QueueHandler, so these classes provide the same idea: the story functions put
+log records on a queue, and a background thread writes them to the real handlers in batches, so the story
+functions never wait on formatting or disk.
+"""
+import logging
+import threading
+from Queue import Queue, Empty
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+BATCH_SIZE = 1000
+"""int: Most records the writer thread formats before writing them to a handler and flushing it."""
+
+_STOP = None
+
+
+class QueueHandler(logging.Handler):
+    """ Handler putting records on a queue without formatting them
+
+    Its level is the lowest level of the handlers behind the queue, so records none of them want are not queued.
+
+    """
+
+    def __init__(self, queue, level=logging.NOTSET):
+        logging.Handler.__init__(self, level)
+        self.queue = queue
+
+    def emit(self, record):
+        self.queue.put_nowait(record)
+
+
+class QueueListener(object):
+    """ Background thread writing the records of a queue to handlers
+
+    :Example:
+        q = Queue()
+        listener = QueueListener(q, logging.FileHandler("output.md"))
+        logger.addHandler(QueueHandler(q, listener.level))
+        listener.start()
+        ...
+        listener.stop()
+
+    """
+
+    def __init__(self, queue, *handlers):
+        self.queue = queue
+        self.handlers = handlers
+        self.thread = None
+
+    @property
+    def level(self):
+        """ The lowest level any of the handlers wants """
+        return min(h.level for h in self.handlers) if self.handlers else logging.CRITICAL + 1
+
+    def start(self):
+        """ Start writing records in a background thread """
+        self.thread = threading.Thread(target=self.__run, name="QueueListener")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """ Write the records still queued, then stop the background thread """
+        if self.thread is not None:
+            self.queue.put(_STOP)
+            self.thread.join()
+            self.thread = None
+
+    def __run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            if _STOP in batch:
+                batch, stopping = batch[:batch.index(_STOP)], True
+            self.write(batch)
+
+    def write(self, records):
+        """ Write a batch of records to every handler wanting them, one write and flush per stream """
+        for handler in self.handlers:
+            wanted = [r for r in records if r.levelno >= handler.level and handler.filter(r)]
+            if not wanted:
+                continue
+            if isinstance(handler, logging.StreamHandler):
+                text = "".join(handler.format(r) + "\n" for r in wanted)
+                handler.acquire()
+                try:
+                    handler.stream.write(text)
+                    handler.flush()
+                finally:
+                    handler.release()
+            else:
+                for r in wanted:
+                    handler.handle(r)
@@ -0,0 +1,140 @@
+"""
+Profiling
+
+Records the wall time, CPU time, peak memory and number of records of each step of a run (parsing, the summaries
+and every story), and optionally saves a cProfile dump of each step.
+"""
+import os
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+# cProfile is imported when first needed, so only runs saving cProfile dumps import it.
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+PROFILE_HEADING = "{0:<50} {1:>10} {2:>10} {3:>12} {4:>10}"
+PROFILE_ROW = "{0:<50} {1:>10.3f} {2:>10.3f} {3:>12} {4:>10}"
+
+DEFAULT_LIMIT = 1000
+"""int: Most steps a Profiler keeps, a full run of every story measures well under a hundred."""
+
+
+def peak_memory():
+    """ Peak resident memory of this process so far in kilobytes, None if it can not be found
+
+    :note: Python 2 has no tracemalloc, so memory is measured as the process' peak resident set size.
+
+    :rtype: int
+
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Profiler(object):
+    """ Profiler for the steps of a run
+
+    :Example:
+        p = Profiler()
+        with p.measure("Parse", "read_file") as m:
+            g.read_file(fname)
+            m["records"] = len(g.lines)
+        print p.table()
+
+    """
+
+    def __init__(self, dump_dir=None, limit=DEFAULT_LIMIT):
+        """ Initiate Profiler
+
+        :param dump_dir: Directory to save a cProfile dump of each step to, None to not run cProfile
+        :type dump_dir: str
+
+        :param limit: Most steps to keep, the oldest are forgotten first, so a profiler left enabled in a long
+        running process (e.g. ingest or an incremental Validator) does not grow without bound
+        :type limit: int
+
+        """
+        self.dump_dir = dump_dir
+        self.limit = limit
+        self.entries = deque(maxlen=limit)
+        self.enabled = True
+
+    def reset(self):
+        """ Forget every step measured so far """
+        self.entries = deque(maxlen=self.limit)
+
+    @contextmanager
+    def measure(self, id_, name):
+        """ Measure the step run inside the with block
+
+        :param id_: Id of the step, e.g. "Error US01" or "Parse"
+        :type id_: str
+
+        :param name: Name of the step, e.g. the story function's name
+        :type name: str
+
+        :returns: the entry being recorded, the caller may set "records" on it
+        :rtype: dict
+
+        :note: Nothing is measured or recorded while enabled is False, e.g. in a long running server.
+
+        """
+        entry = {"id": id_, "name": name, "records": None}
+        if not self.enabled:
+            yield entry
+            return
+        profile = None
+        if self.dump_dir:
+            import cProfile
+            profile = cProfile.Profile()
+        memory_before = peak_memory()
+        wall, cpu = time.time(), time.clock()
+        if profile:
+            profile.enable()
+        try:
+            yield entry
+        finally:
+            if profile:
+                profile.disable()
+            entry["wall_time"] = time.time() - wall
+            entry["cpu_time"] = time.clock() - cpu
+            entry["peak_memory_kb"] = peak_memory()
+            # Growth of the peak while the step ran, 0 if the step stayed below an earlier peak
+            entry["peak_memory_growth_kb"] = (entry["peak_memory_kb"] - memory_before) if resource else None
+            if profile:
+                entry["dump"] = self.dump(profile, id_, name)
+            self.entries.append(entry)
+
+    def dump(self, profile, id_, name):
+        """ Save the cProfile stats of a step to the dump directory
+
+        :returns: the file name the stats were saved to, it can be read with pstats
+        :rtype: str
+
+        """
+        if not os.path.isdir(self.dump_dir):
+            os.makedirs(self.dump_dir)
+        fname = os.path.join(self.dump_dir, re.sub(r"\W+", "_", "{0} {1}".format(id_, name)) + ".prof")
+        profile.dump_stats(fname)
+        return fname
+
+    def table(self):
+        """ Format the steps measured as a table, slowest first
+
+        :rtype: str
+
+        """
+        rows = [PROFILE_HEADING.format("Step", "Wall (s)", "CPU (s)", "Peak +KB", "Records")]
+        for e in sorted(self.entries, key=lambda e: e["wall_time"], reverse=True):
+            rows.append(PROFILE_ROW.format("{0}: {1}".format(e["id"], e["name"])[:50], e["wall_time"],
+                                           e["cpu_time"], e["peak_memory_growth_kb"], e["records"]))
+        rows.append(PROFILE_ROW.format("Total", sum(e["wall_time"] for e in self.entries),
+                                       sum(e["cpu_time"] for e in self.entries), "", ""))
+        return "\n".join(rows)
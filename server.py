@@ -0,0 +1,243 @@
+"""
+Validation Server
+
+A local daemon checking GEDCOM files posted to it, so an upload pipeline does not pay for starting Python, importing,
+parsing and validating on every request. Recently checked files are kept parsed, with their results, in a least
+recently used cache capped by memory, so posting the same content again is answered from the cache.
+
+Usage:
+    python server.py [--port 8555] [--host 127.0.0.1] [--cache-mb 256]
+    python server.py --socket /tmp/gedcom.sock
+
+    curl --data-binary @family.ged http://127.0.0.1:8555/validate
+    curl http://127.0.0.1:8555/stats
+
+Requests:
+    POST /validate              GEDCOM text as the body, responds with the story results as JSON
+    POST /validate?summaries=1  also responds with the individual and family summaries
+    GET /stats                  cache entries, size, hits and misses
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import SocketServer
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from collections import OrderedDict
+from datetime import datetime
+from urlparse import urlparse, parse_qs
+
+from gedcom.parser import File
+import stories
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+PARSED_BYTES_PER_BYTE = 120
+"""int: Estimated memory used by a parsed and checked file per byte of its text, measured on synthetic files."""
+
+
+class ParsedCache(object):
+    """ Least Recently Used Cache of Parsed Files
+
+    Entries are keyed by the SHA-1 of the file's text and the date it was checked on, and the least recently used
+    are dropped once the estimated memory of all entries is over max_bytes. An entry larger than max_bytes on its own
+    is not kept.
+
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (entry, size), least recently used first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """ Find an entry and mark it as the most recently used, None if it is not cached """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry, size = self.entries.pop(key)
+            self.entries[key] = (entry, size)
+            return entry
+
+    def put(self, key, entry, size):
+        """ Cache an entry of an estimated size in bytes, dropping the least recently used to stay under max_bytes """
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (entry, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.size -= self.entries.popitem(last=False)[1][1]
+
+    @property
+    def stats(self):
+        """ Entries, size and hit counts of the cache
+
+        :rtype: dict
+
+        """
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def validate(text, cache, summaries=False):
+    """ Check GEDCOM text with every story, using the cached results of the same text if there are any
+
+    :param text: The text of a GEDCOM file
+    :type text: str
+
+    :param cache: Cache of parsed files
+    :type cache: ParsedCache
+
+    :param summaries: Include the individual and family summaries
+    :type summaries: bool
+
+    :returns: the story results, in the same format as the "stories" of log.json
+    :rtype: dict
+
+    :note: Each request checks its own File against its own date (File.now), so requests run on their threads
+    without a lock. Only the summaries of a cached entry, made once on the first request for them, are made under the
+    lock of the entry.
+
+    """
+    key = hashlib.sha1(text).hexdigest()
+    # The server runs past midnight, so find the current date for every request, and do not reuse results or ages
+    # checked on another day
+    g = File(datetime.now())
+    entry = cache.get((key, g.now_string))
+    cached = entry is not None
+    if entry is None:
+        g.read_lines(text.splitlines(True))
+        entry = {"file": g, "stories": [s(g) for s in stories.STORIES], "lock": threading.Lock()}
+        cache.put((key, g.now_string), entry, len(text) * PARSED_BYTES_PER_BYTE)
+    r = {"sha1": key, "cached": cached, "stories": entry["stories"]}
+    if summaries:
+        with entry["lock"]:
+            if "individuals" not in entry:
+                entry["individuals"] = stories.individual_summary(entry["file"])
+                entry["families"] = stories.family_summary(entry["file"])
+        r["individuals"], r["families"] = entry["individuals"], entry["families"]
+    return r
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """ Handler for the requests to the validation server """
+    # Keep connections open between requests, every response has a Content-Length
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/stats":
+            self.respond(200, self.server.cache.stats)
+        else:
+            self.respond(404, {"error": "Not Found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/validate":
+            return self.respond(404, {"error": "Not Found"})
+        try:
+            length = int(self.headers.getheader("content-length"))
+        except (TypeError, ValueError):
+            return self.respond(411, {"error": "Content-Length Required"})
+        text = self.rfile.read(length)
+        summaries = parse_qs(url.query).get("summaries", ["0"])[0] not in ("0", "false", "")
+        try:
+            r = validate(text, self.server.cache, summaries)
+        except Exception as e:
+            return self.respond(400, {"error": "{0}: {1}".format(type(e).__name__, e)})
+        self.respond(200, r)
+
+    def respond(self, code, body):
+        """ Send a JSON response """
+        data = json.dumps(body)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+class Server(SocketServer.ThreadingMixIn, HTTPServer):
+    """ Validation server listening on a TCP port, one thread per request """
+    daemon_threads = True
+
+    def __init__(self, address, cache_bytes, quiet=False):
+        HTTPServer.__init__(self, address, RequestHandler)
+        self.cache = ParsedCache(cache_bytes)
+        self.quiet = quiet
+
+
+class UnixServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    """ Validation server listening on a Unix socket, one thread per request """
+    daemon_threads = True
+
+    def __init__(self, path, cache_bytes, quiet=False):
+        if os.path.exists(path):
+            os.remove(path)
+        SocketServer.UnixStreamServer.__init__(self, path, RequestHandler)
+        self.cache = ParsedCache(cache_bytes)
+        self.quiet = quiet
+
+
+def serve(host="127.0.0.1", port=8555, socket_path=None, cache_mb=256, quiet=False):
+    """ Create a validation server, call serve_forever on it to start answering requests
+
+    :param socket_path: Listen on this Unix socket instead of host and port
+    :type socket_path: str
+
+    :param cache_mb: Memory cap of the parsed file cache in megabytes
+    :type cache_mb: int
+
+    :rtype: Server or UnixServer
+
+    """
+    # The server runs for a long time, so do not keep a profile of every story call, and responds with the results
+    # instead of logging them
+    stories.profiler.enabled = False
+    stories.logger.setLevel(logging.WARNING)
+    if socket_path:
+        return UnixServer(socket_path, cache_mb * 1024 * 1024, quiet)
+    return Server((host, port), cache_mb * 1024 * 1024, quiet)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Local server checking GEDCOM files for errors")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8555)
+    arg_parser.add_argument("--socket", help="listen on this Unix socket instead of a TCP port")
+    arg_parser.add_argument("--cache-mb", type=int, default=256, help="memory cap of the parsed file cache")
+    arg_parser.add_argument("--quiet", action="store_true", help="do not log each request")
+    args = arg_parser.parse_args()
+
+    server = serve(args.host, args.port, args.socket, args.cache_mb, args.quiet)
+    print "Listening on {0}".format(args.socket or "http://{0}:{1}".format(*server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+SQL Story Functions
+
+Stories checked with SQL joins over a database exported by gedcom.database.export, for trees too big for the object
+model. Each returns the same results dictionary as the story function of the same name in stories.py.
+
+:Example:
+    connection = gedcom_file.to_sqlite()
+    r = sql_stories.birth_before_marriage(connection)
+"""
+import sqlite3
+
+import stories
+
+__author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
+
+SQL_STORIES = []
+"""list: Every SQL story function, in the order they were defined."""
+
+
+def individual(name, xref, line):
+    """ Format an individual the way tag.Individual does, "None" if there is no individual """
+    if line is None:
+        return "None"
+    return "{0} ({1} - line {2})".format(name.replace("/", "") if name is not None else "N/A", xref, line)
+
+
+def family(xref, line):
+    """ Format a family the way tag.Family does """
+    return "Family ({0} - line {1})".format(xref, line)
+
+
+def date(value, line):
+    """ Format a date the way tag.Date does """
+    return "{0} (line {1})".format(value, line)
+
+
+def pronoun(sex):
+    """ Pronoun of an individual of a sex, the way tag.Individual does """
+    return {"M": "his", "F": "her"}.get(sex, "their")
+
+
+def sql_story(id_):
+    """ Function decorator used to log and return the results of an SQL story
+
+    :param id_: The story id, e.g. "Error US02"
+    :type id_: str
+
+    """
+
+    def story_decorator(func):
+        def func_wrapper(connection):
+            if not isinstance(connection, sqlite3.Connection):
+                raise TypeError("SQL story function must be provided an sqlite3 connection.")
+            with stories.profiler.measure(id_, "sql " + func.__name__) as m:
+                r = {"id": id_, "name": func.__name__, "output": func(connection)}
+            m["records"] = len(r["output"]["passed"]) + len(r["output"]["failed"])
+            stories.log_story(r)
+            return r
+
+        func_wrapper.__name__ = func.__name__
+        func_wrapper.__doc__ = func.__doc__
+        func_wrapper.id = id_
+        func_wrapper.func = func
+        SQL_STORIES.append(func_wrapper)
+        return func_wrapper
+
+    return story_decorator
+
+
+@sql_story("Error US02")
+def birth_before_marriage(connection):
+    """ Birth should occur before marriage of an individual
+
+    :param connection: Database exported from the GEDCOM File to check
+    :type connection: sqlite3.Connection
+
+    """
+    r = {"passed": [], "failed": []}
+    msg = {"passed": "{0} was born before {1} marriage".format,
+           "failed": "{0} was born after {1} marriage".format}
+    bul = "{0} date is {1}".format
+
+    rows = connection.execute("""
+        SELECT i.name, i.xref, i.line, i.sex, b.value, b.line, m.value, m.line, b.date < m.date
+        FROM individuals i
+        JOIN events b ON b.record_id = i.id AND b.type = 'birth' AND b.rank = 0
+        JOIN memberships s ON s.individual_id = i.id AND s.tag = 'FAMS'
+        JOIN events m ON m.record_id = s.family_id AND m.type = 'marriage' AND m.rank = 0
+        WHERE b.date IS NOT NULL AND m.date IS NOT NULL
+        ORDER BY i.id, s.line""")
+    for name, xref, line, sex, birth, birth_line, marr, marr_line, passed in rows:
+        status = "passed" if passed else "failed"
+        r[status].append({"message": msg[status](individual(name, xref, line), pronoun(sex)),
+                          "bullets": [bul("Birth", date(birth, birth_line)), bul("Marriage", date(marr, marr_line))]})
+    return r
+
+
+@sql_story("Error US05")
+def marriage_before_death(connection):
+    """ Marriage should occur before death of either spouse
+
+    :param connection: Database exported from the GEDCOM File to check
+    :type connection: sqlite3.Connection
+
+    """
+    r = {"passed": [], "failed": []}
+    msg_intro = "{0} with marriage on {1} ".format
+    pass_msg = "has {0} {1} with death {2} after marriage".format
+    fail_msg = "has {0} {1} with death {2} before marriage".format
+
+    rows = connection.execute("""
+        SELECT f.xref, f.line, m.value, m.line,
+               h.name, h.xref, h.line, hd.value, hd.line, m.date < hd.date,
+               w.name, w.xref, w.line, wd.value, wd.line, m.date < wd.date
+        FROM families f
+        JOIN events m ON m.record_id = f.id AND m.type = 'marriage' AND m.rank = 0
+        LEFT JOIN memberships hm ON hm.family_id = f.id AND hm.tag = 'HUSB' AND hm.rank = 0
+        LEFT JOIN individuals h ON h.id = hm.individual_id
+        LEFT JOIN events hd ON hd.record_id = h.id AND hd.type = 'death' AND hd.rank = 0 AND hd.date IS NOT NULL
+        LEFT JOIN memberships wm ON wm.family_id = f.id AND wm.tag = 'WIFE' AND wm.rank = 0
+        LEFT JOIN individuals w ON w.id = wm.individual_id
+        LEFT JOIN events wd ON wd.record_id = w.id AND wd.type = 'death' AND wd.rank = 0 AND wd.date IS NOT NULL
+        WHERE m.date IS NOT NULL AND (hd.line IS NOT NULL OR wd.line IS NOT NULL)
+        ORDER BY f.id""")
+    for row in rows:
+        intro = msg_intro(family(*row[0:2]), date(*row[2:4]))
+        checks = []
+        for role, spouse, death, passed in (("husband", row[4:7], row[7:9], row[9]),
+                                            ("wife", row[10:13], row[13:15], row[15])):
+            if death[1] is not None:
+                checks.append((passed, (pass_msg if passed else fail_msg)(role, individual(*spouse), date(*death))))
+        status = "passed" if all(passed for passed, _ in checks) else "failed"
+        r[status].append({"message": intro + " and ".join(m for _, m in checks)})
+    return r
+
+
+@sql_story("Error US09")
+def birth_before_death_of_parents(connection):
+    """ Child should be born before death of mother and before 9 months after death of father
+
+    :note: Compares the child's birth with the parents' death dates, as stories.birth_before_death_of_parents does, so
+    both backends report the same results. A month is 30 days, so a child passes if born less than 270 days after
+    the father's death.
+
+    :param connection: Database exported from the GEDCOM File to check
+    :type connection: sqlite3.Connection
+
+    """
+    r = {"passed": [], "failed": []}
+
+    rows = connection.execute("""
+        SELECT f.xref, f.line, c.name, c.xref, c.line, cb.value, cb.line,
+               w.name, w.xref, w.line, wd.value, wd.line,
+               CASE WHEN wd.line IS NULL THEN NULL ELSE cb.date < wd.date END,
+               h.name, h.xref, h.line, hd.value, hd.line,
+               CASE WHEN hd.line IS NULL THEN NULL ELSE julianday(cb.date) - julianday(hd.date) < 270 END
+        FROM families f
+        JOIN memberships cm ON cm.family_id = f.id AND cm.tag = 'CHIL'
+        JOIN individuals c ON c.id = cm.individual_id
+        JOIN events cb ON cb.record_id = c.id AND cb.type = 'birth' AND cb.rank = 0
+        LEFT JOIN memberships wm ON wm.family_id = f.id AND wm.tag = 'WIFE' AND wm.rank = 0
+        LEFT JOIN individuals w ON w.id = wm.individual_id
+        LEFT JOIN events wd ON wd.record_id = w.id AND wd.type = 'death' AND wd.rank = 0 AND wd.date IS NOT NULL
+        LEFT JOIN memberships hm ON hm.family_id = f.id AND hm.tag = 'HUSB' AND hm.rank = 0
+        LEFT JOIN individuals h ON h.id = hm.individual_id
+        LEFT JOIN events hd ON hd.record_id = h.id AND hd.type = 'death' AND hd.rank = 0 AND hd.date IS NOT NULL
+        WHERE cb.date IS NOT NULL
+        ORDER BY f.id, cm.line""")
+    for row in rows:
+        msg = "{0} has Child {1} with birth date {2} and has".format(family(*row[0:2]), individual(*row[2:5]),
+                                                                    date(*row[5:7]))
+        mom_pass, dad_pass = row[12], row[18]
+        if mom_pass is None:
+            msg += " mother {0} with no death date".format(individual(*row[7:10]))
+        else:
+            msg += " mother {0} with death date {1}".format(individual(*row[7:10]), date(*row[10:12]))
+
+        if dad_pass is None:
+            msg += " and father {0} with no death date.".format(individual(*row[13:16]))
+        else:
+            msg += " and father {0} with death date {1}.".format(individual(*row[13:16]), date(*row[16:18]))
+
+        passed = mom_pass in (None, 1) and dad_pass in (None, 1)
+        status = "passed" if passed else "failed"
+        r[status].append({"message": msg})
+    return r
@@ -6,6 +6,7 @@ import sys
 from datetime import datetime
 from itertools import combinations, groupby
 import gedcom
+import profiling
 
 __author__ = "Adam Burbidge, Constantine Davantzis, Vibha Ravi"
 
@@ -18,90 +19,443 @@ LOG_ENTRY = '\t > {0}'
 LOG_BULLET = '\t\t * {0}'
 LOG_BULLET_ALT = '\t\t * {0}: {1}'
 
+DUPLICATE_SCORE = 0.8
+"""float: Score (0 to 1) at or above which two individuals are reported as likely duplicates."""
+
 # Initiate Log
-logging.basicConfig(level=logging.DEBUG, format='%(message)s')
+# Handlers are only attached by the program running the stories (see story_logging in the main script), importing
+# this module does not configure logging.
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
 logger.propagate = False
 
+# Profiler every story is measured with
+profiler = profiling.Profiler()
 
-def individual_summary(gedcom_file):
-    # TODO: Write Docstring
-    # TODO: add message and bullets into summary
-    r = []
-    logger.info(LOG_HEADING.format("Summary", "Individuals"))
-    for indi in gedcom_file.individuals:
-        r.append(indi.summary)
-        logger.info(LOG_ENTRY.format(indi))
-        logger.info(LOG_BULLET_ALT.format("Gender", indi.sex))
-        logger.info(LOG_BULLET_ALT.format("Birth date", indi.birth_date))
-        if indi.has("death_date"):
-            logger.info(LOG_BULLET_ALT.format("Death date", indi.death_date))
-            logger.info(LOG_BULLET_ALT.format("Age at death", indi.age))
-        else:
-            logger.info(LOG_BULLET_ALT.format("Current age", indi.age))
-        spouses_str = ", ".join(map(str, indi.spouses))
-        if spouses_str:
-            logger.info(LOG_BULLET_ALT.format("Spouses", spouses_str))
-        spouse_in_str = ", ".join(map(str, indi.families("FAMS")))
-        if spouse_in_str:
-            logger.info(LOG_BULLET_ALT.format("Spouse in", spouse_in_str))
-        child_in_str = ", ".join(map(str, indi.families("FAMC")))
-        if child_in_str:
-            logger.info(LOG_BULLET_ALT.format("Child in", child_in_str))
-    return r
 
+SUMMARY_CHUNK = 1000
+"""int: Individuals or families whose summary lines are logged together as one record."""
 
-def family_summary(gedcom_file):
-    # TODO: Write Docstring
-    r = []
-    # TODO: add message and bullets into summary
-    logger.info(LOG_HEADING.format("Summary", "Families"))
-    for fam in gedcom_file.families:
-        r.append(fam.summary)
-        logger.info(LOG_ENTRY.format(fam))
-        logger.info(LOG_BULLET_ALT.format("Husband", fam.husband))
-        logger.info(LOG_BULLET_ALT.format("Wife", fam.wife))
-        for i, child in enumerate(fam.children):
-            logger.info(LOG_BULLET_ALT.format("Child {0}".format(i + 1), child))
-    return r
+
+class SummaryIndex(object):
+    """ Summary Index
+
+    The summary of each individual and family, read from its record once and shared by both summaries: a family's
+    summary reuses the summaries of its spouses and children. Each record's lines are read straight from the
+    children_line_numbers of its level 0 line and links are followed through the file's xref index, so no
+    tag.Individual or tag.Family wrappers are built and no lines are searched.
+
+    :note: Summaries are made the first time they are asked for, so a capped summary only reads the records it shows.
+    Ages are read from the ages of the file (see gedcom.ages), computed once for every individual.
+
+    :note: Records are read from the root of a SubFile, as the records its records link to may not be among its lines.
+
+    """
+
+    def __init__(self, gedcom_file):
+        root = gedcom_file.root
+        self.lines = root.lines
+        self.xrefs = root.xrefs
+        self.ages = root.ages
+        self.individuals = {}  # INDI line number -> summary dictionary
+        self.families = {}  # FAM line number -> summary dictionary
+
+    def first_children(self, line):
+        """ The first child line of each tag of a line
+
+        :rtype: dict
+
+        """
+        first = {}
+        for n in line["children_line_numbers"]:
+            child = self.lines[n]
+            first.setdefault(child["tag"], child)
+        return first
+
+    def date(self, line, tag):
+        """ The first DATE line of the first child of a line with a tag, None if there is none """
+        event = self.first_children(line).get(tag)
+        return self.first_children(event).get("DATE") if event is not None else None
+
+    def links(self, line, tag):
+        """ The records the children of a line with a tag link to, leaving out links to no record """
+        lines = self.lines
+        targets = (self.xrefs.get(lines[n].get("line_value")) for n in line["children_line_numbers"]
+                   if lines[n]["tag"] == tag)
+        return [t for t in targets if t is not None]
+
+    def individual(self, line):
+        """ Summarize an individual, the same way tag.Individual does
+
+        :param line: The INDI line
+        :type line: parser.Line
+
+        :returns: dictionary with the text of the individual, their summary, the text of each summary bullet, and
+        the FAMS and FAMC lines they link to
+        :rtype: dict
+
+        """
+        n = line["line_number"]
+        if n in self.individuals:
+            return self.individuals[n]
+        first = self.first_children(line)
+        name, sex = first.get("NAME"), first.get("SEX")
+        birth_date, death_date = self.date(line, "BIRT"), self.date(line, "DEAT")
+        age = self.ages.age[self.ages.individual_ids[n]]
+        self.individuals[n] = i = {
+            "text": "{0} ({1} - line {2})".format((name.val or "").replace("/", "") if name else "N/A",
+                                                  line.get("xref_ID"), line.ln),
+            "summary": (line.get("xref_ID"), {"line_number": line.ln,
+                                              "name": name.story_dict if name else None,
+                                              "sex": sex.story_dict if sex else None,
+                                              "birth_date": birth_date.story_dict if birth_date else None}),
+            "sex": "{0} (line {1})".format("Male" if sex and sex.val == "M" else "Female", sex.ln if sex else None),
+            "birth_date": "{0} (line {1})".format(birth_date.val, birth_date.ln) if birth_date else "None",
+            "death_date": "{0} (line {1})".format(death_date.val, death_date.ln) if death_date else None,
+            "age": age if gedcom.ages.known(age) else None,
+            "fams": self.links(line, "FAMS"),
+            "famc": self.links(line, "FAMC")}
+        return i
+
+    def family(self, line):
+        """ Summarize a family, the same way tag.Family does
+
+        :param line: The FAM line
+        :type line: parser.Line
+
+        :returns: dictionary with the text of the family, its summary, and its husband, wife and children lines
+        :rtype: dict
+
+        """
+        n = line["line_number"]
+        if n in self.families:
+            return self.families[n]
+        husband, wife = (next(iter(self.links(line, tag)), None) for tag in ("HUSB", "WIFE"))
+        children = self.links(line, "CHIL")
+        self.families[n] = f = {
+            "text": "Family ({0} - line {1})".format(line.get("xref_ID"), line.ln),
+            "summary": (line.get("xref_ID"), {
+                "husband": self.individual(husband)["summary"] if husband is not None else None,
+                "wife": self.individual(wife)["summary"] if wife is not None else None,
+                "children": [self.individual(c)["summary"] for c in children]}),
+            "husband": husband,
+            "wife": wife,
+            "children": children}
+        return f
+
+    def text(self, line):
+        """ The text of an individual, "None" if there is no individual """
+        return self.individual(line)["text"] if line is not None else "None"
+
+    def spouses(self, individual):
+        """ The spouses of a summarized individual, in the order of their FAMS lines """
+        me = individual["summary"][0]
+        for fam_line in individual["fams"]:
+            fam = self.family(fam_line)
+            for spouse in (fam["husband"], fam["wife"]):
+                if spouse is not None and spouse.get("xref_ID") != me:
+                    yield spouse
+
+
+def summary_index(gedcom_file):
+    """ The SummaryIndex of a file, cached until the file is edited, shared by a file and its SubFiles
+
+    :rtype: SummaryIndex
+
+    """
+    cache = gedcom_file.root.cache
+    if "summary_index" not in cache:
+        cache["summary_index"] = SummaryIndex(gedcom_file)
+    return cache["summary_index"]
+
+
+def log_summary(heading, entries, noun, skipped):
+    """ Log the lines of a summary, a chunk of entries per record, straight from a generator of their lines
+
+    :param heading: The summary heading, e.g. "Individuals"
+    :param entries: generator of the list of lines of each entry
+    :param noun: What the entries are, e.g. "individuals", for the line saying how many were left out
+    :param skipped: Number of entries left out by a limit
+
+    """
+    logger.info(LOG_HEADING.format("Summary", heading))
+    chunk = []
+    for lines in entries:
+        chunk.extend(lines)
+        if len(chunk) >= SUMMARY_CHUNK:
+            logger.info("\n".join(chunk))
+            chunk = []
+    if skipped:
+        chunk.append(LOG_ENTRY.format("... {0} more {1} not summarized".format(skipped, noun)))
+    if chunk:
+        logger.info("\n".join(chunk))
+
+
+def individual_summary(gedcom_file, limit=None):
+    """ Summarize and log every individual
+
+    :param gedcom_file: GEDCOM File to summarize
+    :type gedcom_file: parser.File
+
+    :param limit: Most individuals to summarize, None for every individual
+    :type limit: int
+
+    :returns: list of (xref, summary dictionary) of each individual summarized
+    :rtype: list
+
+    """
+    index = summary_index(gedcom_file)
+    lines = gedcom_file.find("tag", "INDI").lines
+    shown = lines if limit is None else lines[:limit]
+
+    def entries():
+        for line in shown:
+            indi = index.individual(line)
+            entry = [LOG_ENTRY.format(indi["text"]),
+                     LOG_BULLET_ALT.format("Gender", indi["sex"]),
+                     LOG_BULLET_ALT.format("Birth date", indi["birth_date"])]
+            if indi["death_date"] is not None:
+                entry.append(LOG_BULLET_ALT.format("Death date", indi["death_date"]))
+                entry.append(LOG_BULLET_ALT.format("Age at death", indi["age"]))
+            else:
+                entry.append(LOG_BULLET_ALT.format("Current age", indi["age"]))
+            for title, texts in (("Spouses", [index.text(s) for s in index.spouses(indi)]),
+                                 ("Spouse in", [index.family(f)["text"] for f in indi["fams"]]),
+                                 ("Child in", [index.family(f)["text"] for f in indi["famc"]])):
+                if texts:
+                    entry.append(LOG_BULLET_ALT.format(title, ", ".join(texts)))
+            yield entry
+
+    if wants(logging.INFO):
+        log_summary("Individuals", entries(), "individuals", len(lines) - len(shown))
+    return [index.individual(line)["summary"] for line in shown]
+
+
+def family_summary(gedcom_file, limit=None):
+    """ Summarize and log every family
+
+    :param gedcom_file: GEDCOM File to summarize
+    :type gedcom_file: parser.File
+
+    :param limit: Most families to summarize, None for every family
+    :type limit: int
+
+    :returns: list of (xref, summary dictionary) of each family summarized
+    :rtype: list
+
+    """
+    index = summary_index(gedcom_file)
+    lines = gedcom_file.find("tag", "FAM").lines
+    shown = lines if limit is None else lines[:limit]
+
+    def entries():
+        for line in shown:
+            fam = index.family(line)
+            entry = [LOG_ENTRY.format(fam["text"]),
+                     LOG_BULLET_ALT.format("Husband", index.text(fam["husband"])),
+                     LOG_BULLET_ALT.format("Wife", index.text(fam["wife"]))]
+            for i, child in enumerate(fam["children"]):
+                entry.append(LOG_BULLET_ALT.format("Child {0}".format(i + 1), index.text(child)))
+            yield entry
+
+    if wants(logging.INFO):
+        log_summary("Families", entries(), "families", len(lines) - len(shown))
+    return [index.family(line)["summary"] for line in shown]
+
+
+STORIES = []
+"""list: Every story function, in the order they were defined."""
+
+LISTS = []
+"""list: Every listing function, in the order they were defined."""
+
+UPCOMING_DAYS = 30
+"""int: Days, starting today, the upcoming birthdays and anniversaries are listed for."""
+
+RECENT_DAYS = 30
+"""int: Days before today the recent births, deaths and survivors are listed for."""
+
+
+def wants(level):
+    """ Check whether any handler of the logger wants records of a level, so entries nobody wants are not formatted
+
+    :param level: logging level, e.g. logging.DEBUG
+    :type level: int
+
+    :rtype: bool
+
+    """
+    return logger.isEnabledFor(level) and any(level >= h.level for h in logger.handlers)
+
+
+def log_story(r):
+    """ Log the results dictionary of a story
+
+    Each section is logged as a single record of lines, so a story makes a few records however many entries it has.
+
+    :param r: Results dictionary returned by a story function
+    :type r: dict
+
+    """
+    def lines(heading, entries):
+        yield heading
+        for entry in entries:
+            yield LOG_ENTRY.format(entry.get("message", entry))
+            for bullet in entry.get("bullets", []):
+                yield LOG_BULLET.format(bullet)
+
+    if wants(logging.INFO):
+        logger.info("\n".join([LOG_HEADING.format(r["id"], r["name"].replace("_", " ").title()), "~~~~"]))
+        # TODO: log story description
+    if wants(logging.DEBUG):
+        logger.debug("\n".join(lines("[passed]", r["output"]["passed"])))
+    if wants(logging.INFO):
+        logger.info("\n".join(lines("[failed]", r["output"]["failed"])) + "\n~~~~")
+
+
+def log_listing(r):
+    """ Log the results dictionary of a listing, as a single record
+
+    :param r: Results dictionary returned by a listing function
+    :type r: dict
+
+    """
+    if wants(logging.INFO):
+        lines = [LOG_HEADING.format(r["id"], r["name"].replace("_", " ").title()), "~~~~"]
+        for entry in r["output"]["listed"]:
+            lines.append(LOG_ENTRY.format(entry.get("message", entry)))
+            lines.extend(LOG_BULLET.format(bullet) for bullet in entry.get("bullets", []))
+        logger.info("\n".join(lines + ["~~~~"]))
 
 
-def story(id_):
-    """ Function decorator used to find both outcomes of a story, and log and return the results """
+def listing(id_):
+    """ Function decorator used to list the records of a file a story describes, and log and return them
+
+    Unlike a story, a listing has no passed and failed cases, its function returns the list of entries to list, and
+    it may take arguments after the file (e.g. how many days ahead to look).
+
+    :param id_: The story id, e.g. "List US38"
+    :type id_: str
+
+    :note: Each call is measured with profiler, the number of records is the number of entries listed.
+
+    """
+
+    def listing_decorator(func):
+        def func_wrapper(gedcom_file, *args, **kwargs):
+            if not isinstance(gedcom_file, gedcom.parser.File):
+                raise TypeError("Listing function must be provided a gedcom file object.")
+            with profiler.measure(id_, func.__name__) as m:
+                r = {"id": id_, "name": func.__name__, "output": {"listed": func(gedcom_file, *args, **kwargs)}}
+            m["records"] = len(r["output"]["listed"])
+
+            # Log Text Results To User Output
+            log_listing(r)
+
+            # Return Results Dictionary
+            return r
+
+        func_wrapper.__name__ = func.__name__
+        func_wrapper.__doc__ = func.__doc__
+        func_wrapper.id = id_
+        func_wrapper.func = func
+        LISTS.append(func_wrapper)
+        return func_wrapper
+
+    return listing_decorator
+
+
+def story(id_, reach=2, scope="record", key=None):
+    """ Function decorator used to find both outcomes of a story, and log and return the results
+
+    :param id_: The story id, e.g. "Error US01"
+    :type id_: str
+
+    :param reach: How many INDI/FAM links away from a record the story looks when checking that record,
+    e.g. 2 covers an individual, their families, and their parents, spouses, siblings and children.
+    None if the story follows links without limit (e.g. descendants). For a story with scope "key", how many links
+    away from a record the story looks for the key of that record.
+    :type reach: int or None
+
+    :param scope: "record" if the story checks each record on its own, "key" if it compares the records with the
+    same key with one another (e.g. looking for duplicates), "file" if it compares records across the whole file.
+    :type scope: str
+
+    :param key: For a story with scope "key", function of a level 0 line returning the key of the record, None if
+    the story does not check the record (see record_key). Keys are sorted in the order the story reports them.
+    :type key: function
+
+    :note: reach, scope and key are used by incremental.Validator to decide which results to re-evaluate after an
+    edit.
+
+    :note: Each call is measured with profiler, the number of records is the number of passed and failed entries.
+
+    :raises ValueError: if another story already has the id, as results and profiles are told apart by id
+
+    """
 
     def story_decorator(func):
+        for other in STORIES:
+            if other.id == id_:
+                raise ValueError("Story id {0} of {1} is already used by {2}".format(id_, func.__name__,
+                                                                                    other.__name__))
+
         def func_wrapper(gedcom_file):
-            if type(gedcom_file) is not gedcom.parser.File:
+            if not isinstance(gedcom_file, gedcom.parser.File):
                 raise TypeError("Story function must be provided a gedcom file object.")
-            r = {"id": id_, "name": func.__name__, "output": func(gedcom_file)}
+            with profiler.measure(id_, func.__name__) as m:
+                r = {"id": id_, "name": func.__name__, "output": func(gedcom_file)}
+            m["records"] = len(r["output"]["passed"]) + len(r["output"]["failed"])
 
             # Log Text Results To User Output
-            logger.info(LOG_HEADING.format(r["id"], r["name"].replace("_", " ").title()))
-            # TODO: log story description
-            logger.info("~~~~")
-            logger.debug("[passed]")
-            for entry in r["output"]["passed"]:
-                h2 = LOG_ENTRY.format(entry.get("message", entry))
-                logger.debug(h2)
-                for bullet in entry.get("bullets", []):
-                    logger.debug(LOG_BULLET.format(bullet))
-            logger.info("[failed]")
-            for entry in r["output"]["failed"]:
-                h2 = LOG_ENTRY.format(entry.get("message", entry))
-                logger.info(h2)
-                for bullet in entry.get("bullets", []):
-                    logger.info(LOG_BULLET.format(bullet))
-            logger.info("~~~~")
+            log_story(r)
 
             # Return Results Dictionary
             return r
 
+        func_wrapper.__name__ = func.__name__
+        func_wrapper.__doc__ = func.__doc__
+        func_wrapper.id = id_
+        func_wrapper.func = func
+        func_wrapper.reach = reach
+        func_wrapper.scope = scope
+        func_wrapper.key = key
+        STORIES.append(func_wrapper)
         return func_wrapper
 
     return story_decorator
 
 
-@story("Error US01")
+def record_key(tag_name, key, default=None):
+    """ Make the key function of a story with scope "key", from the key it groups tag.Individual or tag.Family by
+
+    :param tag_name: The tag of the records the story checks, "INDI" or "FAM"
+    :type tag_name: str
+
+    :param key: function of a tag.Individual or tag.Family returning its key, raising AttributeError if it has none
+    (see matches)
+    :type key: function
+
+    :param default: The key of the records key raises AttributeError for, None if the story does not check them
+    :type default: tuple
+
+    :returns: function of a level 0 line returning its key, None if the story does not check it
+    :rtype: function
+
+    """
+    def line_key(line):
+        if line.tag != tag_name:
+            return None
+        wrapper = gedcom.tag.Individual if tag_name == "INDI" else gedcom.tag.Family
+        try:
+            return key(wrapper(line))
+        except AttributeError:
+            return default
+
+    return line_key
+
+
+@story("Error US01", reach=0)
 def dates_before_current_date(gedcom_file):
     """ Dates (birth, marriage, divorce, death) should not be after the current date
 
@@ -115,11 +469,12 @@ def dates_before_current_date(gedcom_file):
     r = {"passed": [], "failed": []}
     msg = "{0}{1} has a {2} date {3} the current date".format
     bul = ["Current Date is {0} (date script ran)".format, "{0} date is {1}".format]
+    now, now_string = gedcom_file.now, gedcom_file.now_string
 
     for date in gedcom_file.dates:
         if date.type in ("birth", "marriage", "divorce", "death"):
-            out = {"bullets": [bul[0](NOW_STRING), bul[1](date.type.capitalize(), date)]}
-            passed, word = (True, "before") if date.dt < NOW else (True, "on") if date.dt == NOW else (False, "after")
+            out = {"bullets": [bul[0](now_string), bul[1](date.type.capitalize(), date)]}
+            passed, word = (True, "before") if date.dt < now else (True, "on") if date.dt == now else (False, "after")
             if type(date.belongs_to) is gedcom.tag.Individual:
                 out["message"] = msg("Individual ", date.belongs_to, date.type, word)
             elif type(date.belongs_to) is gedcom.tag.Family:
@@ -131,7 +486,7 @@ def dates_before_current_date(gedcom_file):
     return r
 
 
-@story("Error US02")
+@story("Error US02", reach=1)
 def birth_before_marriage(gedcom_file):
     """ Birth should occur before marriage of an individual
 
@@ -155,12 +510,12 @@ def birth_before_marriage(gedcom_file):
                 continue  # Project Overview Assumptions not met
             status = "passed" if indi.birth_date < fam.marriage_date else "failed"
             r[status].append({"message": msg[status](indi, indi.pronoun),
-                              "bullets": [bul("Birth", indi.birth_date), bul("Marriage", indi.birth_date)]})
+                              "bullets": [bul("Birth", indi.birth_date), bul("Marriage", fam.marriage_date)]})
 
     return r
 
 
-@story("Error US03")
+@story("Error US03", reach=0)
 def birth_before_death(gedcom_file):
     """ Birth should occur before death of an individual
 
@@ -188,7 +543,7 @@ def birth_before_death(gedcom_file):
     return r
 
 
-@story("Error US04")
+@story("Error US04", reach=1)
 def marriage_before_divorce(gedcom_file):
     """ Marriage should occur before divorce of spouses, and divorce can only occur after marriage
 
@@ -215,7 +570,7 @@ def marriage_before_divorce(gedcom_file):
     return r
 
 
-@story("Error US05")
+@story("Error US05", reach=1)
 def marriage_before_death(gedcom_file):
     """ Marriage should occur before death of either spouse
 
@@ -262,7 +617,7 @@ def marriage_before_death(gedcom_file):
     return r
 
 
-@story("Error US06")
+@story("Error US06", reach=1)
 def divorce_before_death(gedcom_file):
     """ Divorce can only occur before death of both spouses
 
@@ -308,7 +663,7 @@ def divorce_before_death(gedcom_file):
     return r
 
 
-@story("Error US07")
+@story("Error US07", reach=0)
 def less_then_150_years_old(gedcom_file):
     """ Death should be less than 150 years after birth for dead people, and
         current date should be less than 150 years after birth for all living people
@@ -324,20 +679,22 @@ def less_then_150_years_old(gedcom_file):
     msg = {"death": "Individual {0} was born {1} and died {2} years later on {3}".format,
            "alive": "Individual {0} was born {1} and is {2} years old as of {3} (current date)".format}
 
-    for indi in gedcom_file.individuals:
-        if not indi.has("birth_date"):
+    ages = gedcom_file.ages
+    for line in gedcom_file.find("tag", "INDI"):
+        i = ages.individual_ids[line["line_number"]]
+        if ages.birth[i] == gedcom.ages.MISSING:
             continue  # Project Overview Assumptions not met
-        out = {}
-        if indi.has("death_date"):
-            out["message"] = msg["death"](indi, indi.birth_date, indi.age, indi.death_date)
+        indi, age, out = gedcom.tag.Individual(line), ages.age[i], {}
+        if ages.death[i] != gedcom.ages.MISSING:
+            out["message"] = msg["death"](indi, indi.birth_date, age, indi.death_date)
         else:
-            out["message"] = msg["alive"](indi, indi.birth_date, indi.age, NOW_STRING)
-        r["passed"].append(out) if indi.age < 150 else r["failed"].append(out)
+            out["message"] = msg["alive"](indi, indi.birth_date, age, gedcom_file.now_string)
+        r["passed"].append(out) if age < 150 else r["failed"].append(out)
 
     return r
 
 
-@story("Anomaly US08")
+@story("Anomaly US08", reach=1)
 def birth_before_marriage_of_parents(gedcom_file):
     """ Child should be born after marriage of parents (and before their divorce)
 
@@ -373,10 +730,12 @@ def birth_before_marriage_of_parents(gedcom_file):
     return r
 
 
-@story("Error US09")
+@story("Error US09", reach=1)
 def birth_before_death_of_parents(gedcom_file):
     """ Child should be born before death of mother and before 9 months after death of father
 
+    :note: Assume 9 months is (30 days)*(9 months)=(270 days)
+
     :sprint: 2
     :author: vibharavi
 
@@ -390,8 +749,8 @@ def birth_before_death_of_parents(gedcom_file):
         for child in (c for c in fam.children if c.has("birth_date")):
             chk_mom = fam.has("wife") and fam.wife.has("death_date")
             chk_dad = fam.has("husband") and fam.husband.has("death_date")
-            mom_pass = child.birth_date < fam.wife.birth_date if chk_mom else None
-            dad_pass = ((fam.husband.birth_date.dt - child.birth_date.dt).days / 30) > 9 if chk_dad else None
+            mom_pass = child.birth_date.dt < fam.wife.death_date.dt if chk_mom else None
+            dad_pass = ((child.birth_date.dt - fam.husband.death_date.dt).days / 30) < 9 if chk_dad else None
             msg = "{0} has Child {1} with birth date {2} and has".format(fam, child, child.birth_date)
 
             if mom_pass is None:
@@ -411,7 +770,7 @@ def birth_before_death_of_parents(gedcom_file):
     return r
 
 
-@story("Anomaly US10")
+@story("Anomaly US10", reach=1)
 def marriage_after_14(gedcom_file):
     """ Marriage should be at least 14 years after birth of both spouses
 
@@ -426,26 +785,29 @@ def marriage_after_14(gedcom_file):
     msg = "{0} has marriage date {1}".format
     bul = "{0} {1} born {2} [married at {3} years old]".format
 
-    for fam in gedcom_file.families:
-        # Check Project Overview Assumptions
-        if not fam.has("marriage_date"):
-            continue  # Project Overview Assumptions not met
-        if not fam.has("husband") or not fam.husband.has("birth_date"):
-            continue  # Project Overview Assumptions not met
-        if not fam.has("wife") or not fam.wife.has("birth_date"):
+    ages = gedcom_file.ages
+    for line in gedcom_file.find("tag", "FAM"):
+        f = ages.family_ids[line["line_number"]]
+        # Check Project Overview Assumptions, a marriage age is only known with a marriage date and a birth date
+        wife_age, husband_age = ages.wife_marriage_age[f], ages.husband_marriage_age[f]
+        if not gedcom.ages.known(wife_age) or not gedcom.ages.known(husband_age):
             continue  # Project Overview Assumptions not met
 
-        status = "passed" if (fam.wife_marriage_age > 14) and (fam.husband_marriage_age > 14) else "failed"
+        fam = gedcom.tag.Family(line)
+        status = "passed" if (wife_age > 14) and (husband_age > 14) else "failed"
         r[status].append({"message": msg(fam, fam.marriage_date),
-                          "bullets": [bul("Wife", fam.wife, fam.wife.birth_date, fam.wife_marriage_age),
-                                      bul("Husband", fam.husband, fam.husband.birth_date, fam.husband_marriage_age)]})
+                          "bullets": [bul("Wife", fam.wife, fam.wife.birth_date, wife_age),
+                                      bul("Husband", fam.husband, fam.husband.birth_date, husband_age)]})
     return r
 
 
-@story("Anomaly US11")
+@story("Anomaly US11", reach=2)
 def no_bigamy(gedcom_file):
     """ Marriage should not occur during marriage to another spouse
 
+    :note: Each individual's marriages are sorted by marriage date and swept to find the overlapping pairs, which
+    fail. Every other pair of marriages passes, earlier marriage first.
+
     :sprint: 2
     :author: Adam Burbidge
 
@@ -460,27 +822,33 @@ def no_bigamy(gedcom_file):
 
     bul = "{0} marriage starts {1} and ends {2} (line {3}) because {4}".format
 
-    for indi in gedcom_file.individuals:
-        # Get all combinations of marriages this individual is or has been in
-        for fam_1, fam_2 in combinations(indi.families("FAMS"), 2):
+    # Marriage intervals by family line number, so each family is only looked at once even if both spouses are checked
+    intervals = {}
+
+    def interval(fam):
+        if fam.ln not in intervals:
+            start, end = fam.marriage_date, fam.marriage_end
+            intervals[fam.ln] = (start.dt, end["dt"], (fam, bul(fam, start, end["story_dict"].get("line_value"),
+                                                                 end["story_dict"]["line_number"], end["reason"])))
+        return intervals[fam.ln]
 
+    for indi in gedcom_file.individuals:
+        # Get the marriages this individual is or has been in
+        marriages = []
+        for fam in indi.families("FAMS"):
             # Check Project Overview Assumptions
-            if (not fam_1.has("marriage_date")) or (not fam_2.has("marriage_date")):
+            if not fam.has("marriage_date"):
                 continue  # Project Overview Assumptions not met
+            marriages.append(interval(fam))
 
-            s1, e1 = fam_1.marriage_date, fam_1.marriage_end
-            s2, e2 = fam_2.marriage_date, fam_2.marriage_end
-
-            b = [bul(fam_1, s1, e1["story_dict"].get("line_value"), e1["story_dict"]["line_number"], e1["reason"]),
-                 bul(fam_2, s2, e2["story_dict"].get("line_value"), e2["story_dict"]["line_number"], e2["reason"])]
-
-            status = "failed" if (s1.dt <= e2["dt"]) and (e1["dt"] >= s2.dt) else "passed"
-            r[status].append({"message": msg[status](indi), "bullets": b})
+        for (fam_1, b1), (fam_2, b2), overlapping in gedcom.tools.sweep_overlaps(marriages):
+            status = "failed" if overlapping else "passed"
+            r[status].append({"message": msg[status](indi), "bullets": [b1, b2]})
 
     return r
 
 
-@story("Anomaly US12")
+@story("Anomaly US12", reach=1)
 def parents_not_too_old(gedcom_file):
     """ Mother should be less than 60 years older than her children and
         father should be less than 80 years older than his children
@@ -496,22 +864,22 @@ def parents_not_too_old(gedcom_file):
     msg = "{0} with child {1} born {2} has mother {3} born {4} [{5} years older than child] " \
           + "and father {6} born {7} [{8} years older than child]."
     msg = msg.format
-    for fam in gedcom_file.families:
-        # Check Project Overview Assumptions
-        if not fam.has("marriage_date"):
-            continue  # Project Overview Assumptions not met
-        if not fam.has("husband") or not fam.husband.has("birth_date"):
-            continue  # Project Overview Assumptions not met
-        if not fam.has("wife") or not fam.wife.has("birth_date"):
+    ages = gedcom_file.ages
+    for line in gedcom_file.find("tag", "FAM"):
+        f = ages.family_ids[line["line_number"]]
+        # Check Project Overview Assumptions, a marriage age is only known with a marriage date and a birth date
+        if not gedcom.ages.known(ages.wife_marriage_age[f]) or not gedcom.ages.known(ages.husband_marriage_age[f]):
             continue  # Project Overview Assumptions not met
 
-        for child in fam.children:
+        fam = gedcom.tag.Family(line)
+        for c in ages.children_of(f):
             # Check Project Overview Assumptions
-            if not child.has("birth_date"):
+            if c == gedcom.ages.NONE or ages.birth[c] == gedcom.ages.MISSING:
                 continue  # Project Overview Assumptions not met
 
-            m_yrs_older = gedcom.tools.years_between(child.birth_date.dt, fam.wife.birth_date.dt)
-            f_yrs_older = gedcom.tools.years_between(child.birth_date.dt, fam.husband.birth_date.dt)
+            child = gedcom.tag.Individual(ages.individuals[c])
+            m_yrs_older = ages.years_apart(c, ages.wife[f])
+            f_yrs_older = ages.years_apart(c, ages.husband[f])
             status = "passed" if (m_yrs_older < 60) and (f_yrs_older < 80) else "failed"
             r[status].append({"message": msg(fam, child, child.birth_date, fam.wife, fam.wife.birth_date, m_yrs_older,
                                              fam.husband, fam.husband.birth_date, f_yrs_older)})
@@ -519,12 +887,15 @@ def parents_not_too_old(gedcom_file):
     return r
 
 
-@story("Anomaly US13")
+@story("Anomaly US13", reach=1)
 def siblings_spacing(gedcom_file):
     """ Birth dates of siblings should be more than 8 months apart or less than 2 days apart
 
     :note: Assume 8 months is (30 days)*(8 months)=(240 days)
 
+    :note: Each sibling is compared with the siblings born after them, in birth order, so the days between them are
+    never negative.
+
     :sprint: 3
     :author: Constantine Davantzis
 
@@ -536,26 +907,30 @@ def siblings_spacing(gedcom_file):
     msg = "{0} has siblings born {1} apart ({2} days)".format
     bullet_msg = "Sibling {0} born {1}".format
     for fam in gedcom_file.families:
-        for sib_a, sib_b in combinations((c for c in fam.children if c.has("birth_date")), 2):
-            days = gedcom.tools.days_between(sib_a.birth_date.dt, sib_b.birth_date.dt)
-            out = {"bullets": [bullet_msg(sib_a, sib_a.birth_date), bullet_msg(sib_b, sib_b.birth_date)]}
-            if days < 2:
-                out["message"] = msg(fam, "less than two days", days, sib_a, sib_a.birth_date, sib_b, sib_b.birth_date)
-                r["passed"].append(out)
-            elif days > 240:
-                out["message"] = msg(fam, "more than 8 months", days, sib_a, sib_a.birth_date, sib_b, sib_b.birth_date)
-                r["passed"].append(out)
-            else:
-                out["message"] = msg(fam, "less than 8 months but more than two days", days, sib_a, sib_a.birth_date,
-                                     sib_b, sib_b.birth_date)
-                r["failed"].append(out)
+        births = gedcom_file.births_by_family[fam.ln]
+        for i, (day_a, sib_a) in enumerate(births):
+            for j in xrange(i + 1, len(births)):
+                day_b, sib_b = births[j]
+                days = day_b - day_a
+                out = {"bullets": [bullet_msg(sib_a, sib_a.birth_date), bullet_msg(sib_b, sib_b.birth_date)]}
+                if days < 2:
+                    out["message"] = msg(fam, "less than two days", days)
+                    r["passed"].append(out)
+                elif days > 240:
+                    out["message"] = msg(fam, "more than 8 months", days)
+                    r["passed"].append(out)
+                else:
+                    out["message"] = msg(fam, "less than 8 months but more than two days", days)
+                    r["failed"].append(out)
     return r
 
 
-@story("Anomaly US14")
+@story("Anomaly US14", reach=1)
 def less_than_5_multiple_births(gedcom_file):
     """ No more than five siblings should be born at the same time
 
+    :note: Siblings born at the same time are runs of the same date in the family's sorted births.
+
     :sprint: 3
     :author: Constantine Davantzis
 
@@ -569,9 +944,10 @@ def less_than_5_multiple_births(gedcom_file):
     msg_fail = "{0} has more than 5 siblings born on the same date, with {1} siblings born on {2}".format
 
     for fam in gedcom_file.families:
-        group = groupby(sorted(fam.children, key=lambda x: x.birth_date.dt), lambda x: x.birth_date)
-        for date, born_on_date in ((date, list(born_on_date)) for date, born_on_date in group):
+        for day, born_on_date in groupby(gedcom_file.births_by_family[fam.ln], lambda x: x[0]):
+            born_on_date = [c for _, c in born_on_date]
             i = len(born_on_date)
+            date = born_on_date[0].birth_date
             out = {"bullets": ["Sibling {0} born {1}".format(c, c.birth_date) for c in born_on_date]}
             if i <= 5:
                 out["message"] = msg_pass(fam, i, "sibling" if i == 1 else "siblings", date.val)
@@ -583,7 +959,7 @@ def less_than_5_multiple_births(gedcom_file):
     return r
 
 
-@story("Anomaly US15")
+@story("Anomaly US15", reach=1)
 def fewer_than_15_siblings(gedcom_file):
     """ There should be fewer than 15 siblings in a family
 
@@ -605,7 +981,7 @@ def fewer_than_15_siblings(gedcom_file):
     return r
 
 
-@story("Anomaly US16")
+@story("Anomaly US16", reach=1)
 def male_last_names(gedcom_file):
     """ All male members of a family should have the same last name
 
@@ -646,7 +1022,7 @@ def male_last_names(gedcom_file):
     return r
 
 
-@story("Anomaly US17")
+@story("Anomaly US17", reach=None)
 def no_marriages_to_descendants(gedcom_file):
     """ Parents should not marry any of their descendants
 
@@ -662,12 +1038,13 @@ def no_marriages_to_descendants(gedcom_file):
     passed_message = "Individual {0} is not married to any descendants".format
     failed_message = "Individual {0} is married to {1} of {2} descendants".format
     bullet = "Married to {0} {1} in {2}".format
+    kinship = gedcom_file.spouse_kinship
     for indi in gedcom_file.individuals:
-        b = []
-        for descendant in indi.descendants:
-            for fam, spouse in indi.families_and_spouses:
-                if spouse == descendant:
-                    b.append(bullet(descendant.descendant_title, descendant, fam))
+        # Closest descendants first, as they are found going down the generations
+        kin = sorted((k for k in kinship[indi.line["line_number"]] if k.relation == "descendant"),
+                     key=lambda k: (k.detail, k.spouse["line_number"]))
+        b = [bullet(gedcom.tag.descendant_title(k.detail), gedcom.tag.Individual(k.spouse), gedcom.tag.Family(k.family))
+             for k in kin]
         if len(b) == 0:
             r["passed"].append({"message": passed_message(indi), "bullets": b})
         else:
@@ -675,10 +1052,13 @@ def no_marriages_to_descendants(gedcom_file):
     return r
 
 
-@story("Anomaly US18")
+@story("Anomaly US18", reach=3)
 def siblings_should_not_marry(gedcom_file):
     """ Siblings should not marry one another
 
+    :note: A child listed in more than one family (an error) is only checked in the first family listing them, found
+    from the links of the whole file, so each family can be checked on its own.
+
     :sprint: 3
     :author: Adam Burbidge
 
@@ -690,17 +1070,21 @@ def siblings_should_not_marry(gedcom_file):
     passed_msg = "Individual {0} is married to none of {1} siblings".format
     failed_msg = "Individual {0} is married to {1} of {2} siblings".format
     bullet = "Married to sibling {0}. Sibling in {1}, Married in {2}".format
-    # Keep track of individuals checked just in case individual is a child in multiple families (ERROR)
-    checked = []
+    root = gedcom_file.root
+    adjacency = root.kinship_adjacency
     for fam in gedcom_file.families:
-        for indi in (i for i in fam.children if (i not in checked)):
-            siblings = [s for s in fam.children if s.xref != indi.xref]
+        # Keep track of individuals checked just in case individual is a child in multiple families (ERROR)
+        checked = []
+        for indi in fam.children:
+            if indi in checked or adjacency.listed_as_child_in(indi.line)[0]["line_number"] != fam.line["line_number"]:
+                continue
             checked.append(indi)
-            b = []
-            for spouse_fam, spouse in indi.families_and_spouses:
-                for sibling in siblings:
-                    if sibling == spouse:
-                        b.append(bullet(sibling, fam, spouse_fam))
+        kinship = gedcom.kinship.spouse_kinship([indi.line for indi in checked], root, adjacency)
+        for indi in checked:
+            siblings = [s for s in fam.children if s.xref != indi.xref]
+            b = [bullet(gedcom.tag.Individual(k.spouse), fam, gedcom.tag.Family(k.family))
+                 for k in kinship[indi.line["line_number"]]
+                 if k.relation == "sibling" and k.detail["line_number"] == fam.line["line_number"]]
             if len(b) == 0:
                 r["passed"].append({"message": passed_msg(indi, len(siblings))})
             else:
@@ -709,7 +1093,7 @@ def siblings_should_not_marry(gedcom_file):
     return r
 
 
-@story("Anomaly US19")
+@story("Anomaly US19", reach=6)
 def first_cousins_should_not_marry(gedcom_file):
     """ First cousins should not marry one another
 
@@ -727,9 +1111,10 @@ def first_cousins_should_not_marry(gedcom_file):
 
     bul = "{0} is married to cousin {1} in {2}".format
 
+    kinship = gedcom_file.spouse_kinship
     for indi in gedcom_file.individuals:
-        spouses = list(indi.spouses)
-        bullets = [bul(indi, c, spouses.pop(spouses.index(c)).spouse_family) for c in indi.cousins if c in spouses]
+        bullets = [bul(indi, gedcom.tag.Individual(k.spouse), gedcom.tag.Family(k.family))
+                   for k in kinship[indi.line["line_number"]] if k.relation == "first cousin"]
         count = len(bullets)
         if count == 0:
             r["passed"].append({"message": msg["passed"](indi)})
@@ -741,7 +1126,7 @@ def first_cousins_should_not_marry(gedcom_file):
     return r
 
 
-@story("Anomaly US20")
+@story("Anomaly US20", reach=4)
 def aunts_and_uncles(gedcom_file):
     """ Aunts and uncles should not marry their nieces or nephews
 
@@ -759,10 +1144,10 @@ def aunts_and_uncles(gedcom_file):
 
     bul = "{0} is married to {1} {2} in {3}".format
 
+    kinship = gedcom_file.spouse_kinship
     for indi in gedcom_file.individuals:
-        spouses = list(indi.spouses)
-        bullets = [bul(indi, x.aunt_or_uncle, x, spouses.pop(spouses.index(x)).spouse_family) for x in
-                   indi.aunts_and_uncles if x in spouses]
+        bullets = [bul(indi, x.aunt_or_uncle, x, gedcom.tag.Family(k.family)) for k in kinship[indi.line["line_number"]]
+                   if k.relation == "aunt/uncle" for x in [gedcom.tag.Individual(k.spouse)]]
         count = len(bullets)
         if count == 0:
             r["passed"].append({"message": msg["passed"](indi)})
@@ -772,7 +1157,7 @@ def aunts_and_uncles(gedcom_file):
     return r
 
 
-@story("Error US21")
+@story("Error US21", reach=1)
 def correct_gender_for_role(gedcom_file):
     """ Husband in family should be male and wife in family should be female
 
@@ -806,7 +1191,18 @@ def correct_gender_for_role(gedcom_file):
     return r
 
 
-@story("Error US22")
+def xref_key(line):
+    """ The key of a record in unique_ids, its type and xref, sorted the way unique_ids reports them """
+    if line.tag not in ("INDI", "FAM"):
+        return None
+    kind, xref = ("INDI", "FAM").index(line.tag), line.get("xref_ID")
+    try:
+        return kind, 0, int(xref[2:].replace("@", ""))
+    except ValueError:
+        return kind, 1, xref
+
+
+@story("Error US22", reach=0, scope="key", key=xref_key)
 def unique_ids(gedcom_file):
     """ All individual IDs should be unique and all family IDs should be unique
 
@@ -861,7 +1257,12 @@ def matches(a, key):
         yield key, items, len(items)
 
 
-@story("Anomaly US23")
+def name_and_birth_date(indi):
+    """ The name and birth date unique_name_and_birth_date groups individuals by """
+    return indi.name.val.replace("/", ""), indi.birth_date.val
+
+
+@story("Anomaly US23", reach=0, scope="key", key=record_key("INDI", name_and_birth_date))
 def unique_name_and_birth_date(gedcom_file):
     """ No more than one individual with the same name and birth date should appear in a GEDCOM file
 
@@ -877,14 +1278,19 @@ def unique_name_and_birth_date(gedcom_file):
            "failed": "{0} individuals found with the name {1} and birth date {2}".format}
     bul = "{0.xref} - Name: {0.name} Birth Date: {0.birth_date}".format
 
-    for key, items, count in matches(gedcom_file.individuals, lambda x: (x.name.val.replace("/", ""), x.birth_date.val)):
+    for key, items, count in matches(gedcom_file.individuals, name_and_birth_date):
         status = "passed" if count == 1 else "failed"
         r[status].append({"message": msg[status](count, key[0], key[1]), "bullets": map(bul, items)})
         
     return r
 
 
-@story("Anomaly US24")
+def spouses_and_marriage_date(fam):
+    """ The marriage date and spouse names unique_families_by_spouses groups families by """
+    return fam.marriage_date.val, fam.husband.name.val.replace("/", ""), fam.wife.name.val.replace("/", "")
+
+
+@story("Anomaly US24", reach=1, scope="key", key=record_key("FAM", spouses_and_marriage_date))
 def unique_families_by_spouses(gedcom_file):
     """ No more than one family with the same spouses by name and the same marriage date should appear in a GEDCOM file
 
@@ -900,13 +1306,107 @@ def unique_families_by_spouses(gedcom_file):
            "failed": "{0} families found with the husband name {1}, wife name {2} and marriage date {3}".format}
     bul = "{0.xref} - Husband Name: {0.husband.name}, Wife Name: {0.wife.name}, Marriage Date: {0.marriage_date}".format
 
-    for key, items, count in matches(gedcom_file.families, lambda f: (f.marriage_date.val, f.husband.name.val.replace("/", ""), f.wife.name.val.replace("/", ""))):
+    for key, items, count in matches(gedcom_file.families, spouses_and_marriage_date):
         status = "passed" if count == 1 else "failed"
         r[status].append({"message": msg[status](count, key[1], key[2], key[0]), "bullets": map(bul, items)})
 
     return r
 
 
+def blocks(a, keys):
+    """ Group items into blocks that share a blocking key
+
+    :param a: items to group
+    :param keys: function returning the blocking keys of an item, items are compared with every item they share a key
+    with. Items the function raises AttributeError for are left out.
+
+    :return: iterator of unique pairs of items sharing at least one key
+    :rtype: iterator
+
+    """
+    m = {}
+    for i, b in enumerate(a):
+        try:
+            ks = keys(b)
+        except AttributeError:
+            continue
+        for k in ks:
+            m[k].append((i, b)) if k in m else m.update({k: [(i, b)]})
+    seen = set()
+    for key in sorted(m):
+        for (i, x), (j, y) in combinations(m[key], 2):
+            if (i, j) not in seen:
+                seen.add((i, j))
+                yield x, y
+
+
+def duplicate_name(indi):
+    """ The name likely_duplicate_individuals compares, in lower case without slashes """
+    return " ".join(indi.name.val.replace("/", " ").split()).lower()
+
+
+def duplicate_group(indi):
+    """ The soundex of the surname and the initial of an individual, which every block likely_duplicate_individuals
+    compares them in shares """
+    n = duplicate_name(indi)
+    return gedcom.tools.soundex(indi.name.surname or n), n[:1]
+
+
+# Individuals without a name are not compared, but are still reported as having no likely duplicates
+@story("Anomaly US23B", reach=0, scope="key", key=record_key("INDI", duplicate_group, default=()))
+def likely_duplicate_individuals(gedcom_file):
+    """ Individuals with similar names and close birth dates are likely to be duplicates
+
+    Individuals are only compared with individuals in the same block, i.e. with a surname that sounds the same
+    (Soundex), the same initial, and a birth year in the same or the next 5 year bucket. Each candidate pair is scored
+    on the edit distance between their given names and surnames, and the days between their birth dates.
+    Exact duplicates are left to unique_name_and_birth_date.
+
+    :note: This extends US23, which only finds individuals with the same name and birth date, so its id is US23B.
+
+    :param gedcom_file: GEDCOM File to check
+    :type gedcom_file: parser.File
+
+    """
+    r = {"passed": [], "failed": []}
+    msg = {"passed": "{0} has no likely duplicates".format,
+           "failed": "{0} and {1} are likely duplicates (score {2:.2f})".format}
+    bul = "{0.xref} - Name: {0.name} Birth Date: {0.birth_date}".format
+
+    name = duplicate_name
+
+    def keys(indi):
+        group, year = duplicate_group(indi), indi.birth_date.dt.year
+        return [group + (bucket,) for bucket in (year // 5, year // 5 - 1)]
+
+    def similarity(x, y):
+        return 1 - float(gedcom.tools.edit_distance(x, y)) / max(len(x), len(y), 1)
+
+    def score(a, b):
+        # Given names and surnames are scored separately and both need to be close, so siblings sharing a surname
+        # are not duplicates
+        surname_a, surname_b = (a.name.surname or "").lower(), (b.name.surname or "").lower()
+        given_a, given_b = name(a).replace(surname_a, "").strip(), name(b).replace(surname_b, "").strip()
+        name_score = min(similarity(given_a, given_b), similarity(surname_a, surname_b))
+        date_score = max(0.0, 1 - float(gedcom.tools.days_between(a.birth_date.dt, b.birth_date.dt)) / 730)
+        return 0.7 * name_score + 0.3 * date_score
+
+    individuals = gedcom_file.individuals
+    duplicated = set()
+    for a, b in blocks(individuals, keys):
+        if name(a) == name(b) and a.birth_date == b.birth_date:
+            continue  # Exact duplicates are checked by unique_name_and_birth_date
+        s = score(a, b)
+        if s >= DUPLICATE_SCORE:
+            duplicated.update([a.ln, b.ln])
+            r["failed"].append({"message": msg["failed"](a, b, s), "bullets": [bul(a), bul(b)]})
+    for indi in individuals:
+        if indi.ln not in duplicated:
+            r["passed"].append({"message": msg["passed"](indi)})
+
+    return r
+
+
 # USER STORIES BELOW NOT IN ASSIGNMENT SCOPE
 
 
@@ -950,34 +1450,57 @@ def order_siblings_by_age():
     pass
 
 
-def list_deceased():
-    """ List deceased
-    Description: List all deceased individuals in a GEDCOM file
-    story_id: US29
-    author: TBD
-    sprint: TBD
+@listing("List US29")
+def list_deceased(gedcom_file):
+    """ List all deceased individuals in a GEDCOM file
+
+    :note: The individuals are the is_deceased bitmap of the file's status bitmaps (see gedcom.status).
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
+
     """
-    pass
+    msg = "Individual {0} died {1}".format
+    individuals = gedcom_file.ages.individuals
+    listed = []
+    for i in gedcom.status.members(gedcom_file.status.is_deceased):
+        indi = gedcom.tag.Individual(individuals[i])
+        listed.append({"message": msg(indi, indi.death_date or "on an unknown date")})
+    return listed
 
 
-def list_living_married():
-    """ List living married
-    Description: List all living married people in a GEDCOM file
-    story_id: US30
-    author: TBD
-    sprint: TBD
+@listing("List US30")
+def list_living_married(gedcom_file):
+    """ List all living married people in a GEDCOM file
+
+    :note: The individuals are the living individuals of the file's status bitmaps (see gedcom.status) who are
+    currently married, i.e. are spouses in a family without a divorce, with a living spouse.
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
+
     """
-    pass
+    msg = "Individual {0} is living and married".format
+    status, individuals = gedcom_file.status, gedcom_file.ages.individuals
+    return [{"message": msg(gedcom.tag.Individual(individuals[i]))}
+            for i in gedcom.status.members(status.living() & status.is_currently_married)]
 
 
-def list_living_single():
-    """ List living single
-    Description: List all living people over 30 who have never been married in a GEDCOM file
-    story_id: US31
-    author: TBD
-    sprint: TBD
+@listing("List US31")
+def list_living_single(gedcom_file):
+    """ List all living people over 30 who have never been married in a GEDCOM file
+
+    :note: The individuals are the living individuals of the file's status bitmaps (see gedcom.status) over 30 who
+    were never married.
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
+
     """
-    pass
+    msg = "Individual {0} is {1} years old and has never been married".format
+    status, ages = gedcom_file.status, gedcom_file.ages
+    return [{"message": msg(gedcom.tag.Individual(ages.individuals[i]), ages.age[i])}
+            for i in gedcom.status.members(status.living() & status.age_over_30 & ~status.ever_married)]
 
 
 def list_multiple_births():
@@ -990,74 +1513,206 @@ def list_multiple_births():
     pass
 
 
-def list_orphans():
-    """ List orphans
-    Description: List all orphaned children (both parents dead and child < 18 years old) in a GEDCOM file
-    story_id: US33
-    author: TBD
-    sprint: TBD
+@listing("List US33")
+def list_orphans(gedcom_file):
+    """ List all orphaned children (both parents dead and child < 18 years old) in a GEDCOM file
+
+    :note: The children are found by gedcom.ages.Ages.orphans, joining the parents of each family with their deaths
+    and the ages of its children in one pass over families.
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
+
     """
-    pass
+    msg = "Individual {0} is {1} years old and is an orphan of {2}".format
+    bul = "{0} {1} died {2}".format
+    ages = gedcom_file.ages
+    listed = []
+    for i, f in ages.orphans(18):
+        fam = gedcom.tag.Family(ages.families[f])
+        listed.append({"message": msg(gedcom.tag.Individual(ages.individuals[i]), ages.current_age[i], fam),
+                       "bullets": [bul("Husband", fam.husband, fam.husband.death_date or "on an unknown date"),
+                                   bul("Wife", fam.wife, fam.wife.death_date or "on an unknown date")]})
+    return listed
+
+
+@listing("List US34")
+def list_large_age_differences(gedcom_file):
+    """ List all couples who were married when the older spouse was more than twice as old as the younger spouse
+
+    :note: The families are found by gedcom.ages.Ages.large_age_differences, from the marriage ages of both spouses
+    computed in one pass over families.
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
+
+    """
+    msg = "{0} has marriage date {1}".format
+    bul = "{0} {1} born {2} [married at {3} years old]".format
+    ages = gedcom_file.ages
+    listed = []
+    for f in ages.large_age_differences(2):
+        fam = gedcom.tag.Family(ages.families[f])
+        listed.append({"message": msg(fam, fam.marriage_date),
+                       "bullets": [bul("Husband", fam.husband, fam.husband.birth_date, ages.husband_marriage_age[f]),
+                                   bul("Wife", fam.wife, fam.wife.birth_date, ages.wife_marriage_age[f])]})
+    return listed
 
 
-def list_large_age_differences():
-    """ List large age differences
-    Description: List all couples who were married when the older spouse was more than twice as old as the younger spouse
-    story_id: US34
-    author: TBD
-    sprint: TBD
+def recent_events(gedcom_file, event, days, today):
+    """ The individuals with an event (e.g. "BIRT") from days before today to today, from the file's timeline
+
+    :returns: list of (tag.Individual, date ordinal of the event) sorted by date
+    :rtype: list
+
     """
-    pass
+    individuals = gedcom_file.ages.individuals
+    return [(gedcom.tag.Individual(individuals[i]), ordinal)
+            for _, ordinal, i in gedcom_file.timeline.events_between(today - days, today, [event])]
 
 
-def list_recent_births():
-    """ List recent births
-    Description: List all people in a GEDCOM file who were born in the last 30 days
-    story_id: US35
-    author: TBD
-    sprint: TBD
+@listing("List US35")
+def list_recent_births(gedcom_file, days=RECENT_DAYS, today=None):
+    """ List all people in a GEDCOM file who were born in the last 30 days
+
+    :note: The births are a range of the file's timeline of dated events (see gedcom.timeline), built once per file.
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
+
+    :param days: Days before today to list the births of
+    :type days: int
+
+    :param today: Date ordinal of the last day, defaults to the current date
+    :type today: int
+
     """
-    pass
+    msg = "Individual {0} was born {1} ({2} days ago)".format
+    today = gedcom_file.now.toordinal() if today is None else today
+    return [{"message": msg(indi, indi.birth_date, today - ordinal)}
+            for indi, ordinal in recent_events(gedcom_file, "BIRT", days, today)]
 
 
-def list_recent_deaths():
-    """ List recent deaths
-    Description: List all people in a GEDCOM file who died in the last 30 days
-    story_id: US36
-    author: TBD
-    sprint: TBD
+@listing("List US36")
+def list_recent_deaths(gedcom_file, days=RECENT_DAYS, today=None):
+    """ List all people in a GEDCOM file who died in the last 30 days
+
+    :note: The deaths are a range of the file's timeline of dated events (see gedcom.timeline), built once per file.
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
+
+    :param days: Days before today to list the deaths of
+    :type days: int
+
+    :param today: Date ordinal of the last day, defaults to the current date
+    :type today: int
+
     """
-    pass
+    msg = "Individual {0} died {1} ({2} days ago)".format
+    today = gedcom_file.now.toordinal() if today is None else today
+    return [{"message": msg(indi, indi.death_date, today - ordinal)}
+            for indi, ordinal in recent_events(gedcom_file, "DEAT", days, today)]
 
 
-def list_recent_survivors():
-    """ List recent survivors
-    Description: List all living spouses and descendants of people in a GEDCOM file who died in the last 30 days
-    story_id: US37
-    author: TBD
-    sprint: TBD
+@listing("List US37")
+def list_recent_survivors(gedcom_file, days=RECENT_DAYS, today=None):
+    """ List all living spouses and descendants of people in a GEDCOM file who died in the last 30 days
+
+    :note: The deaths are a range of the file's timeline of dated events (see gedcom.timeline), and the spouses and
+    descendants of each are followed through the file's kinship adjacency (see gedcom.kinship.Adjacency), so only the
+    families of the people who died are looked at. Descendants are followed through those who died too.
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
+
+    :param days: Days before today to list the survivors of deaths of
+    :type days: int
+
+    :param today: Date ordinal of the last day, defaults to the current date
+    :type today: int
+
     """
-    pass
+    msg = "Individual {0} died {1} ({2} days ago) and is survived by".format
+    bul = "{0} {1}".format
+    today = gedcom_file.now.toordinal() if today is None else today
+    ages, adjacency = gedcom_file.ages, gedcom_file.kinship_adjacency
+    alive = ages.living()
+
+    def living(line):
+        return ages.individual_ids.get(line["line_number"]) in alive
+
+    listed = []
+    for indi, ordinal in recent_events(gedcom_file, "DEAT", days, today):
+        spouses = [spouse for fam in adjacency.spouse_in(indi.line) for spouse in adjacency.parents_of(fam)
+                   if spouse["line_number"] != indi.line["line_number"]]
+        bullets = [bul("Spouse", gedcom.tag.Individual(spouse)) for spouse in spouses if living(spouse)]
+        bullets.extend(bul(gedcom.tag.descendant_title(generations).capitalize(), gedcom.tag.Individual(descendant))
+                       for descendant, generations in gedcom.kinship.descendants(indi.line, adjacency)
+                       if living(descendant))
+        if bullets:
+            listed.append({"message": msg(indi, indi.death_date, today - ordinal), "bullets": bullets})
+    return listed
+
+
+@listing("List US38")
+def list_upcoming_birthdays(gedcom_file, days=UPCOMING_DAYS, today=None):
+    """ List all living people in a GEDCOM file whose birthdays occur in the next 30 days
+
+    :note: Living individuals are indexed by the day of the year of their birth once per file (see gedcom.dayindex),
+    so each call only looks up the days asked for, e.g. by a job notifying people of birthdays every day.
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
 
+    :param days: Days to list the birthdays of, starting today
+    :type days: int
+
+    :param today: Date ordinal of the first day, defaults to the current date
+    :type today: int
 
-def list_upcoming_birthdays():
-    """ List upcoming birthdays
-    Description: List all living people in a GEDCOM file whose birthdays occur in the next 30 days
-    story_id: US38
-    author: TBD
-    sprint: TBD
     """
-    pass
+    msg = "Individual {0} born {1} turns {2} on {3} (in {4} days)".format
+    ages = gedcom_file.ages
+    today = gedcom_file.now.toordinal() if today is None else today
+    listed = []
+    for i in gedcom_file.birthday_index.upcoming(today, days):
+        indi = gedcom.tag.Individual(ages.individuals[i])
+        birthday = datetime.fromordinal(gedcom.dayindex.next_anniversary(ages.birth[i], today))
+        turns = birthday.year - datetime.fromordinal(ages.birth[i]).year
+        listed.append({"message": msg(indi, indi.birth_date, turns, birthday.strftime("%d %b %Y").upper(),
+                                      birthday.toordinal() - today)})
+    return listed
+
+
+@listing("List US39")
+def list_upcoming_anniversaries(gedcom_file, days=UPCOMING_DAYS, today=None):
+    """ List all living couples in a GEDCOM file whose marriage anniversaries occur in the next 30 days
+
+    :note: Marriages of living spouses who have not divorced are indexed by the day of the year of the marriage once
+    per file (see gedcom.dayindex), so each call only looks up the days asked for.
+
+    :param gedcom_file: GEDCOM File to list from
+    :type gedcom_file: parser.File
 
+    :param days: Days to list the anniversaries of, starting today
+    :type days: int
+
+    :param today: Date ordinal of the first day, defaults to the current date
+    :type today: int
 
-def list_upcoming_anniversaries():
-    """ List upcoming anniversaries
-    Description: List all living couples in a GEDCOM file whose marriage anniversaries occur in the next 30 days
-    story_id: US39
-    author: TBD
-    sprint: TBD
     """
-    pass
+    msg = "{0} of husband {1} and wife {2} married {3} has anniversary {4} on {5} (in {6} days)".format
+    ages = gedcom_file.ages
+    today = gedcom_file.now.toordinal() if today is None else today
+    listed = []
+    for f in gedcom_file.anniversary_index.upcoming(today, days):
+        fam = gedcom.tag.Family(ages.families[f])
+        anniversary = datetime.fromordinal(gedcom.dayindex.next_anniversary(ages.marriage[f], today))
+        years = anniversary.year - datetime.fromordinal(ages.marriage[f]).year
+        listed.append({"message": msg(fam, fam.husband, fam.wife, fam.marriage_date, years,
+                                      anniversary.strftime("%d %b %Y").upper(), anniversary.toordinal() - today)})
+    return listed
 
 
 def include_input_line_numbers():